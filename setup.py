@@ -16,7 +16,8 @@ dependencies = [
     'pep8==1.5.7',
     'phonenumbers==6.2.0',
     'psycopg2==2.5.3',
-    'requests==2.3.0',
+    'python-memcached==1.53',
+    'requests==2.4.3',
     'wsgiref==0.1.2',
     'fig==1.0.1'
 ]
@@ -33,7 +34,7 @@ setup(
     zip_safe=False,
     package_data={
         'working_waterfronts.working_waterfronts_api.tests.testdata':
-            ['*.json', 'media/*'],
+            ['*.json', '*.csv', '*.geojson', 'media/*'],
         'working_waterfronts.working_waterfronts_api':
             ['templates/*', 'static/*.png', 'static/css/*']
     },
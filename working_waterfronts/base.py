@@ -92,12 +92,147 @@ STATIC_URL = '/static/'
 MEDIA_ROOT = os.path.join('/home/vagrant/media')
 MEDIA_URL = '/media/'
 
+# Uploads are named by the hash of their content and sharded into nested
+# directories, so identical uploads are stored once
+DEFAULT_FILE_STORAGE = (
+    'working_waterfronts.working_waterfronts_api.storage.'
+    'ContentAddressedStorage')
+
+# How /media/<path> hands files to the client once it has checked them:
+# 'x-accel-redirect' for nginx, which serves MEDIA_ACCEL_PREFIX + <path> from
+# an internal location aliased to MEDIA_ROOT; 'x-sendfile' for Apache's
+# mod_xsendfile or lighttpd; or None to stream them from Django, for
+# development. MEDIA_MAX_AGE is how long, in seconds, clients may cache
+# content-addressed files, whose URLs change whenever their content does.
+MEDIA_SERVER = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_MAX_AGE = 60 * 60 * 24 * 365
+
 # Proximity used for location queries if
 # proximity parameter is not also passed
 DEFAULT_PROXIMITY = 20
 
+# Number of results for nearest queries if the n parameter is not passed,
+# and the most that may be requested
+DEFAULT_NEAREST_COUNT = 10
+MAX_NEAREST_COUNT = 100
+
+# Highest map zoom level clusters can be requested for, and the width of a
+# cluster cell in pixels on a 256 pixel map tile
+MAX_CLUSTER_ZOOM = 20
+CLUSTER_CELL_PIXELS = 64
+
+# Highest zoom level vector tiles are served for, how long rendered tiles
+# are cached (they are also invalidated when a POI in them changes), and
+# the max-age clients may cache them for, in seconds
+MAX_TILE_ZOOM = 18
+TILE_CACHE_TIMEOUT = 60 * 60 * 24
+TILE_MAX_AGE = 60 * 5
+
 PAGE_LENGTH = 15
 
+# The cache shared by every process. The response and tile caches are
+# invalidated by whichever process changes a POI, including the
+# geocode_pois and import_pois commands, so a per-process cache would leave
+# the other workers serving stale responses.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': '127.0.0.1:11211',
+    }
+}
+
+# The tests run against a local-memory cache instead (see tests/runner.py)
+TEST_RUNNER = \
+    'working_waterfronts.working_waterfronts_api.tests.runner.LocalCacheRunner'
+
+# Seconds the /1/pois responses are cached for, unless a POI changes first.
+# 0 disables the cache.
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+# Decimal places lat and lng are rounded to in cache keys (4 is about 11m)
+RESPONSE_CACHE_PLACES = 4
+
+# Seconds before a cached geocoding result is refreshed
+GEOCODE_CACHE_TTL = 60 * 60 * 24 * 90
+
+# The geocoder backend (see working_waterfronts_api/geocoders.py). The
+# GazetteerGeocoder looks addresses up in the CSV file at
+# GEOCODER_GAZETTEER rather than calling the Google API.
+GEOCODER = 'working_waterfronts.working_waterfronts_api.geocoders.' \
+    'GoogleGeocoder'
+GEOCODER_GAZETTEER = None
+
+# Seconds to wait to connect to and hear back from the geocoding API, the
+# number of times a failed call is retried, and seconds to wait before the
+# first retry (doubled for each one after)
+GEOCODE_TIMEOUT = (3.05, 10)
+GEOCODE_RETRIES = 2
+GEOCODE_BACKOFF = 0.5
+
+# Failed lookups in a row before the geocoding API is left alone, and
+# seconds before it is tried again
+GEOCODE_BREAKER_FAILURES = 5
+GEOCODE_BREAKER_RESET = 60
+
+# Addresses saved without coordinates are geocoded by the geocode_pois
+# worker. Seconds it waits between checks for new jobs, seconds before a
+# job whose worker died is run again, and seconds before a job that failed
+# to reach the geocoder is retried (doubled for each failure, up to
+# GEOCODE_JOB_RETRY_MAX)
+GEOCODE_POLL_INTERVAL = 5
+GEOCODE_JOB_LOCK_TIMEOUT = 5 * 60
+GEOCODE_JOB_RETRY = 60
+GEOCODE_JOB_RETRY_MAX = 60 * 60
+
+# Rows the import_pois command saves at a time, and the number of threads
+# geocoding imported addresses along with the most lookups they make per
+# second between them
+IMPORT_BATCH_SIZE = 500
+IMPORT_GEOCODE_THREADS = 4
+IMPORT_GEOCODE_RATE = 10
+
+# The resized copies made of uploaded images, with the longest edge of each
+# in pixels, the formats each is saved in, and their JPEG/WebP quality
+IMAGE_DERIVATIVE_SIZES = (
+    ('thumbnail', 200),
+    ('medium', 800),
+    ('large', 1600),
+)
+IMAGE_DERIVATIVE_FORMATS = ('jpeg', 'webp')
+IMAGE_DERIVATIVE_QUALITY = 80
+
+# The bounding boxes, in pixels, /media/resize/<w>x<h>/<path> resizes images
+# to; the directory under MEDIA_ROOT the resized images are cached in; and
+# the most bytes the cache may hold before the least recently used resized
+# images are deleted
+IMAGE_RESIZE_SIZES = (
+    (100, 100),
+    (200, 200),
+    (400, 400),
+    (640, 480),
+    (800, 600),
+    (1024, 768),
+    (1280, 960),
+)
+IMAGE_RESIZE_CACHE = 'cache/resized'
+IMAGE_RESIZE_CACHE_BYTES = 512 * 1024 * 1024
+
+# Have PostgreSQL assemble /1/pois list bodies from the stored POI JSON,
+# rather than joining it in Python
+POI_JSON_IN_DATABASE = False
+
+# Seconds by which each /1/sync overlaps the previous one, to catch objects
+# saved while the previous sync was running
+SYNC_OVERLAP = 5
+
+# Seconds the records of deleted objects are kept for /1/sync. The
+# prune_tombstones command deletes older ones, and syncs since an older
+# token return every object, for the client to replace its copies with.
+TOMBSTONE_RETENTION = 60 * 60 * 24 * 90
+
+# Number of rows read at a time when streaming large responses
+STREAM_CHUNK_SIZE = 500
+
 LOGIN_URL = '/login'
 
 DEFAULT_GROUP_NAME = 'Data Entry Users'
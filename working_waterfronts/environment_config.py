@@ -9,3 +9,10 @@ DATABASES = {
         'HOST': os.environ['HOST'],
     }
 }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ['MEMCACHED'],
+    }
+}
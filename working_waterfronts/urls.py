@@ -1,5 +1,4 @@
 from django.conf.urls import patterns, include, url
-from django.conf import settings
 
 from django.contrib import admin
 admin.autodiscover()
@@ -7,12 +6,13 @@ admin.autodiscover()
 urlpatterns = patterns(
     '',
     url(r'^admin/', include(admin.site.urls)),
+    # Uploads are checked here, then handed to the web server (see
+    # MEDIA_SERVER)
+    url(r'^media/resize/(?P<width>\d+)x(?P<height>\d+)/(?P<path>.+)$',
+        'working_waterfronts.working_waterfronts_api.views.media.resize',
+        name='media-resize'),
+    url(r'^media/(?P<path>.+)$',
+        'working_waterfronts.working_waterfronts_api.views.media.media',
+        name='media'),
     (r'^', include('working_waterfronts.working_waterfronts_api.urls')),
 )
-
-if settings.DEBUG:
-    # Allow statics to be served if in debug mode
-    urlpatterns += patterns(
-        '',
-        (r'^media/(?P<path>.*)$', 'django.views.static.serve', {
-            'document_root': settings.MEDIA_ROOT}))
@@ -0,0 +1,3 @@
+default_app_config = (
+    'working_waterfronts.working_waterfronts_api.apps.'
+    'WorkingWaterfrontsApiConfig')
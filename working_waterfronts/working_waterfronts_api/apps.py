@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class WorkingWaterfrontsApiConfig(AppConfig):
+
+    name = 'working_waterfronts.working_waterfronts_api'
+    verbose_name = 'Working Waterfronts API'
+
+    def ready(self):
+        # Connect the model signal handlers
+        from working_waterfronts.working_waterfronts_api import signals  # noqa
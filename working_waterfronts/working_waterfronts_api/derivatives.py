@@ -0,0 +1,174 @@
+import hashlib
+import io
+import json
+import os
+
+import PIL.Image
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+# The PIL format and file extension of each derivative format
+FORMATS = {
+    'jpeg': ('JPEG', 'jpg'),
+    'webp': ('WEBP', 'webp')
+}
+
+# The EXIF orientation tag, and the transpositions that undo each
+# orientation. Phone cameras store photos sideways and set the tag rather
+# than rotating them.
+ORIENTATION = 274
+ORIENTATIONS = {
+    2: [PIL.Image.FLIP_LEFT_RIGHT],
+    3: [PIL.Image.ROTATE_180],
+    4: [PIL.Image.FLIP_TOP_BOTTOM],
+    5: [PIL.Image.ROTATE_90, PIL.Image.FLIP_TOP_BOTTOM],
+    6: [PIL.Image.ROTATE_270],
+    7: [PIL.Image.ROTATE_90, PIL.Image.FLIP_LEFT_RIGHT],
+    8: [PIL.Image.ROTATE_90]
+}
+
+
+def generate(image):
+    """
+    Make the derivatives of an Image's original: a copy of it at each size
+    in IMAGE_DERIVATIVE_SIZES, no bigger than the original, in each format
+    in IMAGE_DERIVATIVE_FORMATS that PIL can write. JPEGs are progressive.
+
+    The derivatives are stored next to the original, replacing any the
+    Image had, and listed in its derivatives column. The Image isn't saved.
+    The old derivatives' files are only deleted once the new ones are all
+    stored, so an original that can't be read keeps its derivatives.
+    """
+    old = image.derivatives
+    derivatives = []
+    try:
+        render(image, derivatives)
+    except Exception:
+        # Don't leave the derivatives made before the failure behind
+        delete_files(image, json.dumps(derivatives), keep=old)
+        raise
+
+    image.derivatives = json.dumps(derivatives)
+    delete_files(image, old, keep=image.derivatives)
+
+
+def render(image, derivatives):
+    """
+    Make and store the derivatives of an Image's original, as described for
+    generate(), appending each to the <derivatives> list as it is stored.
+    """
+    storage = image.image.storage
+    image.image.open('rb')
+    try:
+        original = PIL.Image.open(image.image)
+        original.load()
+    finally:
+        image.image.close()
+    original = orient(original)
+    if original.mode != 'RGB':
+        original = original.convert('RGB')
+
+    PIL.Image.init()
+    formats = [format for format in settings.IMAGE_DERIVATIVE_FORMATS
+               if FORMATS[format][0] in PIL.Image.SAVE]
+
+    root = os.path.splitext(os.path.basename(image.image.name))[0]
+    for size, edge in settings.IMAGE_DERIVATIVE_SIZES:
+        resized = original.copy()
+        resized.thumbnail((edge, edge), PIL.Image.ANTIALIAS)
+
+        for format in formats:
+            pil_format, extension = FORMATS[format]
+            buffer = io.BytesIO()
+            resized.save(
+                buffer, pil_format, quality=settings.IMAGE_DERIVATIVE_QUALITY,
+                optimize=True, progressive=True)
+            name = storage.save(
+                'images/derivatives/%s-%s.%s' % (root, size, extension),
+                ContentFile(buffer.getvalue()))
+            derivatives.append({
+                'size': size,
+                'format': format,
+                'name': name,
+                'width': resized.size[0],
+                'height': resized.size[1]
+            })
+
+
+def measure(f):
+    """
+    Return the width, height, byte size and SHA-256 hex digest of an image
+    file, as a dict of the Image columns holding them. The file is read in
+    chunks, and only the image's header is decoded.
+    """
+    f.seek(0)
+    sha256 = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: f.read(64 * 1024), b''):
+        sha256.update(chunk)
+        size += len(chunk)
+
+    f.seek(0)
+    width, height = PIL.Image.open(f).size
+    f.seek(0)
+
+    return {
+        'width': width,
+        'height': height,
+        'bytes': size,
+        'sha256': sha256.hexdigest()
+    }
+
+
+def delete(image):
+    """
+    Delete the files of an Image's derivatives, and forget them. Files that
+    another Image lists too are kept: with content-addressed storage,
+    identical originals share their derivatives.
+    """
+    delete_files(image, image.derivatives)
+    image.derivatives = '[]'
+
+
+def delete_files(image, derivatives, keep='[]'):
+    """
+    Delete the files listed in a derivatives column of an Image, other than
+    those also listed in <keep> or by another Image.
+    """
+    storage = image.image.storage
+    kept = set(derivative['name'] for derivative in json.loads(keep or '[]'))
+    # MediaFile, which can't be imported here as models imports this module
+    others = image.files.model.objects.exclude(image=image.pk)
+    for derivative in json.loads(derivatives or '[]'):
+        name = derivative['name']
+        if name not in kept and not others.filter(name=name).exists():
+            storage.delete(name)
+
+
+def orient(picture):
+    """
+    Return a picture turned the way its EXIF orientation tag says it is
+    meant to be seen.
+    """
+    try:
+        orientation = (picture._getexif() or {}).get(ORIENTATION)
+    except Exception:
+        # Not a JPEG, or its EXIF data is broken
+        return picture
+    for method in ORIENTATIONS.get(orientation, []):
+        picture = picture.transpose(method)
+    return picture
+
+
+def links(storage, derivatives):
+    """
+    Return the public form of an Image's derivatives column: the size,
+    format, URL and pixel dimensions of each derivative.
+    """
+    return [{
+        'size': derivative['size'],
+        'format': derivative['format'],
+        'link': storage.url(derivative['name']),
+        'width': derivative['width'],
+        'height': derivative['height']
+    } for derivative in json.loads(derivatives or '[]')]
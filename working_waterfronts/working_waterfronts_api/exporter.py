@@ -0,0 +1,148 @@
+import csv
+import io
+import zlib
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from working_waterfronts.working_waterfronts_api.models import PointOfInterest
+from working_waterfronts.working_waterfronts_api.views.serializer import (
+    PointOfInterestEncoder, stream_rows)
+
+# The formats POIs can be exported in, with their content types
+FORMATS = {
+    'csv': 'text/csv',
+    'geojson': 'application/vnd.geo+json',
+    'ndjson': 'application/x-ndjson'
+}
+
+# The CSV columns holding related objects, with the key naming each one. The
+# columns are as import_pois reads them.
+CSV_RELATED = [
+    ('categories', 'category'),
+    ('hazards', 'name'),
+    ('images', 'name'),
+    ('videos', 'name')
+]
+
+
+def parse_since(since):
+    """
+    Parse an ISO 8601 timestamp, raising ValueError if it isn't one. Naive
+    timestamps are taken to be UTC.
+    """
+    value = parse_datetime(since)
+    if value is None:
+        raise ValueError("Not an ISO 8601 timestamp: %s" % since)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.utc)
+    return value
+
+
+def pois(since=None):
+    """
+    Yield a dict for every PointOfInterest, in the shape of the public API,
+    or only those modified after <since>.
+
+    POIs are read from a server-side cursor, STREAM_CHUNK_SIZE at a time,
+    and the relations of each chunk are loaded together, so memory use
+    doesn't depend on the number of POIs.
+    """
+    encoder = PointOfInterestEncoder()
+    queryset = PointOfInterest.objects.order_by('id')
+    if since is not None:
+        queryset = queryset.filter(modified__gt=since)
+
+    for rows in stream_rows(encoder.rows(queryset)):
+        relations = encoder.relations([row['id'] for row in rows])
+        for row in rows:
+            yield encoder.poi(row, relations)
+
+
+def export(format, since=None):
+    """
+    Yield every PointOfInterest (see pois()) in the given format, piece by
+    piece.
+    """
+    return {
+        'csv': export_csv,
+        'geojson': export_geojson,
+        'ndjson': export_ndjson
+    }[format](pois(since))
+
+
+def export_csv(pois):
+    """
+    Yield POIs as UTF-8 CSV, one row at a time, in the columns import_pois
+    reads. Related objects are separated by semicolons.
+    """
+    fields = ['id'] + [f.name for f in PointOfInterestEncoder().fields] + [
+        'latitude', 'longitude'] + [name for name, key in CSV_RELATED]
+
+    buffer = io.BytesIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for poi in pois:
+        poi['latitude'] = poi['lat']
+        poi['longitude'] = poi['lng']
+        for name, key in CSV_RELATED:
+            poi[name] = ';'.join(related[key] for related in poi[name])
+        writer.writerow([csv_value(poi[field]) for field in fields])
+
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return unicode(value).encode('utf-8')
+
+
+def export_geojson(pois):
+    """
+    Yield POIs as a GeoJSON FeatureCollection, one Feature at a time.
+    """
+    encoder = PointOfInterestEncoder()
+    yield '{"type": "FeatureCollection", "features": ['
+    for count, poi in enumerate(pois):
+        lat, lng = poi.pop('lat'), poi.pop('lng')
+        feature = {
+            'type': 'Feature',
+            'id': poi['id'],
+            'geometry': {
+                'type': 'Point',
+                'coordinates': [lng, lat]
+            } if lat is not None else None,
+            'properties': poi
+        }
+        yield (',' if count else '') + encoder.encode(feature)
+    yield ']}'
+
+
+def export_ndjson(pois):
+    """
+    Yield POIs as newline-delimited JSON, one POI per line.
+    """
+    encoder = PointOfInterestEncoder()
+    for poi in pois:
+        yield encoder.encode(poi) + '\n'
+
+
+def gzip_stream(chunks, level=6):
+    """
+    Gzip a stream of byte strings as it is read.
+    """
+    # 16 + MAX_WBITS has zlib write a gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, unicode):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
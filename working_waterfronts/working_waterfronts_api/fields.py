@@ -0,0 +1,41 @@
+from django.db import models
+from django.db.models import Lookup
+
+
+class IntegerArrayField(models.Field):
+
+    """
+    A PostgreSQL integer[] column, read and written as a list of ints.
+
+    Filter with <name>__contains=[...] for rows whose array holds every
+    given value. The lookup uses the @> operator, so it can use a GIN index.
+    """
+    description = "Array of integers"
+
+    def db_type(self, connection):
+        return 'integer[]'
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        return [int(v) for v in value]
+
+    def to_python(self, value):
+        if value is None:
+            return None
+        return [int(v) for v in value]
+
+
+class ArrayContains(Lookup):
+    lookup_name = 'contains'
+
+    def get_prep_lookup(self):
+        return self.lhs.output_field.get_prep_value(self.rhs)
+
+    def as_sql(self, qn, connection):
+        lhs, params = self.process_lhs(qn, connection)
+        params.append(self.rhs)
+        return '%s @> %%s::integer[]' % lhs, params
+
+
+IntegerArrayField.register_lookup(ArrayContains)
@@ -1,6 +1,7 @@
 import django.forms as forms
 from working_waterfronts.working_waterfronts_api.models import (
     Hazard, Image, Video, PointOfInterest, Category)
+from working_waterfronts.working_waterfronts_api.derivatives import measure
 
 
 class PointOfInterestForm(forms.ModelForm):
@@ -46,6 +47,18 @@ class ImageForm(forms.ModelForm):
             'name': forms.TextInput(attrs={'required': 'true'})
         }
 
+    def save(self, commit=True):
+        """
+        Save the image, measuring its file if a new one was uploaded.
+        """
+        image = super(ImageForm, self).save(commit=False)
+        if 'image' in self.changed_data:
+            for name, value in measure(self.cleaned_data['image']).items():
+                setattr(image, name, value)
+        if commit:
+            image.save()
+        return image
+
 
 class VideoForm(forms.ModelForm):
 
@@ -0,0 +1,289 @@
+import json
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.db import connection, transaction
+
+from working_waterfronts.working_waterfronts_api import response_cache
+from working_waterfronts.working_waterfronts_api.models import (
+    PointOfInterest, PointOfInterestFragment)
+from working_waterfronts.working_waterfronts_api.views.serializer import (
+    PointOfInterestEncoder, stream_rows)
+
+# The POI ids whose refresh is deferred to the end of a deferred() block
+_state = threading.local()
+
+# The POI ids migrations have changed the read model of, to be rebuilt when
+# migrate finishes. ALL stands for every POI.
+ALL = object()
+_migrated = set()
+
+
+def build(ids):
+    """
+    Serialize the POIs with the given ids and store their read model rows.
+    POIs that aren't located get no row, so they aren't public: neither
+    those waiting to be geocoded, whose stored location may be the one of
+    their old address, nor those whose address wasn't found.
+
+    The POI rows are locked while their read model is rebuilt, so
+    concurrent builds of the same POIs take turns, each serializing what
+    the one before it committed, and the last build stored is the latest.
+    """
+    ids = list(ids)
+    encoder = PointOfInterestEncoder()
+    with transaction.atomic():
+        # Locked in id order, so builds of overlapping POIs can't deadlock
+        list(PointOfInterest.objects.select_for_update().filter(
+            id__in=ids).order_by('id').values_list('id', flat=True))
+
+        rows = []
+        for poi in encoder.serialize(PointOfInterest.objects.filter(
+                id__in=ids, location__isnull=False,
+                location_status=PointOfInterest.LOCATED)):
+            rows.append(PointOfInterestFragment(
+                pointofinterest_id=poi['id'],
+                json=encoder.encode(poi),
+                location=Point(poi['lng'], poi['lat'], srid=4326),
+                categories=[
+                    category['id'] for category in poi['categories']]))
+
+        PointOfInterestFragment.objects.filter(
+            pointofinterest__in=ids).delete()
+        PointOfInterestFragment.objects.bulk_create(rows)
+
+
+def build_all():
+    """
+    Rebuild the read model row of every POI, STREAM_CHUNK_SIZE at a time.
+    Returns the number of POIs.
+    """
+    ids = list(PointOfInterest.objects.values_list('id', flat=True))
+    for start in range(0, len(ids), settings.STREAM_CHUNK_SIZE):
+        build(ids[start:start + settings.STREAM_CHUNK_SIZE])
+    return len(ids)
+
+
+def rebuild_after_migrate(ids=ALL):
+    """
+    Have the read model rows of the POIs with the given ids, or of every
+    POI, rebuilt when migrate finishes (see rebuild_migrated).
+
+    Migrations call this rather than build(): build() serializes with the
+    current models, whose columns may not exist until later migrations have
+    run.
+    """
+    if ids is ALL:
+        _migrated.add(ALL)
+    else:
+        _migrated.update(ids)
+
+
+def rebuild_pending():
+    """
+    Return whether migrations asked for read model rows to be rebuilt.
+    """
+    return bool(_migrated)
+
+
+def rebuild_migrated():
+    """
+    Rebuild the read model rows migrations asked for, and drop the cached
+    responses built from the old rows.
+    """
+    if not _migrated:
+        return
+    if ALL in _migrated:
+        build_all()
+    else:
+        ids = list(_migrated)
+        for start in range(0, len(ids), settings.STREAM_CHUNK_SIZE):
+            build(ids[start:start + settings.STREAM_CHUNK_SIZE])
+    _migrated.clear()
+    response_cache.invalidate()
+
+
+def refresh(ids):
+    """
+    Rebuild the read model rows of the POIs with the given ids, now or at
+    the end of the enclosing deferred() block.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    pending = getattr(_state, 'pending', None)
+    if pending is not None:
+        pending.update(ids)
+    else:
+        build(ids)
+
+
+@contextmanager
+def deferred():
+    """
+    Collect the refreshes made inside the block and rebuild each POI once
+    when it ends, rather than once per change. The POIs are rebuilt even if
+    the block raises, as the changes it made before raising may already be
+    saved.
+    """
+    if getattr(_state, 'pending', None) is not None:
+        yield
+        return
+
+    _state.pending = set()
+    try:
+        yield
+    finally:
+        pending, _state.pending = _state.pending, None
+        build(pending)
+
+
+def load(queryset, limit=None, distance=False):
+    """
+    Return the JSON of the first <limit> rows of a PointOfInterestFragment
+    queryset, in its order.
+
+    If <distance> is set, the queryset must select a 'distance' in meters
+    (see functions.order_by_distance), which is added to each POI in miles.
+    """
+    if not distance:
+        return list(queryset.values_list('json', flat=True)[:limit])
+
+    return [with_distance(fragment, meters) for fragment, meters in
+            queryset.values_list('json', 'distance')[:limit]]
+
+
+def list_json(queryset, limit=None, distance=False, error=None,
+              empty_error=None):
+    """
+    Return the body of a list response: the JSON of the first <limit> rows
+    of a PointOfInterestFragment queryset as "pointsofinterest", along with
+    <error>, or <empty_error> if there are none. <distance> is as for load().
+
+    With POI_JSON_IN_DATABASE set, PostgreSQL assembles the whole body and
+    returns it as a single value, so no rows are read into Python.
+    """
+    if settings.POI_JSON_IN_DATABASE:
+        return list_json_in_database(
+            queryset, limit, distance, error, empty_error)
+
+    pois = load(queryset, limit, distance)
+    if not pois:
+        error = empty_error
+    return '{"pointsofinterest": %s, "error": %s}' % (
+        join(pois), json.dumps(error))
+
+
+def list_json_in_database(queryset, limit, distance, error, empty_error):
+    """
+    Build list_json()'s body with string_agg, in the queryset's order.
+
+    A subquery's order isn't kept by the query around it, so the rows are
+    aggregated in an explicit order: nearest first if <distance> is set, as
+    order_by_distance() orders them, and by POI id otherwise or on ties.
+    """
+    pk = PointOfInterestFragment._meta.pk.column
+    names = ['json', 'distance', 'pk'] if distance else ['json', 'pk']
+    rows, params = queryset.values(*names)[:limit].query.sql_with_params()
+    order = ['q.%s' % connection.ops.quote_name(pk)]
+    if distance:
+        order.insert(0, 'q."distance"')
+
+    poi = 'q."json"'
+    poi_params = []
+    if distance:
+        # As with_distance() does in Python
+        poi = """left(q."json", -1) || ', "distance": ' ||
+                 (q."distance" / %s)::text || '}'"""
+        poi_params = [D(mi=1).m]
+
+    sql = """
+        SELECT '{"pointsofinterest": [' ||
+               coalesce(string_agg(%s, ', ' ORDER BY %s), '') ||
+               '], "error": ' ||
+               CASE WHEN count(*) = 0 THEN %%s ELSE %%s END || '}'
+        FROM (%s) AS q""" % (poi, ', '.join(order), rows)
+
+    cursor = connection.cursor()
+    cursor.execute(sql, poi_params + [
+        json.dumps(empty_error), json.dumps(error)] + list(params))
+    return cursor.fetchone()[0]
+
+
+def get(queryset):
+    """
+    Return the JSON of the single POI matched by a PointOfInterestFragment
+    queryset, raising DoesNotExist like QuerySet.get() if there is none.
+    """
+    pois = load(queryset, 1)
+    if not pois:
+        raise PointOfInterest.DoesNotExist(
+            "%s matching query does not exist." %
+            PointOfInterest._meta.object_name)
+    return pois[0]
+
+
+def stream_geojson(queryset, limit=None, distance=False, error=None):
+    """
+    Yield a PointOfInterestFragment queryset as a GeoJSON FeatureCollection,
+    piece by piece. The error block is added to the collection as an 'error'
+    member.
+
+    Rows are read from a server-side cursor, so memory use doesn't depend on
+    the number of POIs.
+    """
+    encoder = PointOfInterestEncoder()
+    names = ['json', 'distance'] if distance else ['json']
+    yield '{"type": "FeatureCollection", "features": ['
+
+    count = 0
+    for rows in stream_rows(queryset.values(*names)[:limit]):
+        for row in rows:
+            poi = json.loads(row['json'])
+            if distance:
+                poi['distance'] = D(m=row['distance']).mi
+            feature = {
+                'type': 'Feature',
+                'id': poi['id'],
+                'geometry': {
+                    'type': 'Point',
+                    'coordinates': [poi.pop('lng'), poi.pop('lat')]
+                },
+                'properties': poi
+            }
+            yield (',' if count else '') + encoder.encode(feature)
+            count += 1
+
+    if not count:
+        error = {
+            "status": True,
+            "name": "No PointsOfInterest",
+            "text": "No PointsOfInterest found",
+            "level": "Information",
+            "debug": ""
+        }
+    yield '], "error": %s}' % encoder.encode(error)
+
+
+def with_distance(fragment, meters):
+    """
+    Add a distance in meters to a POI's JSON, in miles, without decoding it.
+    """
+    return '%s, "distance": %s}' % (fragment[:-1], json.dumps(D(m=meters).mi))
+
+
+def with_error(fragment, error):
+    """
+    Add an error block to a POI's JSON, without decoding it.
+    """
+    return '%s, "error": %s}' % (fragment[:-1], json.dumps(error))
+
+
+def join(fragments):
+    """
+    Return a list of fragments as a JSON array.
+    """
+    return '[%s]' % ', '.join(fragments)
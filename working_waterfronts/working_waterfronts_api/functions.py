@@ -1,43 +1,129 @@
-import requests
+import calendar
+import datetime
+import hashlib
+
 from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F, Max
+from django.utils import timezone
+from django.utils.http import (
+    http_date, parse_http_date_safe, parse_etags, quote_etag)
 
-from django.contrib.gis.geos import fromstr
+from django.contrib.gis.geos import fromstr, Polygon
+from django.contrib.gis.measure import D
 
+from working_waterfronts.working_waterfronts_api.models import GeocodeCache
+from working_waterfronts.working_waterfronts_api.geocoders import (
+    BadAddressException, GeocodingError, get_geocoder, normalize_address,
+    full_address)
 
-class BadAddressException(Exception):
 
+def location_geography(model):
     """
-    The exception thrown if the address passed in invalid.
+    Return the SQL for the geography form of a model's location. Both
+    PointOfInterest and PointOfInterestFragment have a GiST index on it (see
+    migrations 0004 and 0007), so predicates written against it can use the
+    index.
     """
+    return 'geography(%s.%s)' % (
+        connection.ops.quote_name(model._meta.db_table),
+        connection.ops.quote_name(model._meta.get_field('location').column))
 
 
 def coordinates_from_address(street, city, state, zip):
     """
     This function returns a list of the coordinates from the address
-    passed using the Google Geocoding API. If the address given does not
-    return an exact coordinates (for instance, if the address can only be
-    located down to the city), a BadAddressException is thrown.
+    passed using the geocoder configured by GEOCODER (see geocoders.py). If
+    the address given does not return an exact coordinates (for instance,
+    if the address can only be located down to the city), a
+    BadAddressException is thrown.
+
+    Results are cached in GeocodeCache, so known addresses are answered
+    without calling the geocoder. Cached results are refreshed after
+    GEOCODE_CACHE_TTL seconds; if the geocoder fails then, the cached
+    result is used anyway.
 
     TODO: this should probably return a tuple, rather than a list.
     """
     try:
-        full_address = street + ", " + city + ", " + state + " " + zip
-        base_url = "https://maps.googleapis.com/maps/api/geocode/json?address="
+        return geocode_address(street, city, state, zip)
+    except GeocodingError:
+        raise BadAddressException(
+            "Address %s not found" % full_address(street, city, state, zip))
+
+
+def geocode_address(street, city, state, zip):
+    """
+    As coordinates_from_address, but raises GeocodingError if the geocoder
+    failed and the address isn't cached, so callers can try again later.
+    """
+    address = normalize_address(street, city, state, zip)
+
+    cached = GeocodeCache.objects.filter(address=address).first()
+    if cached and cached.geocoded > cache_expiry():
+        return cached_coordinates(
+            cached, full_address(street, city, state, zip))
+
+    try:
+        lat, lng = get_geocoder().geocode(street, city, state, zip)
+    except GeocodingError:
+        if cached:
+            return cached_coordinates(
+                cached, full_address(street, city, state, zip))
+        raise
+    except BadAddressException:
+        lat, lng = None, None
+
+    store_coordinates(address, lat, lng)
+    if lat is None:
+        raise BadAddressException(
+            "Address %s not found" % full_address(street, city, state, zip))
+    return [lat, lng]
+
+
+def coordinates_from_cache(street, city, state, zip):
+    """
+    Return the coordinates of an address from the GeocodeCache without
+    calling the geocoder, or None if the address isn't cached or its result
+    needs refreshing. Raises BadAddressException for addresses cached as
+    not found.
+    """
+    cached = GeocodeCache.objects.filter(
+        address=normalize_address(street, city, state, zip),
+        geocoded__gt=cache_expiry()).first()
+    if cached is None:
+        return None
+    return cached_coordinates(
+        cached, full_address(street, city, state, zip))
+
 
-        response = requests.get(base_url + full_address)
-        location_data = response.json()
+def store_coordinates(address, lat, lng):
+    """
+    Cache the coordinates the geocoder gave for a normalized address, or
+    None for an address it couldn't locate, counting the miss.
+    """
+    cached, created = GeocodeCache.objects.get_or_create(
+        address=address, defaults={'geocoded': timezone.now()})
+    GeocodeCache.objects.filter(pk=cached.pk).update(
+        lat=lat, lng=lng, geocoded=timezone.now(), misses=F('misses') + 1)
 
-        if location_data['results'][0][
-                'geometry']['location_type'] == 'APPROXIMATE':
-            raise BadAddressException("Address %s not found" % full_address)
 
-        lat = float(location_data['results'][0]['geometry']['location']['lat'])
-        long = float(
-            location_data['results'][0]['geometry']['location']['lng'])
+def cache_expiry():
+    """
+    Return the time before which GeocodeCache results need refreshing.
+    """
+    return timezone.now() - datetime.timedelta(
+        seconds=settings.GEOCODE_CACHE_TTL)
+
 
-        return [lat, long]
-    except:
+def cached_coordinates(cached, full_address):
+    """
+    Return the coordinates of a GeocodeCache row, counting the hit.
+    """
+    GeocodeCache.objects.filter(pk=cached.pk).update(hits=F('hits') + 1)
+    if cached.lat is None:
         raise BadAddressException("Address %s not found" % full_address)
+    return [cached.lat, cached.lng]
 
 
 def get_lat_long_prox(request, error=None):
@@ -88,6 +174,107 @@ def get_lat_long_prox(request, error=None):
     return [point, proximity, limit, error]
 
 
+def get_bbox(request, error=None):
+    """
+    Parse the bounding box requested by the user, given as
+    bbox=minLng,minLat,maxLng,maxLat, into a Polygon.
+
+    If the parsing results in an error, the error block is updated to reflect
+    that error and no bounding box is returned.
+    """
+    bbox = request.GET.get('bbox', None)
+    if bbox is None:
+        return [None, error]
+    try:
+        min_lng, min_lat, max_lng, max_lat = [
+            float(c) for c in bbox.split(',')]
+
+        if not (-180 <= min_lng <= max_lng <= 180):
+            raise ValueError("Longitudes must be ordered and within "
+                             "-180 and 180")
+        if not (-90 <= min_lat <= max_lat <= 90):
+            raise ValueError("Latitudes must be ordered and within "
+                             "-90 and 90")
+
+        polygon = Polygon.from_bbox((min_lng, min_lat, max_lng, max_lat))
+        polygon.srid = 4326
+        return [polygon, error]
+    except Exception as e:
+        error = {
+            "level": "Warning",
+            "status": True,
+            "name": "Bad bounding box",
+            "text": "There was an error with the given bounding box "
+                    "{0}".format(bbox),
+            'debug': "{0}: {1}".format(type(e).__name__, str(e))
+        }
+        return [None, error]
+
+
+def within_proximity(queryset, point, proximity):
+    """
+    Filter a PointOfInterest or PointOfInterestFragment queryset down to the
+    POIs within <proximity> miles of <point>.
+
+    This is equivalent to location__distance_lte, which is evaluated with
+    ST_Distance_Sphere and has to scan the whole table. ST_DWithin on the
+    indexed geography column gives the same (spherical) result using the
+    index.
+    """
+    return queryset.extra(
+        where=['ST_DWithin(%s, ST_GeogFromText(%%s), %%s, false)' %
+               location_geography(queryset.model)],
+        params=[point.ewkt, D(mi=proximity).m])
+
+
+def order_by_distance(queryset, point):
+    """
+    Order a PointOfInterest or PointOfInterestFragment queryset nearest
+    first from <point>, selecting the distance in meters as 'distance'.
+
+    The ordering uses the <-> KNN operator on the indexed geography column,
+    so PostGIS can walk the index in distance order instead of sorting the
+    whole result.
+    """
+    return queryset.extra(
+        select={'distance': '%s <-> ST_GeogFromText(%%s)' %
+                location_geography(queryset.model)},
+        select_params=[point.ewkt],
+        order_by=['distance'])
+
+
+def get_order(request, error=None):
+    """
+    Return the ordering requested by the user. The only ordering supported
+    is 'distance', which requires a lat and lng.
+
+    If the ordering results in an error, the error block is updated to
+    reflect that error.
+    """
+    order = request.GET.get('order', None)
+    if order is None:
+        return [order, error]
+    if order != 'distance':
+        error = {
+            'debug': "Unknown order: {0}".format(order),
+            'status': True,
+            'level': 'Warning',
+            'text': 'Invalid order. Returning unordered results.',
+            'name': 'Bad Order'
+        }
+        return [None, error]
+    if not (request.GET.get('lat') and request.GET.get('lng')):
+        error = {
+            'debug': "Ordering by distance requires lat and lng",
+            'status': True,
+            'level': 'Warning',
+            'text': 'No location given. Returning unordered results.',
+            'name': 'Bad Order'
+        }
+        return [None, error]
+    return [order, error]
+
+
 def get_limit(request, error=None):
     """
     Return the limit requested by the user.
@@ -109,3 +296,173 @@ def get_limit(request, error=None):
             'name': 'Bad Limit'
         }
         return [None, error]
+
+
+def get_count(request, error=None):
+    """
+    Return the number of nearest results requested by the user with the
+    'n' parameter, capped at MAX_NEAREST_COUNT.
+
+    If the count results in an error, the error block is updated to reflect
+    that error.
+    """
+    count = request.GET.get('n', None)
+    if count is None:
+        return [settings.DEFAULT_NEAREST_COUNT, error]
+    try:
+        count = int(count)
+        if count < 1:
+            raise ValueError("n must be positive, got %d" % count)
+        return [min(count, settings.MAX_NEAREST_COUNT), error]
+    except Exception as e:
+        error = {
+            'debug': "{0}: {1}".format(type(e).__name__, str(e)),
+            'status': True,
+            'level': 'Warning',
+            'text': 'Invalid n. Returning the {0} nearest results.'.format(
+                settings.DEFAULT_NEAREST_COUNT),
+            'name': 'Bad Count'
+        }
+        return [settings.DEFAULT_NEAREST_COUNT, error]
+
+
+def get_zoom(request, error=None):
+    """
+    Return the map zoom level requested by the user, between 0 and
+    MAX_CLUSTER_ZOOM.
+
+    If the zoom is missing or invalid, the error block is updated to reflect
+    that error and no zoom is returned.
+    """
+    zoom = request.GET.get('zoom', None)
+    try:
+        zoom = int(zoom)
+        if not 0 <= zoom <= settings.MAX_CLUSTER_ZOOM:
+            raise ValueError("zoom must be between 0 and {0}".format(
+                settings.MAX_CLUSTER_ZOOM))
+        return [zoom, error]
+    except Exception as e:
+        error = {
+            'debug': "{0}: {1}".format(type(e).__name__, str(e)),
+            'status': True,
+            'level': 'Error',
+            'text': 'A zoom between 0 and {0} is required'.format(
+                settings.MAX_CLUSTER_ZOOM),
+            'name': 'Bad Zoom'
+        }
+        return [None, error]
+
+
+def cluster_pois(queryset, zoom):
+    """
+    Group the POIs in a PointOfInterestFragment queryset into square grid
+    cells sized for the map zoom level, returning a list of clusters with
+    their POI count, centroid, cell bounds and count of POIs per category.
+
+    A cell is CLUSTER_CELL_PIXELS wide on a 256 pixel map tile. The grouping
+    is done by PostGIS with ST_SnapToGrid, so no POIs are loaded.
+    """
+    size = 360.0 / 2 ** zoom * settings.CLUSTER_CELL_PIXELS / 256
+    pk = connection.ops.quote_name(queryset.model._meta.pk.column)
+    ids, params = queryset.values('pk').query.sql_with_params()
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+
+    cursor = connection.cursor()
+    cell_sql = """
+        SELECT ST_X(cell), ST_Y(cell), count(*),
+               ST_X(ST_Centroid(ST_Collect(location))),
+               ST_Y(ST_Centroid(ST_Collect(location)))
+        FROM (SELECT ST_SnapToGrid(location, %%s) AS cell, location
+              FROM %s WHERE %s IN (%s)) AS cells
+        GROUP BY cell""" % (table, pk, ids)
+    cursor.execute(cell_sql, [size] + list(params))
+
+    clusters = {}
+    for x, y, count, lng, lat in cursor.fetchall():
+        clusters[(x, y)] = {
+            'count': count,
+            'lat': lat,
+            'lng': lng,
+            'bbox': [x - size / 2, y - size / 2, x + size / 2, y + size / 2],
+            'categories': []
+        }
+    ordered = sorted(clusters.values(), key=lambda c: -c['count'])
+
+    category_sql = """
+        SELECT ST_X(cell), ST_Y(cell), category_id, count(*)
+        FROM (SELECT ST_SnapToGrid(location, %%s) AS cell,
+                     unnest(categories) AS category_id
+              FROM %s WHERE %s IN (%s)) AS cells
+        GROUP BY cell, category_id
+        ORDER BY category_id""" % (table, pk, ids)
+    cursor.execute(category_sql, [size] + list(params))
+
+    for x, y, category, count in cursor.fetchall():
+        clusters[(x, y)]['categories'].append({
+            'id': category,
+            'count': count
+        })
+
+    return ordered
+
+
+def poi_validators(queryset):
+    """
+    Return an ETag and Last-Modified timestamp for a response built from a
+    PointOfInterestFragment queryset, without building the response.
+
+    They are derived from the number of POIs in the queryset and the time
+    the latest of them was updated. A POI's row is updated whenever it or
+    anything it embeds changes, so any edit or deletion that could change
+    the response changes the ETag.
+
+    The Last-Modified timestamp doesn't move when a POI is deleted or no
+    longer matches the queryset, so it is informative only: conditional
+    requests for these responses are answered with etag_matches().
+    """
+    stats = queryset.aggregate(count=Count('pk'), updated=Max('updated'))
+
+    etag = hashlib.md5(
+        '%s:%s' % (stats['count'], stats['updated'])).hexdigest()
+
+    last_modified = None
+    if stats['updated']:
+        last_modified = calendar.timegm(stats['updated'].utctimetuple())
+
+    return [etag, last_modified]
+
+
+def etag_matches(request, etag):
+    """
+    Return whether the client's cached copy, described by its If-None-Match
+    header, is still current. If-Modified-Since is ignored.
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags
+
+
+def not_modified(request, etag, last_modified):
+    """
+    Return whether the client's cached copy, described by its If-None-Match
+    or If-Modified-Since header, is still current.
+    """
+    if request.META.get('HTTP_IF_NONE_MATCH'):
+        return etag_matches(request, etag)
+
+    if_modified_since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return bool(if_modified_since and last_modified and
+                last_modified <= if_modified_since)
+
+
+def set_validators(response, etag, last_modified):
+    """
+    Add the ETag and Last-Modified headers to a response.
+    """
+    response['ETag'] = quote_etag(etag)
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,113 @@
+import datetime
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from working_waterfronts.working_waterfronts_api.models import (
+    PointOfInterest, GeocodeJob)
+from working_waterfronts.working_waterfronts_api.functions import (
+    geocode_address, BadAddressException, GeocodingError)
+
+
+def enqueue(poi):
+    """
+    Queue the geocoding of a pending POI's address, replacing any job
+    already queued for it. A worker still running the replaced job throws
+    its result away.
+    """
+    with transaction.atomic():
+        GeocodeJob.objects.filter(pointofinterest=poi).delete()
+        GeocodeJob.objects.create(
+            pointofinterest=poi, run_after=timezone.now())
+
+
+def cancel(poi):
+    """
+    Drop the job queued for a POI, if there is one.
+    """
+    GeocodeJob.objects.filter(pointofinterest=poi).delete()
+
+
+def claim():
+    """
+    Lock and return the next job that is due, or None if there are none.
+
+    A job is claimed with an UPDATE conditional on its lock being unchanged,
+    so any number of workers can share the queue without running a job
+    twice.
+    """
+    while True:
+        now = timezone.now()
+        stale = now - datetime.timedelta(
+            seconds=settings.GEOCODE_JOB_LOCK_TIMEOUT)
+        jobs = list(GeocodeJob.objects.filter(
+            Q(locked=None) | Q(locked__lt=stale),
+            run_after__lte=now).order_by('run_after')[:10])
+        if not jobs:
+            return None
+
+        for job in jobs:
+            if GeocodeJob.objects.filter(
+                    pk=job.pk, locked=job.locked).update(locked=now):
+                job.locked = now
+                return job
+
+
+def run(job):
+    """
+    Geocode the address of a claimed job's POI and store the result.
+
+    If the geocoder can't be reached the job is put back, to be retried
+    after GEOCODE_JOB_RETRY seconds, doubling for each failure.
+    """
+    poi = PointOfInterest.objects.filter(pk=job.pointofinterest_id).first()
+    if poi is None:
+        return
+    try:
+        lat, lng = geocode_address(poi.street, poi.city, poi.state, poi.zip)
+        location = Point(lng, lat, srid=4326)
+        status = PointOfInterest.LOCATED
+    except BadAddressException:
+        location = None
+        status = PointOfInterest.FAILED
+    except GeocodingError as e:
+        delay = min(settings.GEOCODE_JOB_RETRY * 2 ** job.attempts,
+                    settings.GEOCODE_JOB_RETRY_MAX)
+        GeocodeJob.objects.filter(pk=job.pk, locked=job.locked).update(
+            locked=None, attempts=F('attempts') + 1,
+            run_after=timezone.now() + datetime.timedelta(seconds=delay),
+            error="{0}: {1}".format(type(e).__name__, str(e)))
+        return
+
+    with transaction.atomic():
+        # Give up if the job was replaced or cancelled by an edit while the
+        # address was being geocoded
+        if GeocodeJob.objects.select_for_update().filter(
+                pk=job.pk, locked=job.locked).first() is None:
+            return
+        GeocodeJob.objects.filter(pk=job.pk).delete()
+
+        poi = PointOfInterest.objects.select_for_update().filter(
+            pk=poi.pk).first()
+        if poi is None:
+            return
+        if location is not None:
+            poi.location = location
+        poi.location_status = status
+        poi.save()
+
+
+def run_pending():
+    """
+    Run jobs until none are due, returning the number run.
+    """
+    count = 0
+    while True:
+        job = claim()
+        if job is None:
+            return count
+        run(job)
+        count += 1
@@ -0,0 +1,214 @@
+import csv
+import re
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BadAddressException(Exception):
+
+    """
+    The exception thrown if the address passed in invalid.
+    """
+
+
+class GeocodingError(Exception):
+
+    """
+    The exception thrown if the geocoding service couldn't be reached or
+    refused the request, which says nothing about the address.
+    """
+
+
+def normalize_address(street, city, state, zip):
+    """
+    Return an address in the form used to key the geocoding cache and
+    gazetteer: lower case, without periods or commas, and with whitespace
+    collapsed.
+    """
+    parts = [street, city, state, zip]
+    return ', '.join(
+        ' '.join(re.sub(r',', ' ', (part or '').replace('.', ''))
+                 .lower().split())
+        for part in parts)
+
+
+def full_address(street, city, state, zip):
+    return street + ", " + city + ", " + state + " " + zip
+
+
+class Geocoder(object):
+
+    """
+    A geocoding backend. GEOCODER names the class used by
+    functions.coordinates_from_address.
+    """
+
+    def geocode(self, street, city, state, zip):
+        """
+        Return the [lat, lng] of an address.
+
+        Raises BadAddressException if the address can't be located exactly,
+        or GeocodingError if the backend failed.
+        """
+        raise NotImplementedError
+
+
+class GoogleGeocoder(Geocoder):
+
+    """
+    Geocodes with the Google Geocoding API.
+
+    Requests share a pooled session and time out after GEOCODE_TIMEOUT
+    (connect, read) seconds. Failed requests are retried GEOCODE_RETRIES
+    times, waiting GEOCODE_BACKOFF seconds and doubling the wait each time.
+
+    After GEOCODE_BREAKER_FAILURES failed lookups in a row the circuit
+    breaker opens, and lookups fail at once for GEOCODE_BREAKER_RESET
+    seconds. Then a single lookup is let through to test the service.
+    """
+    url = "https://maps.googleapis.com/maps/api/geocode/json"
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened = None
+
+    def geocode(self, street, city, state, zip):
+        self.before_request()
+        try:
+            location = self.request(full_address(street, city, state, zip))
+        except GeocodingError:
+            self.failed()
+            raise
+        except BadAddressException:
+            # The service answered, so it is up
+            self.succeeded()
+            raise
+        self.succeeded()
+        return location
+
+    def request(self, address):
+        """
+        Look up an address, retrying failures with backoff.
+        """
+        backoff = settings.GEOCODE_BACKOFF
+        for attempt in range(settings.GEOCODE_RETRIES + 1):
+            if attempt:
+                time.sleep(backoff)
+                backoff *= 2
+            try:
+                response = self.session.get(
+                    self.url, params={'address': address},
+                    timeout=settings.GEOCODE_TIMEOUT)
+                return self.parse(address, response)
+            except requests.RequestException as e:
+                error = GeocodingError(
+                    "{0}: {1}".format(type(e).__name__, str(e)))
+            except GeocodingError as e:
+                error = e
+        raise error
+
+    def parse(self, address, response):
+        """
+        Return the [lat, lng] in an API response.
+        """
+        if response.status_code >= 500:
+            raise GeocodingError(
+                "Geocoding API returned HTTP %d" % response.status_code)
+        try:
+            location_data = response.json()
+        except ValueError as e:
+            raise GeocodingError("{0}: {1}".format(type(e).__name__, str(e)))
+
+        status = location_data.get('status')
+        # INVALID_REQUEST is answered for an address with nothing to look
+        # up, which would get the same answer if it were retried
+        if status in ('ZERO_RESULTS', 'INVALID_REQUEST'):
+            raise BadAddressException("Address %s not found" % address)
+        if status != 'OK':
+            raise GeocodingError("Geocoding API returned %s" % status)
+
+        try:
+            geometry = location_data['results'][0]['geometry']
+            if geometry['location_type'] == 'APPROXIMATE':
+                raise BadAddressException("Address %s not found" % address)
+
+            return [float(geometry['location']['lat']),
+                    float(geometry['location']['lng'])]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise BadAddressException("Address %s not found" % address)
+
+    def before_request(self):
+        """
+        Fail at once while the circuit breaker is open. Once it has been
+        open GEOCODE_BREAKER_RESET seconds, let one lookup through.
+        """
+        with self.lock:
+            if self.opened is None:
+                return
+            if time.time() - self.opened < settings.GEOCODE_BREAKER_RESET:
+                raise GeocodingError("Geocoding API circuit breaker is open")
+            self.opened = time.time()
+
+    def failed(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= settings.GEOCODE_BREAKER_FAILURES:
+                self.opened = time.time()
+
+    def succeeded(self):
+        with self.lock:
+            self.failures = 0
+            self.opened = None
+
+
+class GazetteerGeocoder(Geocoder):
+
+    """
+    Geocodes from the CSV file at GEOCODER_GAZETTEER, which has a street,
+    city, state, zip, lat and lng on each row. Lines starting with # are
+    ignored.
+
+    It needs no network access, so it stands in for the API in tests and
+    air-gapped deployments. Addresses are matched in normalized form.
+    """
+
+    def __init__(self):
+        self.locations = {}
+        with open(settings.GEOCODER_GAZETTEER) as gazetteer:
+            for row in csv.reader(gazetteer):
+                if not row or row[0].startswith('#'):
+                    continue
+                street, city, state, zip, lat, lng = row
+                self.locations[normalize_address(street, city, state, zip)] = [
+                    float(lat), float(lng)]
+
+    def geocode(self, street, city, state, zip):
+        try:
+            return list(self.locations[
+                normalize_address(street, city, state, zip)])
+        except KeyError:
+            raise BadAddressException("Address %s not found" % full_address(
+                street, city, state, zip))
+
+
+# Geocoders by GEOCODER and GEOCODER_GAZETTEER, so sessions and circuit
+# breakers are shared by every lookup
+_geocoders = {}
+_geocoders_lock = threading.Lock()
+
+
+def get_geocoder():
+    """
+    Return the geocoder configured by GEOCODER.
+    """
+    key = (settings.GEOCODER, settings.GEOCODER_GAZETTEER)
+    with _geocoders_lock:
+        if key not in _geocoders:
+            _geocoders[key] = import_string(settings.GEOCODER)()
+        return _geocoders[key]
@@ -0,0 +1,365 @@
+import csv
+import json
+import re
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from working_waterfronts.working_waterfronts_api import (
+    fragments, response_cache, tiles)
+from working_waterfronts.working_waterfronts_api.forms import (
+    PointOfInterestForm)
+from working_waterfronts.working_waterfronts_api.functions import (
+    cache_expiry, store_coordinates, normalize_address, BadAddressException,
+    GeocodingError)
+from working_waterfronts.working_waterfronts_api.geocoders import (
+    get_geocoder)
+from working_waterfronts.working_waterfronts_api.models import (
+    PointOfInterest, Image, Video, Hazard, Category, GeocodeJob,
+    GeocodeCache)
+
+# The related objects a row can name, with the field they are named by
+RELATED = [
+    ('categories', Category, 'category'),
+    ('hazards', Hazard, 'name'),
+    ('images', Image, 'name'),
+    ('videos', Video, 'name')
+]
+
+# The start of a FeatureCollection's features array
+FEATURES = re.compile(r'"features"\s*:\s*\[')
+
+
+class RowError(Exception):
+
+    """
+    The exception thrown if a row can't be imported.
+    """
+
+
+class RateLimiter(object):
+
+    """
+    Spaces calls to wait() at least 1/<rate> seconds apart, across threads.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next = time.time()
+
+    def wait(self):
+        with self.lock:
+            now = time.time()
+            delay = self.next - now
+            self.next = max(self.next, now) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def read_csv(f):
+    """
+    Yield the (line number, row) of each row of a UTF-8 CSV file with a
+    header row naming the columns. Related objects are separated by
+    semicolons, e.g. "Lighthouse;Museum".
+    """
+    reader = csv.DictReader(f)
+    for row in reader:
+        yield reader.line_num, dict(
+            (name, (value or '').decode('utf-8'))
+            for name, value in row.items() if name)
+
+
+def read_geojson(f, chunk_size=64 * 1024):
+    """
+    Yield the (feature number, row) of each Point Feature in a GeoJSON
+    FeatureCollection, with the Feature's properties as the columns.
+
+    The file is read <chunk_size> characters at a time and each Feature is
+    decoded on its own, so memory use doesn't depend on the size of the
+    collection.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+
+    while True:
+        match = FEATURES.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        if eof:
+            raise ValueError("No features array found")
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        # Keep the end of the buffer, in case the match spans two chunks
+        buffer = buffer[-32:] + chunk
+
+    number = 0
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,')
+        if buffer.startswith(']'):
+            return
+        try:
+            feature, end = decoder.raw_decode(buffer)
+        except ValueError:
+            if eof:
+                raise
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+
+        buffer = buffer[end:]
+        number += 1
+        yield number, feature_row(feature)
+
+
+def feature_row(feature):
+    """
+    Return the row for a GeoJSON Feature.
+    """
+    row = dict(feature.get('properties') or {})
+    geometry = feature.get('geometry')
+    if geometry:
+        if geometry.get('type') != 'Point':
+            row['geometry_error'] = "Only Point geometries can be imported."
+        else:
+            row['longitude'], row['latitude'] = geometry['coordinates'][:2]
+    return row
+
+
+class ImportRow(object):
+
+    """
+    A validated row: the unsaved POI, and the ids of its related objects.
+    """
+
+    def __init__(self, number, poi, related):
+        self.number = number
+        self.poi = poi
+        self.related = related
+
+
+class Importer(object):
+
+    """
+    Imports rows of POI field values, as yielded by read_csv and
+    read_geojson.
+
+    Rows are validated with PointOfInterestForm and saved IMPORT_BATCH_SIZE
+    at a time, with a handful of queries per batch. A row may give its
+    coordinates as latitude and longitude, or leave them out to have its
+    address geocoded. Addresses are geocoded IMPORT_GEOCODE_THREADS at a
+    time, at most IMPORT_GEOCODE_RATE per second. Rows the geocoder couldn't
+    be reached for are imported pending, for the geocode_pois worker.
+
+    Related objects are named by id or by name (a category by its category,
+    anything else by its name), and must already exist.
+
+    Rows that can't be imported are skipped, and listed in errors with the
+    reason.
+    """
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.created = 0
+        self.pending = 0
+        self.errors = []
+
+        # The ids of the related objects, by id and by lower-cased name
+        self.related = {}
+        for name, model, field in RELATED:
+            ids = {}
+            for id, value in model.objects.values_list('id', field):
+                ids[unicode(id)] = id
+                ids.setdefault(value.strip().lower(), id)
+            self.related[name] = ids
+
+        self.limiter = RateLimiter(settings.IMPORT_GEOCODE_RATE)
+
+    def run(self, rows):
+        """
+        Import an iterable of (number, row) pairs.
+        """
+        pool = ThreadPool(settings.IMPORT_GEOCODE_THREADS)
+        try:
+            batch = []
+            for number, row in rows:
+                try:
+                    batch.append(self.prepare(number, row))
+                except RowError as e:
+                    self.errors.append((number, unicode(e)))
+                if len(batch) >= self.batch_size:
+                    self.save(batch, pool)
+                    batch = []
+            if batch:
+                self.save(batch, pool)
+        finally:
+            pool.close()
+            pool.join()
+
+    def prepare(self, number, row):
+        """
+        Validate a row, returning an ImportRow.
+        """
+        if row.get('geometry_error'):
+            raise RowError(row['geometry_error'])
+
+        data = {}
+        for name in PointOfInterestForm.base_fields:
+            if name not in self.related:
+                value = row.get(name)
+                data[name] = '' if value is None else value
+        form = PointOfInterestForm(data)
+        if not form.is_valid():
+            raise RowError('; '.join(
+                '%s: %s' % (name, ' '.join(errors))
+                for name, errors in sorted(form.errors.items())))
+        poi = form.save(commit=False)
+
+        latitude = form.cleaned_data['latitude']
+        longitude = form.cleaned_data['longitude']
+        # 0 is a coordinate; only missing ones are geocoded
+        if latitude not in (None, '') and longitude not in (None, ''):
+            try:
+                poi.location = Point(
+                    float(longitude), float(latitude), srid=4326)
+            except ValueError:
+                raise RowError("Invalid latitude or longitude.")
+
+        related = {}
+        for name, ids in self.related.items():
+            values = row.get(name) or []
+            if not isinstance(values, list):
+                values = unicode(values).split(';')
+            related[name] = []
+            for value in values:
+                value = unicode(value).strip().lower()
+                if not value:
+                    continue
+                if value not in ids:
+                    raise RowError("Unknown %s: %s" % (name, value))
+                if ids[value] not in related[name]:
+                    related[name].append(ids[value])
+
+        if not related['categories']:
+            raise RowError("You must choose at least one category.")
+        return ImportRow(number, poi, related)
+
+    def geocode(self, batch, pool):
+        """
+        Locate the POIs in a batch that have an address and no coordinates,
+        from the GeocodeCache if possible. Returns the batch without the
+        rows whose address wasn't found.
+        """
+        addresses = {}
+        for row in batch:
+            if row.poi.location is None:
+                poi = row.poi
+                address = [poi.street, poi.city, poi.state, poi.zip]
+                addresses.setdefault(
+                    normalize_address(*address), (address, []))[1].append(row)
+        if not addresses:
+            return batch
+
+        cached = GeocodeCache.objects.filter(
+            address__in=addresses.keys(), geocoded__gt=cache_expiry())
+        GeocodeCache.objects.filter(pk__in=[c.pk for c in cached]).update(
+            hits=F('hits') + 1)
+        results = dict((c.address, [c.lat, c.lng]) for c in cached)
+
+        # Only the geocoder is called from the pool, so its threads never
+        # touch the database
+        uncached = [key for key in addresses if key not in results]
+        for key, result in zip(uncached, pool.map(
+                self.call_geocoder,
+                [addresses[key][0] for key in uncached])):
+            if isinstance(result, GeocodingError):
+                continue
+            results[key] = [None, None] \
+                if isinstance(result, BadAddressException) else result
+            store_coordinates(key, *results[key])
+
+        failed = set()
+        for key, (address, rows) in addresses.items():
+            lat, lng = results.get(key, [None, None])
+            for row in rows:
+                if key not in results:
+                    row.poi.location_status = PointOfInterest.PENDING
+                elif lat is None:
+                    self.errors.append((
+                        row.number, "Address %s not found" % ', '.join(
+                            address)))
+                    failed.add(row)
+                else:
+                    row.poi.location = Point(lng, lat, srid=4326)
+        return [row for row in batch if row not in failed]
+
+    def call_geocoder(self, address):
+        """
+        Geocode an address, returning the [lat, lng] or the exception the
+        geocoder raised.
+        """
+        self.limiter.wait()
+        try:
+            return get_geocoder().geocode(*address)
+        except (BadAddressException, GeocodingError) as e:
+            return e
+
+    def save(self, batch, pool):
+        """
+        Geocode and create a batch of POIs, with their related objects.
+        """
+        batch = self.geocode(batch, pool)
+        if not batch:
+            return
+
+        with transaction.atomic():
+            ids = reserve_ids(PointOfInterest, len(batch))
+            for row, id in zip(batch, ids):
+                row.poi.id = id
+            PointOfInterest.objects.bulk_create([row.poi for row in batch])
+
+            for name, model, field in RELATED:
+                m2m = PointOfInterest._meta.get_field(name)
+                through = m2m.rel.through
+                poi_column = m2m.m2m_field_name() + '_id'
+                related_column = m2m.m2m_reverse_field_name() + '_id'
+                through.objects.bulk_create([
+                    through(**{poi_column: row.poi.id, related_column: id})
+                    for row in batch for id in row.related[name]])
+
+            pending = [row.poi for row in batch
+                       if row.poi.location_status == PointOfInterest.PENDING]
+            GeocodeJob.objects.bulk_create([
+                GeocodeJob(pointofinterest=poi, run_after=timezone.now())
+                for poi in pending])
+
+        # bulk_create sends no signals, so do what their handlers would
+        fragments.build(ids)
+        tiles.invalidate_points([row.poi.location for row in batch])
+        response_cache.invalidate()
+
+        self.created += len(batch)
+        self.pending += len(pending)
+
+
+def reserve_ids(model, count):
+    """
+    Take <count> ids from the sequence of a model's primary key. bulk_create
+    doesn't return the ids of the rows it creates, so rows that others will
+    point to are given their ids up front.
+    """
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, %s)) "
+        "FROM generate_series(1, %s)",
+        [model._meta.db_table, model._meta.pk.column, count])
+    return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,49 @@
+import sys
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from working_waterfronts.working_waterfronts_api import exporter
+
+
+class Command(BaseCommand):
+    help = ("Export every point of interest with its relations as CSV, "
+            "GeoJSON or NDJSON, streaming it to standard output or a file.")
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--format', dest='format', default='csv',
+            choices=sorted(exporter.FORMATS),
+            help="csv (the default), geojson or ndjson."),
+        make_option(
+            '--since', dest='since',
+            help="Only export the points of interest modified after this "
+                 "ISO 8601 timestamp."),
+        make_option(
+            '--gzip', action='store_true', dest='gzip', default=False,
+            help="Gzip the output."),
+        make_option(
+            '--output', dest='output',
+            help="The file to write to, rather than standard output."),
+    )
+
+    def handle(self, *args, **options):
+        since = options['since']
+        if since is not None:
+            try:
+                since = exporter.parse_since(since)
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        chunks = exporter.export(options['format'], since)
+        if options['gzip']:
+            chunks = exporter.gzip_stream(chunks)
+
+        output = open(options['output'], 'wb') if options['output'] else \
+            options.get('stdout', sys.stdout)
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
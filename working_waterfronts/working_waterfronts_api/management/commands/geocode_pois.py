@@ -0,0 +1,28 @@
+import time
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from working_waterfronts.working_waterfronts_api import geocode_jobs
+
+
+class Command(BaseCommand):
+    help = ("Geocode the addresses of points of interest saved without "
+            "coordinates, checking for new ones every GEOCODE_POLL_INTERVAL "
+            "seconds.")
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--once', action='store_true', dest='once', default=False,
+            help="Run the jobs that are due, then exit."),
+    )
+
+    def handle(self, *args, **options):
+        while True:
+            count = geocode_jobs.run_pending()
+            if count:
+                self.stdout.write("Ran %d geocoding jobs." % count)
+            if options['once']:
+                return
+            time.sleep(settings.GEOCODE_POLL_INTERVAL)
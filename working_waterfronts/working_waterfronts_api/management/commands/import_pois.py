@@ -0,0 +1,52 @@
+import io
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from working_waterfronts.working_waterfronts_api import importer
+
+
+class Command(BaseCommand):
+    args = '<file>'
+    help = ("Import points of interest from a CSV or GeoJSON file. Columns "
+            "(or Feature properties) are named as the entry form's fields, "
+            "with categories, hazards, images and videos given by id or "
+            "name.")
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--format', dest='format', choices=['csv', 'geojson'],
+            help="The file's format. By default, files ending in .json or "
+                 ".geojson are read as GeoJSON and others as CSV."),
+        make_option(
+            '--batch-size', dest='batch_size', type='int',
+            help="Rows to save at a time (IMPORT_BATCH_SIZE by default)."),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("Give the file to import.")
+        path = args[0]
+
+        format = options['format']
+        if format is None:
+            format = 'geojson' if path.lower().endswith(
+                ('.json', '.geojson')) else 'csv'
+
+        pois = importer.Importer(options['batch_size'])
+        try:
+            if format == 'csv':
+                with open(path, 'rb') as f:
+                    pois.run(importer.read_csv(f))
+            else:
+                with io.open(path, encoding='utf-8') as f:
+                    pois.run(importer.read_geojson(f))
+        except (IOError, ValueError) as e:
+            raise CommandError("Couldn't read %s: %s" % (path, e))
+
+        for number, error in pois.errors:
+            self.stderr.write("Row %d: %s" % (number, error))
+        self.stdout.write(
+            "Imported %d points of interest (%d waiting to be geocoded), "
+            "skipped %d rows." % (pois.created, pois.pending,
+                                  len(pois.errors)))
@@ -0,0 +1,36 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from working_waterfronts.working_waterfronts_api import (
+    derivatives, fragments)
+from working_waterfronts.working_waterfronts_api.models import Image
+
+
+class Command(BaseCommand):
+    help = ("Make the resized derivatives of images that don't have them, "
+            "such as those uploaded before derivatives were made.")
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--all', action='store_true', dest='all', default=False,
+            help="Remake the derivatives of every image, e.g. after "
+                 "IMAGE_DERIVATIVE_SIZES has changed."),
+    )
+
+    def handle(self, *args, **options):
+        images = Image.objects.order_by('id')
+        if not options['all']:
+            images = images.filter(derivatives='[]')
+
+        count = 0
+        for image in images.iterator():
+            try:
+                with fragments.deferred():
+                    derivatives.generate(image)
+                    image.save()
+            except (IOError, ValueError) as e:
+                self.stderr.write("Image %d: %s" % (image.id, e))
+                continue
+            count += 1
+        self.stdout.write("Made the derivatives of %d images." % count)
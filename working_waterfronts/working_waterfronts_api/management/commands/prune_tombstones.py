@@ -0,0 +1,18 @@
+from django.core.management.base import NoArgsCommand
+
+from working_waterfronts.working_waterfronts_api.models import Tombstone
+from working_waterfronts.working_waterfronts_api.views.sync import (
+    tombstones_kept_since)
+
+
+class Command(NoArgsCommand):
+    help = ("Delete the records of objects deleted more than "
+            "TOMBSTONE_RETENTION seconds ago. Clients syncing since before "
+            "then get every object instead.")
+
+    def handle_noargs(self, **options):
+        tombstones = Tombstone.objects.filter(
+            deleted__lt=tombstones_kept_since())
+        count = tombstones.count()
+        tombstones.delete()
+        self.stdout.write("Pruned %d tombstones." % count)
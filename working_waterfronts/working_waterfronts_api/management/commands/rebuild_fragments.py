@@ -0,0 +1,13 @@
+from django.core.management.base import NoArgsCommand
+
+from working_waterfronts.working_waterfronts_api import (
+    fragments, response_cache)
+
+
+class Command(NoArgsCommand):
+    help = "Rebuild the read model row of every PointOfInterest."
+
+    def handle_noargs(self, **options):
+        count = fragments.build_all()
+        response_cache.invalidate()
+        self.stdout.write("Rebuilt %d points of interest." % count)
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('working_waterfronts_api', '0003_auto_20150123_2319'),
+    ]
+
+    # Proximity queries measure distances in meters on the geography
+    # representation of the location, which the geometry index can't serve.
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX working_waterfronts_api_pointofinterest_geog_id '
+            'ON working_waterfronts_api_pointofinterest '
+            'USING GIST (geography(location));',
+            'DROP INDEX working_waterfronts_api_pointofinterest_geog_id;'
+        ),
+    ]
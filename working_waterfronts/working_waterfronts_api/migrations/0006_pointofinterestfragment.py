@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('working_waterfronts_api', '0005_tombstone_modified_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointOfInterestFragment',
+            fields=[
+                ('pointofinterest', models.OneToOneField(
+                    related_name='fragment', primary_key=True,
+                    serialize=False,
+                    to='working_waterfronts_api.PointOfInterest')),
+                ('json', models.TextField()),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.contrib.gis.db.models.fields
+import working_waterfronts.working_waterfronts_api.fields
+from working_waterfronts.working_waterfronts_api import fragments
+
+
+def rebuild_fragments(apps, schema_editor):
+    # Built when migrate finishes, from the schema the later migrations make
+    fragments.rebuild_after_migrate()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('working_waterfronts_api', '0006_pointofinterestfragment'),
+    ]
+
+    # Fragments can always be rebuilt from the POIs, so the table is
+    # recreated with the new columns rather than altered, and refilled once
+    # migrate has finished.
+    operations = [
+        migrations.DeleteModel(
+            name='PointOfInterestFragment',
+        ),
+        migrations.CreateModel(
+            name='PointOfInterestFragment',
+            fields=[
+                ('pointofinterest', models.OneToOneField(
+                    related_name='fragment', primary_key=True,
+                    serialize=False,
+                    to='working_waterfronts_api.PointOfInterest')),
+                ('json', models.TextField()),
+                ('location', django.contrib.gis.db.models.fields.PointField(
+                    srid=4326)),
+                ('categories', working_waterfronts.working_waterfronts_api
+                    .fields.IntegerArrayField()),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        # Proximity filters and distance ordering use the geography form of
+        # the location, as on PointOfInterest (see 0004)
+        migrations.RunSQL(
+            'CREATE INDEX working_waterfronts_api_pointofinterestfragment_'
+            'geog_id ON working_waterfronts_api_pointofinterestfragment '
+            'USING GIST (geography(location));',
+            'DROP INDEX working_waterfronts_api_pointofinterestfragment_'
+            'geog_id;'
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX working_waterfronts_api_pointofinterestfragment_'
+            'categories_id ON working_waterfronts_api_pointofinterestfragment '
+            'USING GIN (categories);',
+            'DROP INDEX working_waterfronts_api_pointofinterestfragment_'
+            'categories_id;'
+        ),
+        migrations.RunPython(
+            rebuild_fragments, lambda apps, schema_editor: None),
+    ]
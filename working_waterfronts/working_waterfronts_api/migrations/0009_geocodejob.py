@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.contrib.gis.db.models.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('working_waterfronts_api', '0008_geocodecache'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pointofinterest',
+            name='location',
+            field=django.contrib.gis.db.models.fields.PointField(
+                srid=4326, null=True, blank=True),
+        ),
+        migrations.AddField(
+            model_name='pointofinterest',
+            name='location_status',
+            field=models.TextField(
+                default='located', editable=False,
+                choices=[('located', 'Located'),
+                         ('pending', 'Pending geocoding'),
+                         ('failed', 'Address not found')]),
+            preserve_default=True,
+        ),
+        migrations.CreateModel(
+            name='GeocodeJob',
+            fields=[
+                ('id', models.AutoField(
+                    verbose_name='ID', serialize=False, auto_created=True,
+                    primary_key=True)),
+                ('pointofinterest', models.OneToOneField(
+                    related_name='geocodejob',
+                    to='working_waterfronts_api.PointOfInterest')),
+                ('run_after', models.DateTimeField(db_index=True)),
+                ('locked', models.DateTimeField(null=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+    ]
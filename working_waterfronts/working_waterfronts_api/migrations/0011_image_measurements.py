@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+
+import PIL.Image
+from django.db import models, migrations
+
+from working_waterfronts.working_waterfronts_api import fragments
+
+# The number of images measured per query
+BATCH_SIZE = 100
+
+
+def measure(f):
+    """
+    Return the width, height, byte size and SHA-256 hex digest of an image
+    file, as ImageForm measured them when this migration was written.
+    """
+    f.seek(0)
+    sha256 = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: f.read(64 * 1024), b''):
+        sha256.update(chunk)
+        size += len(chunk)
+
+    f.seek(0)
+    width, height = PIL.Image.open(f).size
+
+    return {
+        'width': width,
+        'height': height,
+        'bytes': size,
+        'sha256': sha256.hexdigest()
+    }
+
+
+def measure_images(apps, schema_editor):
+    """
+    Measure the files of the images uploaded before they were measured at
+    upload, BATCH_SIZE at a time. Images whose file is missing or isn't an
+    image are left unmeasured.
+
+    The rows are updated without signals, so the read model rows of the
+    POIs showing the measured images are rebuilt when migrate finishes,
+    dropping the cached responses built from them.
+    """
+    Image = apps.get_model('working_waterfronts_api', 'Image')
+    PointOfInterest = apps.get_model(
+        'working_waterfronts_api', 'PointOfInterest')
+    last = 0
+    while True:
+        batch = list(Image.objects.filter(
+            pk__gt=last, sha256__isnull=True).order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            return
+        measured = []
+        for image in batch:
+            try:
+                image.image.open('rb')
+                try:
+                    values = measure(image.image)
+                finally:
+                    image.image.close()
+            except (IOError, OSError):
+                continue
+            Image.objects.filter(pk=image.pk).update(**values)
+            measured.append(image.pk)
+        fragments.rebuild_after_migrate(PointOfInterest.objects.filter(
+            images__in=measured).values_list('id', flat=True).distinct())
+        last = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('working_waterfronts_api', '0010_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='width',
+            field=models.PositiveIntegerField(null=True, editable=False),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='height',
+            field=models.PositiveIntegerField(null=True, editable=False),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='bytes',
+            field=models.BigIntegerField(null=True, editable=False),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='sha256',
+            field=models.CharField(
+                max_length=64, null=True, editable=False, db_index=True),
+            preserve_default=True,
+        ),
+        migrations.RunPython(measure_images, lambda apps, schema_editor: None),
+    ]
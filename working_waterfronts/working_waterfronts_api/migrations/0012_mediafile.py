@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+
+from django.db import models, migrations
+
+
+def index_files(apps, schema_editor):
+    """
+    List the originals and derivatives of the images already uploaded.
+    """
+    Image = apps.get_model('working_waterfronts_api', 'Image')
+    MediaFile = apps.get_model('working_waterfronts_api', 'MediaFile')
+    for image in Image.objects.order_by('pk').iterator():
+        names = set(derivative['name'] for derivative in
+                    json.loads(image.derivatives or '[]'))
+        files = [MediaFile(image=image, name=name) for name in sorted(names)]
+        if image.image:
+            files.append(
+                MediaFile(image=image, name=image.image.name, original=True))
+        MediaFile.objects.bulk_create(files)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('working_waterfronts_api', '0011_image_measurements'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('id', models.AutoField(
+                    verbose_name='ID', serialize=False, auto_created=True,
+                    primary_key=True)),
+                ('name', models.CharField(max_length=255, db_index=True)),
+                ('original', models.BooleanField(default=False)),
+                ('image', models.ForeignKey(
+                    related_name='files',
+                    to='working_waterfronts_api.Image')),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.RunPython(index_files, lambda apps, schema_editor: None),
+    ]
@@ -2,20 +2,40 @@ import os
 from django.contrib.gis.db import models
 from phonenumber_field.modelfields import PhoneNumberField
 
+from working_waterfronts.working_waterfronts_api.fields import (
+    IntegerArrayField)
+from working_waterfronts.working_waterfronts_api.derivatives import (
+    links as derivative_links)
+
 
 class PointOfInterest(models.Model):
 
     def __unicode__(self):
         return self.name
 
+    # Whether the location matches the address. A POI saved with an address
+    # and no coordinates is pending until the geocoding worker locates it
+    # (see geocode_jobs.py); until then it keeps its previous location, if
+    # it had one.
+    LOCATED = 'located'
+    PENDING = 'pending'
+    FAILED = 'failed'
+    LOCATION_STATUSES = (
+        (LOCATED, 'Located'),
+        (PENDING, 'Pending geocoding'),
+        (FAILED, 'Address not found'),
+    )
+
     name = models.TextField()
     alt_name = models.TextField(blank=True)
     description = models.TextField()
     history = models.TextField()
     facts = models.TextField()
 
-    # Geo Django field to store a point
-    location = models.PointField()
+    # Geo Django field to store a point. Null until a new POI is geocoded.
+    location = models.PointField(null=True, blank=True)
+    location_status = models.TextField(
+        choices=LOCATION_STATUSES, default=LOCATED, editable=False)
     objects = models.GeoManager()
 
     street = models.TextField()
@@ -39,7 +59,7 @@ class PointOfInterest(models.Model):
         'Category', blank=True)
 
     created = models.DateTimeField(auto_now_add=True)
-    modified = models.DateTimeField(auto_now=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
 
 
 class Video(models.Model):
@@ -63,7 +83,7 @@ class Video(models.Model):
     name = models.TextField(default='')
 
     created = models.DateTimeField(auto_now_add=True)
-    modified = models.DateTimeField(auto_now=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
 
     def natural_key(self):
         return {
@@ -96,14 +116,31 @@ class Image(models.Model):
     name = models.TextField(default='')
     caption = models.TextField(blank=True)
 
+    # The resized copies of the image, as JSON (see derivatives.py)
+    derivatives = models.TextField(default='[]', editable=False)
+
+    # Measured from the file when it is uploaded (see ImageForm), so it
+    # never has to be opened to describe the image. Null until measured.
+    width = models.PositiveIntegerField(null=True, editable=False)
+    height = models.PositiveIntegerField(null=True, editable=False)
+    bytes = models.BigIntegerField(null=True, editable=False)
+    sha256 = models.CharField(
+        max_length=64, null=True, editable=False, db_index=True)
+
     created = models.DateTimeField(auto_now_add=True)
-    modified = models.DateTimeField(auto_now=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
 
     def natural_key(self):
         return {
             'name': self.name,
             'caption': self.caption,
-            'link': self.image.url
+            'link': self.image.url,
+            'width': self.width,
+            'height': self.height,
+            'bytes': self.bytes,
+            'sha256': self.sha256,
+            'derivatives': derivative_links(
+                self.image.storage, self.derivatives)
         }
 
 
@@ -126,7 +163,7 @@ class Category(models.Model):
 
     category = models.TextField(default='')
     created = models.DateTimeField(auto_now_add=True)
-    modified = models.DateTimeField(auto_now=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
 
 
 class Hazard(models.Model):
@@ -141,7 +178,7 @@ class Hazard(models.Model):
         blank=True,
         null=True)
     created = models.DateTimeField(auto_now_add=True)
-    modified = models.DateTimeField(auto_now=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
 
     def natural_key(self):
         return {
@@ -152,3 +189,110 @@ class Hazard(models.Model):
 
     def __unicode__(self):
         return self.name
+
+
+class Tombstone(models.Model):
+
+    """
+    A Tombstone records that a PointOfInterest, Image, Video, Hazard or
+    Category was deleted, so clients syncing changes since some time can
+    drop their copy of it.
+
+    The model field holds the lower-case model name, e.g. 'image'.
+    """
+    model = models.TextField()
+    object_id = models.IntegerField()
+    deleted = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __unicode__(self):
+        return '%s %d' % (self.model, self.object_id)
+
+
+class PointOfInterestFragment(models.Model):
+
+    """
+    The read model behind the public POI views: one row per PointOfInterest
+    with its public JSON, images, videos, hazards and categories embedded,
+    and copies of the columns the views filter on, so they never join the
+    tables the entry interface writes to.
+
+    Rows are rebuilt when their POI or anything it embeds changes (see
+    signals.py and fragments.py). updated changes whenever the row does.
+    """
+    pointofinterest = models.OneToOneField(
+        PointOfInterest, primary_key=True, related_name='fragment')
+    json = models.TextField()
+    location = models.PointField()
+    categories = IntegerArrayField()
+    updated = models.DateTimeField(auto_now=True)
+    objects = models.GeoManager()
+
+    def __unicode__(self):
+        return self.json
+
+
+class GeocodeCache(models.Model):
+
+    """
+    The coordinates the geocoding service gave for an address, keyed on the
+    normalized address (see functions.normalize_address). lat and lng are
+    null for addresses it couldn't locate exactly.
+
+    hits counts the lookups answered from the row, and misses the lookups
+    that had to call the service. Rows older than GEOCODE_CACHE_TTL seconds
+    are refreshed from the service on their next lookup.
+    """
+    address = models.TextField(unique=True)
+    lat = models.FloatField(null=True)
+    lng = models.FloatField(null=True)
+    hits = models.IntegerField(default=0)
+    misses = models.IntegerField(default=0)
+    geocoded = models.DateTimeField()
+
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __unicode__(self):
+        return self.address
+
+
+class GeocodeJob(models.Model):
+
+    """
+    A queued geocoding of a pending PointOfInterest's address, run by the
+    geocode_pois management command (see geocode_jobs.py).
+
+    Jobs are run once run_after has passed. locked is set while a worker
+    runs the job; a job locked for longer than GEOCODE_JOB_LOCK_TIMEOUT
+    seconds is taken to belong to a dead worker and is run again. attempts
+    counts the runs that failed because the geocoder couldn't be reached,
+    and error holds the last such failure.
+    """
+    pointofinterest = models.OneToOneField(
+        PointOfInterest, related_name='geocodejob')
+    run_after = models.DateTimeField(db_index=True)
+    locked = models.DateTimeField(null=True)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __unicode__(self):
+        return '%s' % self.pointofinterest
+
+
+class MediaFile(models.Model):
+
+    """
+    A file under MEDIA_ROOT an Image refers to: its original, or one of its
+    derivatives. The media views look requested paths up by the indexed
+    name, rather than searching the images' derivatives JSON.
+
+    An Image's rows are replaced whenever it is saved (see signals.py). With
+    content-addressed storage, several Images may list the same name.
+    """
+    image = models.ForeignKey(Image, related_name='files')
+    name = models.CharField(max_length=255, db_index=True)
+    original = models.BooleanField(default=False)
+
+    def __unicode__(self):
+        return self.name
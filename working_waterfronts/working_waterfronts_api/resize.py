@@ -0,0 +1,183 @@
+import errno
+import os
+import struct
+import tempfile
+import time
+
+import PIL.Image
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import locks
+
+from working_waterfronts.working_waterfronts_api.derivatives import orient
+
+# The PIL formats resized images are saved in, as the original was. Others
+# are saved as JPEGs.
+FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+# The cache key of the running total of the resize cache's size in bytes:
+# its size when evict() last counted it, plus the images rendered since
+SIZE_KEY = 'resize:bytes'
+
+# The errors PIL raises for files it can't decode, besides IOError. Newer
+# Pillows raise DecompressionBombError for huge images themselves.
+DECODE_ERRORS = (
+    ValueError, SyntaxError, EOFError, IndexError, struct.error,
+    getattr(PIL.Image, 'DecompressionBombError', ValueError))
+
+
+def allowed_size(width, height):
+    """
+    Return whether images may be resized to a bounding box. Only the sizes in
+    IMAGE_RESIZE_SIZES are, so the cache can't be filled with every size.
+    """
+    return (width, height) in settings.IMAGE_RESIZE_SIZES
+
+
+def cache_name(width, height, name):
+    """
+    Return the name, under MEDIA_ROOT, an image resized to width x height is
+    cached under.
+    """
+    return os.path.join(
+        settings.IMAGE_RESIZE_CACHE, '%dx%d' % (width, height), name)
+
+
+def resized(storage, name, width, height):
+    """
+    Return the cache_name() of an image, resized to fit within width x
+    height, rendering it if it isn't cached. Images are never made bigger.
+
+    Each hit marks the cached copy as recently used, by its access time.
+    Its modification time is left alone, so the copy's validators don't
+    change from hit to hit. Requests for the same
+    uncached copy wait on a lock file for the first to render it, so it is
+    rendered once, by one process, however many want it.
+    """
+    cached = cache_name(width, height, name)
+    path = storage.path(cached)
+    if touch(path):
+        return cached
+
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+    with open(path + '.lock', 'wb') as lock:
+        locks.lock(lock, locks.LOCK_EX)
+        try:
+            # Rendered while we waited
+            if touch(path):
+                return cached
+            render(storage.path(name), path, width, height)
+        finally:
+            # Later requests see the cached copy, or render it themselves if
+            # this render failed, so nothing waits on this lock file again
+            try:
+                os.remove(path + '.lock')
+            except OSError:
+                # Removed by the request that rendered it
+                pass
+            locks.unlock(lock)
+
+    if over_limit(os.path.getsize(path)):
+        evict(storage.path(settings.IMAGE_RESIZE_CACHE),
+              settings.IMAGE_RESIZE_CACHE_BYTES, keep=path)
+    return cached
+
+
+def over_limit(size):
+    """
+    Add the size of a newly rendered image to the running total of the
+    cache's size, returning whether the cache may be over its limit: if the
+    total is over it, or isn't known. Only then is the cache walked by
+    evict(), so most renders don't stat every cached file.
+    """
+    try:
+        return cache.incr(SIZE_KEY, size) > settings.IMAGE_RESIZE_CACHE_BYTES
+    except ValueError:
+        # Not counted yet, or dropped from the cache
+        return True
+
+
+def touch(path):
+    """
+    Mark a cached file as just used, returning whether it exists. The access
+    time is set explicitly, as filesystems mounted noatime or relatime
+    don't keep it up to date.
+    """
+    try:
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+        return True
+    except OSError:
+        return False
+
+
+def render(source, path, width, height):
+    """
+    Resize the image at <source> to fit within width x height, writing it
+    to <path> in the same format. The file is written to a temporary name
+    and renamed into place, so it is never seen half-written.
+    """
+    picture = PIL.Image.open(source)
+    # Only the header has been read. Pillow merely warns of decompression
+    # bombs, which would take the memory of the process serving them.
+    if picture.size[0] * picture.size[1] > PIL.Image.MAX_IMAGE_PIXELS:
+        raise ValueError("%dx%d image is too large to resize" % picture.size)
+    picture.load()
+    format = picture.format if picture.format in FORMATS else 'JPEG'
+
+    picture = orient(picture)
+    if format == 'JPEG' and picture.mode != 'RGB':
+        picture = picture.convert('RGB')
+    picture.thumbnail((width, height), PIL.Image.ANTIALIAS)
+
+    fd, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            picture.save(
+                f, format, quality=settings.IMAGE_DERIVATIVE_QUALITY,
+                optimize=True, progressive=True)
+        os.chmod(temporary, 0o644)
+        os.rename(temporary, path)
+    except Exception:
+        os.remove(temporary)
+        raise
+
+
+def evict(directory, limit, keep=None):
+    """
+    Delete the least recently used files in a cache directory (see touch),
+    other than <keep>, until the files in it take up at most <limit> bytes.
+    The bytes left are stored as the running total over_limit() adds to.
+    """
+    files = []
+    total = 0
+    for root, dirs, names in os.walk(directory):
+        for name in names:
+            if name.endswith(('.lock', '.tmp')):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Evicted by another process
+                continue
+            files.append((stat.st_atime, stat.st_size, path))
+            total += stat.st_size
+
+    for atime, size, path in sorted(files):
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+    cache.set(SIZE_KEY, total, None)
@@ -0,0 +1,121 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_http_date_safe
+
+from working_waterfronts.working_waterfronts_api.functions import (
+    etag_matches, set_validators)
+
+# Cache key holding the current namespace version. Every cached response is
+# keyed under a version, so bumping it drops them all at once.
+VERSION_KEY = 'response:version'
+
+
+def namespace_version():
+    """
+    Return the current namespace version, starting a new namespace if there
+    is none.
+
+    New namespaces start from the current time in milliseconds rather than
+    1, so responses cached under an evicted version are never reused.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """
+    Drop every cached response by moving to a new namespace.
+    """
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # There is no namespace yet, so nothing is cached
+        pass
+
+
+def canonical(name, value, cast):
+    """
+    Return a query parameter value as <cast> would read it, or as given if
+    it can't be read, so an invalid value still gets its own error.
+    """
+    try:
+        return '%s=%s' % (name, cast(value))
+    except (TypeError, ValueError):
+        return '%s=%s' % (name, value)
+
+
+def cache_key(view, request, kwargs):
+    """
+    Return the cache key of a request to a view.
+
+    Query parameters are sorted, limit and proximity are read as integers,
+    and lat and lng are rounded to RESPONSE_CACHE_PLACES decimal places, so
+    equivalent requests share an entry.
+    """
+    def coordinate(value):
+        return '%.*f' % (settings.RESPONSE_CACHE_PLACES, float(value))
+
+    params = []
+    for name, values in request.GET.lists():
+        for value in values:
+            if name in ('lat', 'lng'):
+                params.append(canonical(name, value, coordinate))
+            elif name in ('limit', 'proximity'):
+                params.append(canonical(name, value, int))
+            else:
+                params.append('%s=%s' % (name, value))
+    if request.GET.get('lat') and request.GET.get('lng') and \
+            'proximity' not in request.GET:
+        params.append('proximity=%d' % settings.DEFAULT_PROXIMITY)
+
+    path = '%s:%s?%s' % (
+        view, ','.join('%s=%s' % item for item in sorted(kwargs.items())),
+        '&'.join(sorted(params)))
+    return 'response:%s:%s' % (
+        namespace_version(),
+        hashlib.md5(path.encode('utf-8')).hexdigest())
+
+
+def cache_response(view):
+    """
+    Cache the JSON responses of a view for RESPONSE_CACHE_TIMEOUT seconds,
+    or until any POI or related object changes (see signals.py).
+
+    Only successful GET responses are cached. Streamed responses, such as
+    format=geojson lists, aren't cached.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or \
+                not settings.RESPONSE_CACHE_TIMEOUT:
+            return view(request, *args, **kwargs)
+
+        key = cache_key(view.__name__, request, kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type, etag, last_modified = cached
+            if etag_matches(request, etag):
+                response = HttpResponseNotModified()
+            else:
+                response = HttpResponse(content, content_type=content_type)
+            return set_validators(response, etag, last_modified)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming and \
+                response.has_header('ETag'):
+            etag = response['ETag'].strip('"')
+            cache.set(key, (
+                response.content, response['Content-Type'], etag,
+                parse_http_date_safe(response.get('Last-Modified', ''))),
+                settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    return wrapper
@@ -0,0 +1,254 @@
+import json
+import sys
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.signals import (
+    pre_save, post_save, post_delete, pre_delete, m2m_changed, post_migrate)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from working_waterfronts.working_waterfronts_api.models import (
+    PointOfInterest, Image, Video, Hazard, Category, Tombstone, MediaFile)
+from working_waterfronts.working_waterfronts_api import (
+    tiles, response_cache, fragments, derivatives)
+
+# The models POIs embed, with the name of the POI relation to each
+RELATED = {
+    Image: 'images',
+    Video: 'videos',
+    Hazard: 'hazards',
+    Category: 'categories'
+}
+
+
+@receiver(pre_save, sender=PointOfInterest)
+def remember_location(sender, instance, raw, **kwargs):
+    """
+    Keep the stored location of a POI being saved, so the tiles it is moving
+    out of can be invalidated too.
+    """
+    instance._saved_location = None
+    if instance.pk and not raw:
+        instance._saved_location = PointOfInterest.objects.filter(
+            pk=instance.pk).values_list('location', flat=True).first()
+
+
+@receiver(post_save, sender=PointOfInterest)
+def remember_raw(sender, instance, raw, **kwargs):
+    """
+    Fixtures set a POI's relations right after its raw save, which sends
+    m2m_changed without a raw flag. Keep it on the POI so touch_m2m_pois
+    can tell.
+    """
+    instance._raw = raw
+
+
+@receiver(post_save, sender=PointOfInterest)
+def invalidate_saved_tiles(sender, instance, **kwargs):
+    tiles.invalidate_point(getattr(instance, '_saved_location', None))
+    tiles.invalidate_point(instance.location)
+
+
+@receiver(post_delete, sender=PointOfInterest)
+def invalidate_deleted_tiles(sender, instance, **kwargs):
+    tiles.invalidate_point(instance.location)
+
+
+@receiver(m2m_changed, sender=PointOfInterest.categories.through)
+def invalidate_category_tiles(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    """
+    Tiles include each POI's categories, so changing them invalidates the
+    POI's tiles.
+    """
+    if not reverse:
+        if action.startswith('post_'):
+            tiles.invalidate_point(instance.location)
+    elif action == 'pre_clear':
+        # The category's POIs are only known before they are cleared
+        for location in PointOfInterest.objects.filter(
+                categories=instance).values_list('location', flat=True):
+            tiles.invalidate_point(location)
+    elif action in ('post_add', 'post_remove'):
+        for location in PointOfInterest.objects.filter(
+                pk__in=pk_set).values_list('location', flat=True):
+            tiles.invalidate_point(location)
+
+
+@receiver(pre_delete, sender=Category)
+def invalidate_category_delete_tiles(sender, instance, **kwargs):
+    for location in PointOfInterest.objects.filter(
+            categories=instance).values_list('location', flat=True):
+        tiles.invalidate_point(location)
+
+
+@receiver(post_save, sender=Image)
+def index_media_files(sender, instance, **kwargs):
+    """
+    List the files of a saved image, its original and derivatives, as
+    MediaFiles. Raw saves are listed too, so fixtures' images are served.
+    """
+    names = set(derivative['name'] for derivative in
+                json.loads(instance.derivatives or '[]'))
+    files = [MediaFile(image=instance, name=name) for name in sorted(names)]
+    if instance.image:
+        files.append(MediaFile(
+            image=instance, name=instance.image.name, original=True))
+    MediaFile.objects.filter(image=instance).delete()
+    MediaFile.objects.bulk_create(files)
+
+
+@receiver(post_delete, sender=Image)
+def delete_derivatives(sender, instance, **kwargs):
+    """
+    Delete the files of a deleted image's derivatives. The original is
+    kept, as with any FileField.
+    """
+    derivatives.delete(instance)
+
+
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        model=sender._meta.model_name, object_id=instance.pk)
+
+
+def touch_related_pois(sender, instance, raw=False, **kwargs):
+    """
+    Mark the POIs embedding a changed or deleted image, video, hazard or
+    category as modified, so they are picked up by clients syncing changes.
+    """
+    if raw:
+        return
+    PointOfInterest.objects.filter(
+        **{RELATED[sender]: instance}).update(modified=timezone.now())
+
+
+def touch_m2m_pois(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Mark POIs as modified when their images, videos, hazards or categories
+    are changed.
+    """
+    if reverse:
+        # instance is the related object; only its POIs are known before
+        # they are cleared
+        if action in ('post_add', 'post_remove'):
+            pois = PointOfInterest.objects.filter(pk__in=pk_set)
+        elif action == 'pre_clear':
+            pois = PointOfInterest.objects.filter(
+                **{RELATED[type(instance)]: instance})
+        else:
+            return
+    elif action.startswith('post_') and not getattr(instance, '_raw', False):
+        pois = PointOfInterest.objects.filter(pk=instance.pk)
+    else:
+        return
+    pois.update(modified=timezone.now())
+
+
+post_delete.connect(record_tombstone, sender=PointOfInterest)
+for model, relation in RELATED.items():
+    post_delete.connect(record_tombstone, sender=model)
+    post_save.connect(touch_related_pois, sender=model)
+    pre_delete.connect(touch_related_pois, sender=model)
+    m2m_changed.connect(
+        touch_m2m_pois, sender=getattr(PointOfInterest, relation).through)
+
+
+def invalidate_responses(sender, **kwargs):
+    """
+    Any change to a POI or the objects it embeds can change any cached
+    response, so all of them are dropped.
+    """
+    response_cache.invalidate()
+
+
+for model in [PointOfInterest] + list(RELATED):
+    post_save.connect(invalidate_responses, sender=model)
+    post_delete.connect(invalidate_responses, sender=model)
+for relation in RELATED.values():
+    m2m_changed.connect(
+        invalidate_responses,
+        sender=getattr(PointOfInterest, relation).through)
+
+
+# The fragment handlers are connected after touch_related_pois and
+# touch_m2m_pois, so fragments are built with the POIs' new modified times.
+
+@receiver(post_save, sender=PointOfInterest)
+def refresh_saved_fragment(sender, instance, **kwargs):
+    fragments.refresh([instance.pk])
+
+
+def refresh_related_fragments(sender, instance, **kwargs):
+    """
+    Rebuild the fragments of the POIs embedding a saved image, video, hazard
+    or category.
+
+    This runs for raw saves too: fixtures may load a POI before the objects
+    it embeds, and its fragment is completed as each of them is saved.
+    """
+    fragments.refresh(PointOfInterest.objects.filter(
+        **{RELATED[sender]: instance}).values_list('id', flat=True))
+
+
+def remember_related_pois(sender, instance, **kwargs):
+    """
+    Keep the POIs embedding an object being deleted or cleared, which can't
+    be looked up once it's gone.
+    """
+    instance._fragment_pois = list(PointOfInterest.objects.filter(
+        **{RELATED[type(instance)]: instance}).values_list('id', flat=True))
+
+
+def refresh_deleted_fragments(sender, instance, **kwargs):
+    fragments.refresh(getattr(instance, '_fragment_pois', []))
+
+
+def refresh_m2m_fragments(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """
+    Rebuild the fragments of POIs whose images, videos, hazards or categories
+    are changed.
+    """
+    if not reverse:
+        if action.startswith('post_'):
+            fragments.refresh([instance.pk])
+    elif action == 'pre_clear':
+        remember_related_pois(sender, instance)
+    elif action == 'post_clear':
+        refresh_deleted_fragments(sender, instance)
+    elif action in ('post_add', 'post_remove'):
+        fragments.refresh(pk_set)
+
+
+for model, relation in RELATED.items():
+    post_save.connect(refresh_related_fragments, sender=model)
+    pre_delete.connect(remember_related_pois, sender=model)
+    post_delete.connect(refresh_deleted_fragments, sender=model)
+    m2m_changed.connect(
+        refresh_m2m_fragments,
+        sender=getattr(PointOfInterest, relation).through)
+
+
+@receiver(post_migrate)
+def rebuild_migrated_fragments(sender, verbosity=1, using=DEFAULT_DB_ALIAS,
+                               **kwargs):
+    """
+    Rebuild the fragments migrations asked for, once every migration has run
+    and the models match the schema.
+
+    After a migrate to an earlier migration, the models have columns the
+    schema doesn't yet, so nothing is built; the next full migrate in the
+    process, or the rebuild_fragments command, builds them.
+    """
+    if not fragments.rebuild_pending():
+        return
+    executor = MigrationExecutor(connections[using])
+    if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+        if verbosity:
+            sys.stdout.write(
+                "Not rebuilding the POI read model, as migrations are "
+                "unapplied. Run rebuild_fragments once they are applied.\n")
+        return
+    fragments.rebuild_migrated()
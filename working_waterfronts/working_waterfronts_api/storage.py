@@ -0,0 +1,81 @@
+import errno
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import force_text
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    """
+    A FileSystemStorage that names each file by the SHA-256 of its content,
+    in two levels of directories named by the start of the hash:
+
+        images/cat.jpg -> images/26/bf/26bf275f...7454488.jpg
+
+    Only the directory and extension of the name a file is saved under are
+    kept, so user-supplied names never reach the disk, and directories stay
+    small however many files there are. Saving a file that is already
+    stored returns its name without writing it again, so identical uploads
+    share one file.
+
+    Files are written to a temporary name and renamed into place, so a
+    file is never seen half-written, and two saves of the same content at
+    once both succeed.
+    """
+
+    def get_available_name(self, name):
+        # A stored file with the same name has the same content, so the name
+        # is always available
+        return name
+
+    def content_name(self, name, content):
+        """
+        Return the name a file is stored under.
+        """
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        digest = sha256.hexdigest()
+
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            directory, digest[:2], digest[2:4], digest + extension)
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            return force_text(name)
+
+        directory = os.path.dirname(full_path)
+        try:
+            if self.directory_permissions_mode is not None:
+                # os.makedirs applies the umask, as FileSystemStorage notes
+                old_umask = os.umask(0)
+                try:
+                    os.makedirs(directory, self.directory_permissions_mode)
+                finally:
+                    os.umask(old_umask)
+            else:
+                os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    f.write(chunk)
+            # mkstemp makes the file readable by its owner only
+            os.chmod(temporary, self.file_permissions_mode or 0o644)
+            os.rename(temporary, full_path)
+        except Exception:
+            os.remove(temporary)
+            raise
+
+        return force_text(name)
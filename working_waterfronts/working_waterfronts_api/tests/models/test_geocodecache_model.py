@@ -0,0 +1,145 @@
+import datetime
+
+import requests
+from mock import patch, Mock
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from working_waterfronts.working_waterfronts_api import geocoders
+from working_waterfronts.working_waterfronts_api.models import GeocodeCache
+from working_waterfronts.working_waterfronts_api.functions import (
+    coordinates_from_address, normalize_address, BadAddressException)
+from django.contrib.gis.db import models
+
+
+def google_response(status='OK', location_type='ROOFTOP', lat=44.6752643,
+                    lng=-124.072162):
+    results = []
+    if status == 'OK':
+        results = [{'geometry': {
+            'location_type': location_type,
+            'location': {'lat': lat, 'lng': lng}}}]
+    return Mock(status_code=200, json=Mock(
+        return_value={'status': status, 'results': results}))
+
+
+class GeocodeCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.expected_fields = {
+            'address': models.TextField,
+            'lat': models.FloatField,
+            'lng': models.FloatField,
+            'hits': models.IntegerField,
+            'misses': models.IntegerField,
+            'geocoded': models.DateTimeField,
+            'created': models.DateTimeField,
+            'id': models.AutoField
+        }
+
+    def test_fields_exist(self):
+        model = GeocodeCache
+        for field, field_type in self.expected_fields.items():
+            self.assertEqual(
+                field_type, type(model._meta.get_field_by_name(field)[0]))
+
+    def test_no_additional_fields(self):
+        fields = GeocodeCache._meta.get_all_field_names()
+        self.assertEqual(sorted(fields), sorted(self.expected_fields.keys()))
+
+    def test_address_unique(self):
+        self.assertTrue(GeocodeCache._meta.get_field('address').unique)
+
+    def test___unicode___method(self):
+        assert hasattr(GeocodeCache, '__unicode__'), \
+            "No __unicode__ method found"
+
+
+@patch('requests.Session.get')
+@override_settings(
+    GEOCODER='working_waterfronts.working_waterfronts_api.geocoders.'
+             'GoogleGeocoder',
+    GEOCODE_RETRIES=0)
+class GeocodeCacheLookupTestCase(TestCase):
+
+    """
+    Test that coordinates_from_address answers known addresses from the
+    GeocodeCache.
+    """
+
+    address = ['750 NW Lighthouse Dr', 'Newport', 'OR', '97365']
+
+    def setUp(self):
+        # Start each test with a fresh circuit breaker
+        geocoders._geocoders.clear()
+
+    def test_normalize_address(self, get):
+        self.assertEqual(
+            normalize_address(' 750 N.W.  Lighthouse Dr.', 'NEWPORT', 'OR',
+                              '97365'),
+            normalize_address(*self.address))
+
+    def test_miss_then_hit(self, get):
+        get.return_value = google_response()
+
+        self.assertEqual(
+            coordinates_from_address(*self.address), [44.6752643, -124.072162])
+        self.assertEqual(
+            coordinates_from_address(*self.address), [44.6752643, -124.072162])
+
+        self.assertEqual(get.call_count, 1)
+        cached = GeocodeCache.objects.get()
+        self.assertEqual(cached.misses, 1)
+        self.assertEqual(cached.hits, 1)
+
+    def test_timeout(self, get):
+        get.return_value = google_response()
+        coordinates_from_address(*self.address)
+        self.assertTrue(get.call_args[1]['timeout'])
+
+    def test_bad_address_cached(self, get):
+        get.return_value = google_response(location_type='APPROXIMATE')
+
+        for attempt in range(2):
+            with self.assertRaises(BadAddressException):
+                coordinates_from_address(*self.address)
+
+        self.assertEqual(get.call_count, 1)
+        self.assertIsNone(GeocodeCache.objects.get().lat)
+
+    def test_service_error_not_cached(self, get):
+        get.side_effect = requests.Timeout()
+
+        with self.assertRaises(BadAddressException):
+            coordinates_from_address(*self.address)
+        self.assertFalse(GeocodeCache.objects.exists())
+
+        get.side_effect = None
+        get.return_value = google_response(status='OVER_QUERY_LIMIT')
+        with self.assertRaises(BadAddressException):
+            coordinates_from_address(*self.address)
+        self.assertFalse(GeocodeCache.objects.exists())
+
+    @override_settings(GEOCODE_CACHE_TTL=60)
+    def test_expired_refreshed(self, get):
+        get.return_value = google_response()
+        coordinates_from_address(*self.address)
+        GeocodeCache.objects.update(
+            geocoded=timezone.now() - datetime.timedelta(seconds=120))
+
+        get.return_value = google_response(lat=45.0, lng=-124.0)
+        self.assertEqual(
+            coordinates_from_address(*self.address), [45.0, -124.0])
+        self.assertEqual(GeocodeCache.objects.get().misses, 2)
+
+    @override_settings(GEOCODE_CACHE_TTL=60)
+    def test_expired_used_when_service_down(self, get):
+        get.return_value = google_response()
+        coordinates_from_address(*self.address)
+        GeocodeCache.objects.update(
+            geocoded=timezone.now() - datetime.timedelta(seconds=120))
+
+        get.side_effect = requests.ConnectionError()
+        self.assertEqual(
+            coordinates_from_address(*self.address), [44.6752643, -124.072162])
@@ -0,0 +1,32 @@
+from django.test import TestCase
+
+from working_waterfronts.working_waterfronts_api.models import GeocodeJob
+from django.contrib.gis.db import models
+
+
+class GeocodeJobTestCase(TestCase):
+
+    def setUp(self):
+        self.expected_fields = {
+            'pointofinterest': models.OneToOneField,
+            'run_after': models.DateTimeField,
+            'locked': models.DateTimeField,
+            'attempts': models.IntegerField,
+            'error': models.TextField,
+            'created': models.DateTimeField,
+            'id': models.AutoField
+        }
+
+    def test_fields_exist(self):
+        model = GeocodeJob
+        for field, field_type in self.expected_fields.items():
+            self.assertEqual(
+                field_type, type(model._meta.get_field_by_name(field)[0]))
+
+    def test_no_additional_fields(self):
+        fields = GeocodeJob._meta.get_all_field_names()
+        self.assertEqual(sorted(fields), sorted(self.expected_fields.keys()))
+
+    def test___unicode___method(self):
+        assert hasattr(GeocodeJob, '__unicode__'), \
+            "No __unicode__ method found"
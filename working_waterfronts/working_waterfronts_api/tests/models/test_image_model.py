@@ -11,9 +11,15 @@ class ImageTestCase(TestCase):
             'image': models.ImageField,
             'name': models.TextField,
             'caption': models.TextField,
+            'derivatives': models.TextField,
+            'width': models.PositiveIntegerField,
+            'height': models.PositiveIntegerField,
+            'bytes': models.BigIntegerField,
+            'sha256': models.CharField,
             'created': models.DateTimeField,
             'modified': models.DateTimeField,
             'pointofinterest': models.related.RelatedObject,
+            'files': models.related.RelatedObject,
             'id': models.AutoField
         }
 
@@ -0,0 +1,29 @@
+from django.test import TestCase
+
+from working_waterfronts.working_waterfronts_api.models import MediaFile
+from django.contrib.gis.db import models
+
+
+class MediaFileTestCase(TestCase):
+
+    def setUp(self):
+        self.expected_fields = {
+            'image': models.ForeignKey,
+            'name': models.CharField,
+            'original': models.BooleanField,
+            'id': models.AutoField
+        }
+
+    def test_fields_exist(self):
+        model = MediaFile
+        for field, field_type in self.expected_fields.items():
+            self.assertEqual(
+                field_type, type(model._meta.get_field_by_name(field)[0]))
+
+    def test_no_additional_fields(self):
+        fields = MediaFile._meta.get_all_field_names()
+        self.assertEqual(sorted(fields), sorted(self.expected_fields.keys()))
+
+    def test___unicode___method(self):
+        assert hasattr(MediaFile, '__unicode__'), \
+            "No __unicode__ method found"
@@ -13,6 +13,7 @@ class PointOfInterestTestCase(TestCase):
             'alt_name': models.TextField,
             'contact_name': models.TextField,
             'location': models.PointField,
+            'location_status': models.TextField,
             'street': models.TextField,
             'city': models.TextField,
             'state': models.TextField,
@@ -30,12 +31,15 @@ class PointOfInterestTestCase(TestCase):
             'categories': models.ManyToManyField,
             'images': models.ManyToManyField,
             'videos': models.ManyToManyField,
+            'fragment': models.related.RelatedObject,
+            'geocodejob': models.related.RelatedObject,
             'created': models.DateTimeField,
             'modified': models.DateTimeField,
             u'id': models.AutoField
         }
 
         self.optional_fields = {
+            'location',
             'alt_name',
             'location_description',
             'website',
@@ -43,7 +47,7 @@ class PointOfInterestTestCase(TestCase):
             'phone'
         }
 
-        self.null_fields = {'phone'}
+        self.null_fields = {'location', 'phone'}
 
     def test_fields_exist(self):
         model = PointOfInterest
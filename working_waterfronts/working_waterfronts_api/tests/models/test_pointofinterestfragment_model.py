@@ -0,0 +1,42 @@
+from django.test import TestCase
+
+from working_waterfronts.working_waterfronts_api.models import (
+    PointOfInterestFragment)
+from working_waterfronts.working_waterfronts_api.fields import (
+    IntegerArrayField)
+from django.contrib.gis.db import models
+
+
+class PointOfInterestFragmentTestCase(TestCase):
+
+    def setUp(self):
+        self.expected_fields = {
+            'pointofinterest': models.OneToOneField,
+            'json': models.TextField,
+            'location': models.PointField,
+            'categories': IntegerArrayField,
+            'updated': models.DateTimeField
+        }
+
+    def test_fields_exist(self):
+        model = PointOfInterestFragment
+        for field, field_type in self.expected_fields.items():
+            self.assertEqual(
+                field_type, type(model._meta.get_field_by_name(field)[0]))
+
+    def test_no_additional_fields(self):
+        fields = PointOfInterestFragment._meta.get_all_field_names()
+        self.assertEqual(sorted(fields), sorted(self.expected_fields.keys()))
+
+    def test_pointofinterest_primary_key(self):
+        self.assertTrue(
+            PointOfInterestFragment._meta.get_field(
+                'pointofinterest').primary_key)
+
+    def test_updated_field(self):
+        self.assertTrue(
+            PointOfInterestFragment._meta.get_field('updated').auto_now)
+
+    def test___unicode___method(self):
+        assert hasattr(PointOfInterestFragment, '__unicode__'), \
+            "No __unicode__ method found"
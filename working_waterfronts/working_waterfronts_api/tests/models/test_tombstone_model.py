@@ -0,0 +1,42 @@
+from django.test import TestCase
+
+from working_waterfronts.working_waterfronts_api.models import (
+    Tombstone, Video)
+from django.contrib.gis.db import models
+
+
+class TombstoneTestCase(TestCase):
+
+    def setUp(self):
+        self.expected_fields = {
+            'model': models.TextField,
+            'object_id': models.IntegerField,
+            'deleted': models.DateTimeField,
+            'id': models.AutoField
+        }
+
+    def test_fields_exist(self):
+        model = Tombstone
+        for field, field_type in self.expected_fields.items():
+            self.assertEqual(
+                field_type, type(model._meta.get_field_by_name(field)[0]))
+
+    def test_no_additional_fields(self):
+        fields = Tombstone._meta.get_all_field_names()
+        self.assertEqual(sorted(fields), sorted(self.expected_fields.keys()))
+
+    def test_deleted_field(self):
+        self.assertTrue(Tombstone._meta.get_field('deleted').auto_now_add)
+
+    def test___unicode___method(self):
+        assert hasattr(Tombstone, '__unicode__'), "No __unicode__ method found"
+
+    def test_delete_records_tombstone(self):
+        video = Video.objects.create(
+            name='Waves', caption='Some waves', video='http://example.com')
+        video_id = video.id
+        video.delete()
+
+        tombstone = Tombstone.objects.get()
+        self.assertEqual(tombstone.model, 'video')
+        self.assertEqual(tombstone.object_id, video_id)
@@ -0,0 +1,28 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+# The cache the tests run against. Tests clear the cache, so they must never
+# run against the memcached in CACHES, which other processes share.
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tests'
+    }
+}
+
+
+class LocalCacheRunner(DiscoverRunner):
+
+    """
+    Runs the tests with a local-memory cache in place of CACHES, so they
+    need no memcached daemon and can't flush one.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super(LocalCacheRunner, self).setup_test_environment(**kwargs)
+        self.caches = override_settings(CACHES=TEST_CACHES)
+        self.caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.caches.disable()
+        super(LocalCacheRunner, self).teardown_test_environment(**kwargs)
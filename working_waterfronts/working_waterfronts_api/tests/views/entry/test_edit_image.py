@@ -4,6 +4,10 @@ from working_waterfronts.working_waterfronts_api.models import Image
 from django.contrib.auth.models import User
 import os
 
+CAT_URL = (
+    '/media/images/26/bf/'
+    '26bf275f580f13bcd2d63585c2bd4831a18f697beca51685b36e07a5a7454488.jpg')
+
 
 class EditImageTestCase(TestCase):
 
@@ -62,7 +66,20 @@ class EditImageTestCase(TestCase):
         image = Image.objects.get(id=1)
         self.assertEqual(getattr(image, 'caption'), new_image['caption'])
         self.assertEqual(getattr(image, 'name'), new_image['name'])
-        self.assertIn('/media/images/cat', getattr(image, 'image').url)
+        # Named by the hash of its content
+        self.assertEqual(getattr(image, 'image').url, CAT_URL)
+
+    def test_update_without_file(self):
+        """
+        Changing only the text of an image doesn't measure its file again
+        """
+        self.client.post(
+            reverse('edit-image', kwargs={'id': '1'}),
+            {'name': "A new dog", 'caption': "Yip!"})
+
+        image = Image.objects.get(id=1)
+        self.assertEqual(image.name, "A new dog")
+        self.assertIsNone(image.sha256)
 
     def test_form_fields(self):
         """
@@ -1,9 +1,22 @@
+import os
+
+from mock import patch
 from django.test import TestCase
+from django.test.utils import override_settings
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
 from django.contrib.auth.models import User
 from working_waterfronts.working_waterfronts_api.models import PointOfInterest
 
 
+GAZETTEER = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', '..', 'testdata', 'gazetteer.csv'))
+
+
+@override_settings(
+    GEOCODER='working_waterfronts.working_waterfronts_api.geocoders.'
+             'GazetteerGeocoder',
+    GEOCODER_GAZETTEER=GAZETTEER)
 class EditPointOfInterestTestCase(TestCase):
 
     """
@@ -52,6 +65,13 @@ class EditPointOfInterestTestCase(TestCase):
         self.client.post(
             reverse('edit-poi', kwargs={'id': '1'}), new_poi)
 
+        # The poi keeps its old location until the worker geocodes the new
+        # address, but isn't public meanwhile
+        poi = PointOfInterest.objects.get(id=1)
+        self.assertEqual(poi.location_status, PointOfInterest.PENDING)
+        self.assertEqual(poi.location.y, 43.966874)  # latitude
+        call_command('geocode_pois', once=True)
+
         # These values are changed by the server after being received from
         # the client/web page. The preparation IDs are going to be changed
         # into objects, so we'll not need the list fields
@@ -67,6 +87,7 @@ class EditPointOfInterestTestCase(TestCase):
 
         self.assertEqual(poi.location.y, 44.6752643)  # latitude
         self.assertEqual(poi.location.x, -124.072162)  # longitude
+        self.assertEqual(poi.location_status, PointOfInterest.LOCATED)
 
         hazards = [hazard.id for hazard in poi.hazards.all()]
         categories = [category.id for category in poi.categories.all()]
@@ -74,6 +95,37 @@ class EditPointOfInterestTestCase(TestCase):
         self.assertEqual(sorted(hazards), [1, 2])
         self.assertEqual(sorted(categories), [1, 2])
 
+    def test_address_edit_hides_live_poi(self):
+        """
+        A live POI whose address changes to one that isn't cached leaves the
+        public API until the worker locates it, and stays out if the address
+        isn't found
+        """
+        poi = {
+            'name': 'Newport Lighthouse', 'alt_name': '',
+            'description': 'A lighthouse', 'history': '', 'facts': '',
+            'street': '750 NW Lighthouse Dr', 'city': 'Newport',
+            'state': 'OR', 'zip': '97365', 'location_description': '',
+            'contact_name': 'Test Contact', 'website': '', 'email': '',
+            'phone': '', 'category_ids': '1', 'hazard_ids': '',
+            'image_ids': '', 'video_ids': ''}
+        details = reverse('poi-details', kwargs={'id': '1'})
+        self.assertEqual(self.client.get(details).status_code, 200)
+
+        self.client.post(reverse('edit-poi', kwargs={'id': '1'}), poi)
+        self.assertEqual(self.client.get(details).status_code, 404)
+
+        call_command('geocode_pois', once=True)
+        self.assertEqual(self.client.get(details).status_code, 200)
+
+        poi['street'] = '1 Nowhere Rd'
+        self.client.post(reverse('edit-poi', kwargs={'id': '1'}), poi)
+        call_command('geocode_pois', once=True)
+        self.assertEqual(
+            PointOfInterest.objects.get(id=1).location_status,
+            PointOfInterest.FAILED)
+        self.assertEqual(self.client.get(details).status_code, 404)
+
     def test_poi_update_with_coords(self):
         """
         POST a proper "edit poi" command to the server, but change the lat
@@ -121,6 +173,32 @@ class EditPointOfInterestTestCase(TestCase):
         self.assertEqual(sorted(hazards), [1, 2])
         self.assertEqual(sorted(categories), [1, 2])
 
+    @patch('working_waterfronts.working_waterfronts_api.geocoders.'
+           'GazetteerGeocoder.geocode')
+    def test_poi_update_same_address_no_coords(self, geocode):
+        """
+        POST an edit without coordinates that keeps the poi's address, and
+        check the poi keeps its location without geocoding the address again
+        """
+        new_poi = {
+            'name': 'Test Name', 'alt_name': 'Tester Obj',
+            'description': 'Test Description',
+            'history': 'history', 'facts': 'It\'s a test',
+            'street': '123 Fake St.', 'city': 'Newport', 'state': 'Oregon',
+            'zip': '11234', 'location_description': 'test loc description',
+            'contact_name': 'Test Contact', 'website': '', 'email': '',
+            'phone': '', 'category_ids': '1,2', 'hazard_ids': '1,2',
+            'image_ids': '', 'video_ids': ''}
+
+        self.client.post(
+            reverse('edit-poi', kwargs={'id': '1'}), new_poi)
+
+        self.assertFalse(geocode.called)
+        poi = PointOfInterest.objects.get(id=1)
+        self.assertEqual(poi.name, 'Test Name')
+        self.assertEqual(poi.location.y, 43.966874)  # latitude
+        self.assertEqual(poi.location.x, -124.10534)  # longitude
+
     def test_form_fields(self):
         """
         Tests to see if the form contains all of the right fields with the
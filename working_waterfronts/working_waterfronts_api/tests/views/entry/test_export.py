@@ -0,0 +1,140 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from StringIO import StringIO
+
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.contrib.auth.models import User
+
+from working_waterfronts.working_waterfronts_api import importer
+from working_waterfronts.working_waterfronts_api.models import PointOfInterest
+
+
+class ExportTestCase(TestCase):
+
+    """
+    Test that the /entry/export view and export_pois command stream every
+    POI in each format.
+    """
+    fixtures = ['test_fixtures']
+
+    def setUp(self):
+        user = User.objects.create_user(
+            'temporary', 'temporary@gmail.com', 'temporary')
+        user.is_staff = True
+        user.save()
+
+        response = self.client.login(
+            username='temporary', password='temporary')
+        self.assertEqual(response, True)
+
+    def export(self, **params):
+        response = self.client.get(reverse('entry-export'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, ''.join(response.streaming_content)
+
+    def test_url_endpoint(self):
+        url = reverse('entry-export')
+        self.assertEqual(url, '/entry/export')
+
+    def test_staff_only(self):
+        user = User.objects.get(username='temporary')
+        user.is_staff = False
+        user.save()
+
+        response = self.client.get(reverse('entry-export'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_csv(self):
+        response, content = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('pois.csv', response['Content-Disposition'])
+
+        rows = list(csv.DictReader(io.BytesIO(content)))
+        self.assertEqual([row['id'] for row in rows], ['1', '2'])
+        self.assertEqual(rows[0]['name'], 'Newport Lighthouse')
+        self.assertEqual(rows[0]['categories'], 'Cool Stuff')
+        self.assertEqual(rows[0]['hazards'], 'Falling Rocks')
+        self.assertEqual(
+            float(rows[0]['latitude']),
+            PointOfInterest.objects.get(id=1).location.y)
+
+    def test_csv_imports(self):
+        """
+        The CSV export is in the columns import_pois reads
+        """
+        response, content = self.export()
+        pois = importer.Importer()
+        pois.run(importer.read_csv(io.BytesIO(content)))
+
+        self.assertEqual(pois.errors, [])
+        self.assertEqual(pois.created, 2)
+
+    def test_geojson(self):
+        response, content = self.export(format='geojson')
+
+        data = json.loads(content)
+        self.assertEqual(data['type'], 'FeatureCollection')
+        self.assertEqual(
+            [feature['id'] for feature in data['features']], [1, 2])
+        poi = PointOfInterest.objects.get(id=1)
+        self.assertEqual(
+            data['features'][0]['geometry']['coordinates'],
+            [poi.location.x, poi.location.y])
+        self.assertEqual(
+            data['features'][0]['properties']['categories'],
+            [{'category': 'Cool Stuff', 'id': 1}])
+
+    def test_ndjson(self):
+        response, content = self.export(format='ndjson')
+
+        pois = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([poi['id'] for poi in pois], [1, 2])
+
+    def test_since(self):
+        PointOfInterest.objects.get(id=2).save()
+        since = PointOfInterest.objects.get(id=1).modified
+
+        response, content = self.export(
+            format='ndjson', since=since.isoformat())
+        self.assertEqual(
+            [json.loads(line)['id'] for line in content.splitlines()], [2])
+
+    def test_gzip(self):
+        response, content = self.export(format='ndjson', gzip='true')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('pois.ndjson.gz', response['Content-Disposition'])
+
+        content = gzip.GzipFile(fileobj=io.BytesIO(content)).read()
+        self.assertEqual(len(content.splitlines()), 2)
+
+    def test_bad_parameters(self):
+        response = self.client.get(
+            reverse('entry-export'), {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(
+            reverse('entry-export'), {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command('export_pois', format='geojson', stdout=stdout)
+        data = json.loads(stdout.getvalue())
+        self.assertEqual(len(data['features']), 2)
+
+        fd, path = tempfile.mkstemp(suffix='.csv.gz')
+        os.close(fd)
+        try:
+            call_command('export_pois', gzip=True, output=path)
+            with gzip.open(path) as f:
+                rows = list(csv.DictReader(f))
+        finally:
+            os.remove(path)
+        self.assertEqual(len(rows), 2)
@@ -1,9 +1,17 @@
+import hashlib
+import json
+
 from django.test import TestCase
 from django.core.urlresolvers import reverse
+from working_waterfronts.working_waterfronts_api import derivatives
 from working_waterfronts.working_waterfronts_api.models import Image
 from django.contrib.auth.models import User
 import os
 
+CAT_URL = (
+    '/media/images/26/bf/'
+    '26bf275f580f13bcd2d63585c2bd4831a18f697beca51685b36e07a5a7454488.jpg')
+
 
 class NewImageTestCase(TestCase):
 
@@ -80,7 +88,8 @@ class NewImageTestCase(TestCase):
         image = Image.objects.all()[0]
         self.assertEqual(getattr(image, 'caption'), new_image['caption'])
         self.assertEqual(getattr(image, 'name'), new_image['name'])
-        self.assertIn('/media/images/cat', getattr(image, 'image').url)
+        # Named by the hash of its content
+        self.assertEqual(getattr(image, 'image').url, CAT_URL)
 
     def test_successful_image_creation_maximal(self):
         """
@@ -100,7 +109,74 @@ class NewImageTestCase(TestCase):
         image = Image.objects.all()[0]
         self.assertEqual(getattr(image, 'caption'), new_image['caption'])
         self.assertEqual(getattr(image, 'name'), new_image['name'])
-        self.assertIn('/media/images/cat', getattr(image, 'image').url)
+        # Named by the hash of its content
+        self.assertEqual(getattr(image, 'image').url, CAT_URL)
+
+    def test_measurements(self):
+        """
+        The dimensions, size and hash of an uploaded image are stored.
+        """
+        self.client.post(reverse('new-image'), {
+            'name': "A cat",
+            'caption': "Catption",
+            'image': self.image})
+
+        image = Image.objects.get(name="A cat", caption="Catption")
+        derivatives.delete(image)
+
+        self.image.seek(0)
+        content = self.image.read()
+        self.assertEqual((image.width, image.height), (650, 366))
+        self.assertEqual(image.bytes, len(content))
+        self.assertEqual(image.sha256, hashlib.sha256(content).hexdigest())
+
+    def test_same_upload_stored_once(self):
+        """
+        Uploading the same file twice stores it, and its derivatives, once.
+        """
+        for name in ["A cat", "The same cat"]:
+            self.image.seek(0)
+            self.client.post(reverse('new-image'), {
+                'name': name,
+                'caption': "Catption",
+                'image': self.image})
+
+        first = Image.objects.get(name="A cat")
+        second = Image.objects.get(name="The same cat")
+        try:
+            self.assertEqual(first.image.name, second.image.name)
+            self.assertEqual(first.derivatives, second.derivatives)
+        finally:
+            derivatives.delete(first)
+            first.save()
+            self.assertTrue(first.image.storage.exists(
+                json.loads(second.derivatives)[0]['name']))
+            derivatives.delete(second)
+
+    def test_derivatives(self):
+        """
+        Uploading an image makes a copy of it at each size, no bigger than
+        the original.
+        """
+        self.client.post(reverse('new-image'), {
+            'name': "A cat",
+            'caption': "Catption",
+            'image': self.image})
+
+        image = Image.objects.get(name="A cat", caption="Catption")
+        try:
+            sizes = dict(
+                ((d['size'], d['format']), d)
+                for d in json.loads(image.derivatives))
+            thumbnail = sizes[('thumbnail', 'jpeg')]
+            self.assertEqual(thumbnail['width'], 200)
+            self.assertLess(thumbnail['height'], thumbnail['width'])
+            self.assertEqual(sizes[('medium', 'jpeg')]['width'], 650)
+            self.assertEqual(sizes[('large', 'jpeg')]['width'], 650)
+            self.assertTrue(
+                image.image.storage.exists(thumbnail['name']))
+        finally:
+            derivatives.delete(image)
 
     def test_no_data_error(self):
         """
@@ -1,10 +1,22 @@
+import os
+
 from django.test import TestCase
+from django.test.utils import override_settings
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
 from working_waterfronts.working_waterfronts_api.models import (
     PointOfInterest, Category, Hazard)
 
 
+GAZETTEER = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', '..', 'testdata', 'gazetteer.csv'))
+
+
+@override_settings(
+    GEOCODER='working_waterfronts.working_waterfronts_api.geocoders.'
+             'GazetteerGeocoder',
+    GEOCODER_GAZETTEER=GAZETTEER)
 class NewPOITestCase(TestCase):
 
     """
@@ -80,6 +92,12 @@ class NewPOITestCase(TestCase):
 
         self.assertGreater(len(PointOfInterest.objects.all()), 0)
 
+        # The address is geocoded by the worker, not the form
+        poi = PointOfInterest.objects.all()[0]
+        self.assertEqual(poi.location_status, PointOfInterest.PENDING)
+        self.assertIsNone(poi.location)
+        call_command('geocode_pois', once=True)
+
         # These values are changed by the server after being received from
         # the client/web page. The preparation IDs are going to be changed
         # into objects, so we'll not need the list fields
@@ -93,6 +111,7 @@ class NewPOITestCase(TestCase):
 
         self.assertEqual(poi.location.y, 44.6752643)  # latitude
         self.assertEqual(poi.location.x, -124.072162)  # longitude
+        self.assertEqual(poi.location_status, PointOfInterest.LOCATED)
 
         hazards = [hazard.id for hazard in poi.hazards.all()]
         categories = [category.id for category in poi.categories.all()]
@@ -183,15 +202,13 @@ class NewPOITestCase(TestCase):
     def test_bad_address(self):
         """
         POST a "new pointofinterest" to the server with a bad address --
-        a non-existant street -- and test that a Bad Address error is returned.
+        a non-existant street -- and test that it is saved pending, then
+        marked as not found by the geocoding worker. Once the address is
+        known to be bad, POSTing it again returns a Bad Address error.
 
         This test contains the same POST data as the
         test_successful_pointofinterest_creation, but with a bad address.
-        This means the only error returned should be a Bad Address error.
         """
-
-        all_pointsofinterest = PointOfInterest.objects.all()
-
         Hazard.objects.all().delete()
         Category.objects.all().delete()
 
@@ -210,12 +227,17 @@ class NewPOITestCase(TestCase):
             'contact_name': 'Test Contact', 'website': '', 'email': '',
             'phone': '', 'category_ids': '1,2', 'hazard_ids': '1,2'}
 
+        self.client.post(reverse('new-poi'), new_poi)
+        call_command('geocode_pois', once=True)
+
+        poi = PointOfInterest.objects.get()
+        self.assertEqual(poi.location_status, PointOfInterest.FAILED)
+        self.assertIsNone(poi.location)
+
         response = self.client.post(reverse('new-poi'), new_poi)
 
         # Test that the bad address returns a bad address
         self.assertIn("Full address is required.", response.context['errors'])
 
         # Test that we didn't add any new objects
-        self.assertEqual(
-            list(PointOfInterest.objects.all()),
-            list(all_pointsofinterest))
+        self.assertEqual(PointOfInterest.objects.count(), 1)
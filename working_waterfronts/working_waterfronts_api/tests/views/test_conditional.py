@@ -0,0 +1,101 @@
+from django.test import TestCase
+from django.core.urlresolvers import reverse
+
+from working_waterfronts.working_waterfronts_api.models import (
+    PointOfInterest, Image)
+
+
+class ConditionalGetTestCase(TestCase):
+
+    """
+    Test the ETag and Last-Modified support of the /pois/,
+    /pois/categories/<id> and /pois/<id> views.
+    """
+    fixtures = ['test_fixtures']
+
+    def setUp(self):
+        self.urls = [
+            reverse('pois-list'),
+            '%s?lat=43.966874&lng=-124.10534' % reverse('pois-list'),
+            '%s?format=geojson' % reverse('pois-list'),
+            reverse('pois-categories', kwargs={'id': '1'}),
+            reverse('poi-details', kwargs={'id': '1'})
+        ]
+
+    def test_validators(self):
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('ETag', response)
+            self.assertIn('Last-Modified', response)
+
+    def test_if_none_match(self):
+        for url in self.urls:
+            etag = self.client.get(url)['ETag']
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+            self.assertEqual(response['ETag'], etag)
+
+    def test_if_none_match_stale(self):
+        response = self.client.get(
+            reverse('pois-list'), HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_ignored(self):
+        """
+        Last-Modified doesn't move when a POI is deleted, so only the ETag
+        answers conditional requests
+        """
+        url = reverse('pois-list')
+        last_modified = self.client.get(url)['Last-Modified']
+
+        PointOfInterest.objects.filter(id=2).delete()
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_none_match_any_missing(self):
+        response = self.client.get(
+            reverse('poi-details', kwargs={'id': '999'}),
+            HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+    def test_poi_change(self):
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+
+        PointOfInterest.objects.get(id=1).save()
+
+        for url, etag in zip(self.urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+
+    def test_related_change(self):
+        url = reverse('poi-details', kwargs={'id': '1'})
+        etag = self.client.get(url)['ETag']
+
+        image = Image.objects.get(id=1)
+        image.caption = 'Bark!'
+        image.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_poi_deleted(self):
+        url = reverse('pois-list')
+        etag = self.client.get(url)['ETag']
+
+        PointOfInterest.objects.filter(id=2).delete()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_other_category_unaffected(self):
+        url = reverse('pois-categories', kwargs={'id': '1'})
+        etag = self.client.get(url)['ETag']
+
+        PointOfInterest.objects.get(id=2).save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,118 @@
+import json
+import os
+from StringIO import StringIO
+
+import PIL.Image
+from mock import patch
+from django.conf import settings
+from django.test import TestCase
+from django.core.files import File
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+
+from working_waterfronts.working_waterfronts_api import derivatives
+from working_waterfronts.working_waterfronts_api.models import Image
+
+TESTDATA = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'testdata'))
+
+
+class DerivativesTestCase(TestCase):
+
+    """
+    Test the resized derivatives of images, and the make_image_derivatives
+    command that backfills them.
+    """
+    fixtures = ['test_fixtures']
+
+    def setUp(self):
+        with open(os.path.join(TESTDATA, 'media', 'dog.jpg'), 'rb') as f:
+            self.image = Image(name="A puppy", caption="Yip!")
+            self.image.image.save('dog.jpg', File(f), save=False)
+            self.image.save()
+
+    def tearDown(self):
+        image = Image.objects.filter(id=self.image.id).first()
+        if image is not None:
+            derivatives.delete(image)
+        self.image.image.delete(save=False)
+
+    def test_orient(self):
+        picture = PIL.Image.new('RGB', (3, 2))
+        picture._getexif = lambda: {derivatives.ORIENTATION: 6}
+        self.assertEqual(derivatives.orient(picture).size, (2, 3))
+
+        picture = PIL.Image.new('RGB', (3, 2))
+        self.assertEqual(derivatives.orient(picture).size, (3, 2))
+
+    def test_command(self):
+        stdout = StringIO()
+        stderr = StringIO()
+        call_command(
+            'make_image_derivatives', stdout=stdout, stderr=stderr)
+
+        self.assertIn("Made the derivatives of 1 images.", stdout.getvalue())
+        # The fixtures' files don't exist
+        self.assertIn("Image 1:", stderr.getvalue())
+
+        image = Image.objects.get(id=self.image.id)
+        made = json.loads(image.derivatives)
+        self.assertEqual(
+            set(d['size'] for d in made),
+            set(size for size, edge in settings.IMAGE_DERIVATIVE_SIZES))
+        # dog.jpg is smaller than a thumbnail
+        self.assertEqual(
+            set(d['width'] for d in made), set([200]))
+
+    def test_links(self):
+        derivatives.generate(self.image)
+        self.image.save()
+        self.image.pointofinterest_set.add(1)
+
+        response = self.client.get(
+            reverse('poi-details', kwargs={'id': '1'}))
+        images = json.loads(response.content)['images']
+        links = [image['derivatives'] for image in images
+                 if image['name'] == "A puppy"][0]
+        self.assertTrue(links)
+        for link in links:
+            self.assertIn('/media/images/derivatives/', link['link'])
+            self.assertIn(link['format'], derivatives.FORMATS)
+
+    def test_failure_keeps_old(self):
+        """
+        The old derivatives are kept if the original can't be read
+        """
+        derivatives.generate(self.image)
+        self.image.save()
+        old = self.image.derivatives
+        names = [d['name'] for d in json.loads(old)]
+
+        with patch.object(PIL.Image, 'open', side_effect=IOError):
+            self.assertRaises(IOError, derivatives.generate, self.image)
+
+        self.assertEqual(self.image.derivatives, old)
+        for name in names:
+            self.assertTrue(self.image.image.storage.exists(name))
+
+    def test_regenerate(self):
+        """
+        Derivatives made again with the same content aren't deleted
+        """
+        derivatives.generate(self.image)
+        derivatives.generate(self.image)
+        self.image.save()
+
+        for derivative in json.loads(self.image.derivatives):
+            self.assertTrue(
+                self.image.image.storage.exists(derivative['name']))
+
+    def test_deleted_with_image(self):
+        derivatives.generate(self.image)
+        self.image.save()
+        names = [d['name'] for d in json.loads(self.image.derivatives)]
+
+        Image.objects.get(id=self.image.id).delete()
+
+        for name in names:
+            self.assertFalse(self.image.image.storage.exists(name))
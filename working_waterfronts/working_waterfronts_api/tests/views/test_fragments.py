@@ -0,0 +1,203 @@
+import json
+
+from mock import patch
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from working_waterfronts.working_waterfronts_api import fragments, signals
+from working_waterfronts.working_waterfronts_api.functions import (
+    order_by_distance)
+from working_waterfronts.working_waterfronts_api.models import (
+    PointOfInterest, PointOfInterestFragment, Image, Category)
+from working_waterfronts.working_waterfronts_api.views.serializer import (
+    PointOfInterestEncoder)
+from django.contrib.gis.geos import fromstr
+
+
+class FragmentTestCase(TestCase):
+
+    """
+    Test that the POI read model matches the encoder and is rebuilt when a
+    POI or anything it embeds changes.
+    """
+    fixtures = ['test_fixtures']
+
+    def fragment(self, id):
+        return json.loads(
+            PointOfInterestFragment.objects.get(pointofinterest=id).json)
+
+    def expected(self, id):
+        return json.loads(PointOfInterestEncoder().encode(
+            PointOfInterestEncoder().get(
+                PointOfInterest.objects.filter(id=id))))
+
+    def test_built_from_fixtures(self):
+        self.assertEqual(PointOfInterestFragment.objects.count(), 2)
+        self.assertEqual(self.fragment(1), self.expected(1))
+        self.assertEqual(self.fragment(2), self.expected(2))
+
+    def test_columns(self):
+        poi = PointOfInterest.objects.get(id=1)
+        fragment = PointOfInterestFragment.objects.get(pointofinterest=1)
+
+        self.assertEqual(fragment.location, poi.location)
+        self.assertEqual(
+            sorted(fragment.categories),
+            sorted(poi.categories.values_list('id', flat=True)))
+
+    def test_categories_contains(self):
+        self.assertEqual(
+            list(PointOfInterestFragment.objects.filter(
+                categories__contains=[2]).values_list(
+                    'pointofinterest', flat=True)),
+            [2])
+
+    def test_load(self):
+        pois = fragments.load(
+            PointOfInterestFragment.objects.order_by('pointofinterest'))
+        self.assertEqual(
+            [json.loads(poi) for poi in pois],
+            [self.expected(1), self.expected(2)])
+
+    def test_limit(self):
+        pois = fragments.load(
+            PointOfInterestFragment.objects.order_by('pointofinterest'), 1)
+        self.assertEqual(
+            [json.loads(poi) for poi in pois], [self.expected(1)])
+
+    def test_distance(self):
+        point = fromstr('POINT(-124.10534 43.966874)', srid=4326)
+        pois = fragments.load(
+            order_by_distance(PointOfInterestFragment.objects.all(), point),
+            distance=True)
+
+        nearest = json.loads(pois[0])
+        self.assertEqual(nearest['id'], 1)
+        self.assertAlmostEqual(nearest['distance'], 0, places=3)
+        self.assertGreater(json.loads(pois[1])['distance'], 0)
+
+    def test_get_missing(self):
+        with self.assertRaises(PointOfInterest.DoesNotExist):
+            fragments.get(
+                PointOfInterestFragment.objects.filter(pointofinterest=999))
+
+    def test_poi_saved(self):
+        poi = PointOfInterest.objects.get(id=1)
+        poi.name = 'Renamed'
+        poi.location = fromstr('POINT(-124 44)', srid=4326)
+        poi.save()
+
+        self.assertEqual(self.fragment(1)['name'], 'Renamed')
+        self.assertEqual(self.fragment(1), self.expected(1))
+        self.assertEqual(
+            PointOfInterestFragment.objects.get(
+                pointofinterest=1).location, poi.location)
+
+    def test_related_saved(self):
+        image = Image.objects.get(id=1)
+        image.caption = 'Bark!'
+        image.save()
+
+        self.assertEqual(self.fragment(1)['images'][0]['caption'], 'Bark!')
+        self.assertEqual(self.fragment(1), self.expected(1))
+
+    def test_related_deleted(self):
+        Image.objects.get(id=1).delete()
+
+        self.assertEqual(self.fragment(1)['images'], [])
+
+    def test_m2m_changed(self):
+        PointOfInterest.objects.get(id=1).categories.add(
+            Category.objects.get(id=2))
+        self.assertEqual(
+            sorted(c['id'] for c in self.fragment(1)['categories']), [1, 2])
+        self.assertEqual(
+            sorted(PointOfInterestFragment.objects.get(
+                pointofinterest=1).categories), [1, 2])
+
+        Category.objects.get(id=2).pointofinterest_set.clear()
+        self.assertEqual(
+            [c['id'] for c in self.fragment(1)['categories']], [1])
+        self.assertEqual(self.fragment(2)['categories'], [])
+
+    def test_poi_deleted(self):
+        PointOfInterest.objects.get(id=1).delete()
+
+        self.assertFalse(PointOfInterestFragment.objects.filter(
+            pointofinterest=1).exists())
+
+    def test_rebuilt_after_migrate(self):
+        """
+        Migrations that replace the read model have it rebuilt once migrate
+        has finished
+        """
+        PointOfInterestFragment.objects.all().delete()
+        fragments.rebuild_after_migrate()
+        self.assertFalse(PointOfInterestFragment.objects.exists())
+
+        signals.rebuild_migrated_fragments(sender=None)
+        self.assertEqual(self.fragment(1), self.expected(1))
+        self.assertEqual(self.fragment(2), self.expected(2))
+
+    def test_not_rebuilt_after_partial_migrate(self):
+        """
+        The read model isn't built while migrations are unapplied, as the
+        models don't match the schema yet
+        """
+        PointOfInterestFragment.objects.all().delete()
+        fragments.rebuild_after_migrate()
+        try:
+            with patch('django.db.migrations.executor.MigrationExecutor.'
+                       'migration_plan', return_value=[('unapplied', False)]):
+                signals.rebuild_migrated_fragments(sender=None, verbosity=0)
+            self.assertFalse(PointOfInterestFragment.objects.exists())
+            self.assertTrue(fragments.rebuild_pending())
+        finally:
+            signals.rebuild_migrated_fragments(sender=None)
+        self.assertEqual(self.fragment(1), self.expected(1))
+
+    def test_build_locks(self):
+        """
+        Concurrent builds of a POI take turns, rather than one's rows being
+        dropped
+        """
+        with CaptureQueriesContext(connection) as queries:
+            fragments.build([1])
+
+        locks = [q for q in queries.captured_queries if q['sql'].startswith(
+            'SELECT "working_waterfronts_api_pointofinterest"."id"') and
+            q['sql'].endswith('FOR UPDATE')]
+        self.assertEqual(len(locks), 1)
+        self.assertEqual(self.fragment(1), self.expected(1))
+
+    def test_deferred(self):
+        poi = PointOfInterest.objects.get(id=1)
+        with CaptureQueriesContext(connection) as queries:
+            with fragments.deferred():
+                poi.categories.add(Category.objects.get(id=2))
+                poi.name = 'Renamed'
+                poi.save()
+                self.assertEqual(
+                    self.fragment(1)['name'], 'Newport Lighthouse')
+
+        deletes = [q for q in queries.captured_queries if q['sql'].startswith(
+            'DELETE FROM "working_waterfronts_api_pointofinterestfragment"')]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(self.fragment(1), self.expected(1))
+
+    def test_deferred_raises(self):
+        """
+        The changes saved before the block raised are still rebuilt
+        """
+        poi = PointOfInterest.objects.get(id=1)
+        try:
+            with fragments.deferred():
+                poi.name = 'Renamed'
+                poi.save()
+                raise ValueError()
+        except ValueError:
+            pass
+
+        self.assertEqual(self.fragment(1)['name'], 'Renamed')
+        self.assertEqual(self.fragment(1), self.expected(1))
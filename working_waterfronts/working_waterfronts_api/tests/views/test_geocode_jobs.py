@@ -0,0 +1,130 @@
+import datetime
+import json
+import os
+
+from mock import patch
+from django.test import TestCase
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from working_waterfronts.working_waterfronts_api import geocode_jobs
+from working_waterfronts.working_waterfronts_api.geocoders import (
+    GeocodingError)
+from working_waterfronts.working_waterfronts_api.models import (
+    PointOfInterest, GeocodeJob)
+
+GAZETTEER = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'testdata', 'gazetteer.csv'))
+
+
+@override_settings(
+    GEOCODER='working_waterfronts.working_waterfronts_api.geocoders.'
+             'GazetteerGeocoder',
+    GEOCODER_GAZETTEER=GAZETTEER)
+class GeocodeJobsTestCase(TestCase):
+
+    """
+    Test the queue that geocodes POIs saved with an address and no
+    coordinates.
+    """
+    fixtures = ['test_fixtures']
+
+    def setUp(self):
+        self.poi = PointOfInterest.objects.get(id=2)
+        self.poi.street = '750 NW Lighthouse Dr'
+        self.poi.city = 'Newport'
+        self.poi.state = 'OR'
+        self.poi.zip = '97365'
+        self.poi.location = None
+        self.poi.location_status = PointOfInterest.PENDING
+        self.poi.save()
+        geocode_jobs.enqueue(self.poi)
+
+    def public_ids(self):
+        response = self.client.get(reverse('pois-list'))
+        return [poi['id'] for poi in
+                json.loads(response.content)['pointsofinterest']]
+
+    def test_pending_not_public(self):
+        self.assertEqual(self.public_ids(), [1])
+
+        self.assertEqual(geocode_jobs.run_pending(), 1)
+
+        poi = PointOfInterest.objects.get(id=2)
+        self.assertEqual(poi.location_status, PointOfInterest.LOCATED)
+        self.assertEqual(poi.location.y, 44.6752643)
+        self.assertEqual(sorted(self.public_ids()), [1, 2])
+        self.assertFalse(GeocodeJob.objects.exists())
+
+    def test_moved_not_public(self):
+        """
+        A POI waiting for its new address to be geocoded isn't served at
+        its old location
+        """
+        poi = PointOfInterest.objects.get(id=1)
+        poi.location_status = PointOfInterest.PENDING
+        poi.save()
+        geocode_jobs.enqueue(poi)
+
+        self.assertEqual(self.public_ids(), [])
+
+    def test_claim(self):
+        job = geocode_jobs.claim()
+        self.assertEqual(job.pointofinterest_id, 2)
+        self.assertIsNone(geocode_jobs.claim())
+
+        # A job locked by a worker that died is claimed again
+        with override_settings(GEOCODE_JOB_LOCK_TIMEOUT=-1):
+            self.assertEqual(geocode_jobs.claim().pk, job.pk)
+
+    @patch('working_waterfronts.working_waterfronts_api.geocoders.'
+           'GazetteerGeocoder.geocode')
+    @override_settings(GEOCODE_JOB_RETRY=60, GEOCODE_JOB_RETRY_MAX=90)
+    def test_retry(self, geocode):
+        geocode.side_effect = GeocodingError("Service unavailable")
+
+        self.assertEqual(geocode_jobs.run_pending(), 1)
+
+        job = GeocodeJob.objects.get()
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(job.locked)
+        self.assertIn("Service unavailable", job.error)
+        self.assertGreater(
+            job.run_after, timezone.now() + datetime.timedelta(seconds=50))
+        self.assertEqual(
+            PointOfInterest.objects.get(id=2).location_status,
+            PointOfInterest.PENDING)
+
+        # Not due yet
+        self.assertEqual(geocode_jobs.run_pending(), 0)
+
+        # The delay doubles, up to GEOCODE_JOB_RETRY_MAX
+        GeocodeJob.objects.update(run_after=timezone.now())
+        geocode_jobs.run_pending()
+        job = GeocodeJob.objects.get()
+        self.assertEqual(job.attempts, 2)
+        self.assertLess(
+            job.run_after, timezone.now() + datetime.timedelta(seconds=91))
+
+    def test_replaced_job_dropped(self):
+        job = geocode_jobs.claim()
+
+        # The address is edited while the old one is being geocoded
+        geocode_jobs.enqueue(self.poi)
+        geocode_jobs.run(job)
+
+        self.assertEqual(
+            PointOfInterest.objects.get(id=2).location_status,
+            PointOfInterest.PENDING)
+        self.assertNotEqual(GeocodeJob.objects.get().pk, job.pk)
+
+    def test_not_found(self):
+        PointOfInterest.objects.filter(id=2).update(street='1 Nowhere Rd')
+        geocode_jobs.run_pending()
+
+        poi = PointOfInterest.objects.get(id=2)
+        self.assertEqual(poi.location_status, PointOfInterest.FAILED)
+        self.assertIsNone(poi.location)
+        self.assertEqual(self.public_ids(), [1])
+        self.assertFalse(GeocodeJob.objects.exists())
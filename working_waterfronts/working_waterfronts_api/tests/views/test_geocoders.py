@@ -0,0 +1,150 @@
+import os
+
+import requests
+from mock import patch, Mock
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from working_waterfronts.working_waterfronts_api.geocoders import (
+    GoogleGeocoder, GazetteerGeocoder, BadAddressException, GeocodingError,
+    get_geocoder)
+
+GAZETTEER = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'testdata', 'gazetteer.csv'))
+
+address = ['750 NW Lighthouse Dr', 'Newport', 'OR', '97365']
+
+
+def google_response(status='OK', location_type='ROOFTOP', status_code=200):
+    results = []
+    if status == 'OK':
+        results = [{'geometry': {
+            'location_type': location_type,
+            'location': {'lat': 44.6752643, 'lng': -124.072162}}}]
+    return Mock(status_code=status_code, json=Mock(
+        return_value={'status': status, 'results': results}))
+
+
+@patch('working_waterfronts.working_waterfronts_api.geocoders.time.sleep')
+@override_settings(
+    GEOCODE_TIMEOUT=(3.05, 10), GEOCODE_RETRIES=2, GEOCODE_BACKOFF=0.5,
+    GEOCODE_BREAKER_FAILURES=2, GEOCODE_BREAKER_RESET=60)
+class GoogleGeocoderTestCase(TestCase):
+
+    """
+    Test the Google geocoder's response handling, retries and circuit
+    breaker, without calling the API.
+    """
+
+    def setUp(self):
+        self.geocoder = GoogleGeocoder()
+        self.geocoder.session = Mock()
+        self.get = self.geocoder.session.get
+
+    def test_geocode(self, sleep):
+        self.get.return_value = google_response()
+        self.assertEqual(
+            self.geocoder.geocode(*address), [44.6752643, -124.072162])
+
+        args, kwargs = self.get.call_args
+        self.assertEqual(
+            kwargs['params'],
+            {'address': '750 NW Lighthouse Dr, Newport, OR 97365'})
+        self.assertEqual(kwargs['timeout'], (3.05, 10))
+        self.assertFalse(sleep.called)
+
+    def test_bad_address(self, sleep):
+        for response in [google_response(status='ZERO_RESULTS'),
+                         google_response(status='INVALID_REQUEST'),
+                         google_response(location_type='APPROXIMATE')]:
+            self.get.return_value = response
+            with self.assertRaises(BadAddressException):
+                self.geocoder.geocode(*address)
+
+        # Bad addresses aren't retried, and don't trip the breaker
+        self.assertEqual(self.get.call_count, 3)
+        self.assertIsNone(self.geocoder.opened)
+
+    def test_retries_with_backoff(self, sleep):
+        self.get.side_effect = [
+            requests.Timeout(), google_response(status_code=503),
+            google_response()]
+        self.assertEqual(
+            self.geocoder.geocode(*address), [44.6752643, -124.072162])
+
+        self.assertEqual(self.get.call_count, 3)
+        self.assertEqual(
+            [args[0] for args, kwargs in sleep.call_args_list], [0.5, 1.0])
+
+    def test_gives_up(self, sleep):
+        self.get.return_value = google_response(status='OVER_QUERY_LIMIT')
+        with self.assertRaises(GeocodingError):
+            self.geocoder.geocode(*address)
+        self.assertEqual(self.get.call_count, 3)
+
+    @patch('working_waterfronts.working_waterfronts_api.geocoders.time.time')
+    def test_circuit_breaker(self, now, sleep):
+        now.return_value = 1000
+        self.get.side_effect = requests.ConnectionError()
+        for attempt in range(2):
+            with self.assertRaises(GeocodingError):
+                self.geocoder.geocode(*address)
+        self.assertEqual(self.get.call_count, 6)
+
+        # Open: fail without calling the API
+        with self.assertRaises(GeocodingError):
+            self.geocoder.geocode(*address)
+        self.assertEqual(self.get.call_count, 6)
+
+        # Half open: one lookup is let through, and closes it
+        now.return_value = 1061
+        self.get.side_effect = None
+        self.get.return_value = google_response()
+        self.geocoder.geocode(*address)
+        self.geocoder.geocode(*address)
+        self.assertEqual(self.get.call_count, 8)
+        self.assertIsNone(self.geocoder.opened)
+
+    @patch('working_waterfronts.working_waterfronts_api.geocoders.time.time')
+    def test_bad_address_closes_breaker(self, now, sleep):
+        now.return_value = 1000
+        self.get.side_effect = requests.ConnectionError()
+        for attempt in range(2):
+            with self.assertRaises(GeocodingError):
+                self.geocoder.geocode(*address)
+
+        # The lookup let through finds a bad address, so the API is up
+        now.return_value = 1061
+        self.get.side_effect = None
+        self.get.return_value = google_response(status='ZERO_RESULTS')
+        with self.assertRaises(BadAddressException):
+            self.geocoder.geocode(*address)
+        self.assertIsNone(self.geocoder.opened)
+        self.assertEqual(self.geocoder.failures, 0)
+
+
+@override_settings(
+    GEOCODER='working_waterfronts.working_waterfronts_api.geocoders.'
+             'GazetteerGeocoder',
+    GEOCODER_GAZETTEER=GAZETTEER)
+class GazetteerGeocoderTestCase(TestCase):
+
+    """
+    Test the gazetteer geocoder used offline.
+    """
+
+    def test_get_geocoder(self):
+        geocoder = get_geocoder()
+        self.assertIsInstance(geocoder, GazetteerGeocoder)
+        self.assertIs(get_geocoder(), geocoder)
+
+    def test_found(self):
+        self.assertEqual(
+            get_geocoder().geocode(
+                '750 N.W. Lighthouse Dr.', 'NEWPORT', 'OR', '97365'),
+            [44.6752643, -124.072162])
+
+    def test_not_found(self):
+        with self.assertRaises(BadAddressException):
+            get_geocoder().geocode(
+                '123 Fake Street', 'Springfield', 'OR', '97477')
@@ -0,0 +1,137 @@
+import io
+import os
+from StringIO import StringIO
+
+from mock import patch
+from django.test import TestCase
+from django.db import connection
+from django.core.management import call_command
+from django.test.utils import override_settings, CaptureQueriesContext
+
+from working_waterfronts.working_waterfronts_api import importer
+from working_waterfronts.working_waterfronts_api.geocoders import (
+    GeocodingError)
+from working_waterfronts.working_waterfronts_api.models import (
+    PointOfInterest, PointOfInterestFragment, GeocodeJob)
+
+TESTDATA = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'testdata'))
+
+
+@override_settings(
+    GEOCODER='working_waterfronts.working_waterfronts_api.geocoders.'
+             'GazetteerGeocoder',
+    GEOCODER_GAZETTEER=os.path.join(TESTDATA, 'gazetteer.csv'),
+    IMPORT_GEOCODE_RATE=1000)
+class ImportPointsOfInterestTestCase(TestCase):
+
+    """
+    Test the import_pois management command.
+    """
+    fixtures = ['test_fixtures']
+
+    def import_pois(self, name):
+        stdout = StringIO()
+        stderr = StringIO()
+        call_command(
+            'import_pois', os.path.join(TESTDATA, name), stdout=stdout,
+            stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_csv(self):
+        stdout, stderr = self.import_pois('import_pois.csv')
+
+        self.assertIn("Imported 2 points of interest", stdout)
+        self.assertIn("skipped 3 rows", stdout)
+        self.assertIn("Row 4: Address", stderr)
+        self.assertIn("Row 5: You must choose at least one category.", stderr)
+        self.assertIn("Row 6: Unknown categories: boring stuff", stderr)
+
+        bridge = PointOfInterest.objects.get(name='Yaquina Bay Bridge')
+        self.assertEqual(bridge.location.y, 44.6217)
+        self.assertEqual(bridge.location.x, -124.0563)
+        self.assertEqual(
+            [c.id for c in bridge.categories.all()], [1])
+        self.assertEqual([h.id for h in bridge.hazards.all()], [1])
+        self.assertEqual(
+            sorted(i.id for i in bridge.images.all()), [1, 2])
+
+        # Geocoded from its address
+        lighthouse = PointOfInterest.objects.get(
+            name='Yaquina Head Lighthouse')
+        self.assertEqual(lighthouse.location.y, 44.6752643)
+        self.assertEqual(
+            lighthouse.location_status, PointOfInterest.LOCATED)
+        self.assertEqual(
+            sorted(c.id for c in lighthouse.categories.all()), [1, 2])
+        self.assertEqual([v.id for v in lighthouse.videos.all()], [1])
+
+        # Public, as if saved through the entry form
+        self.assertEqual(PointOfInterestFragment.objects.filter(
+            pointofinterest__in=[bridge, lighthouse]).count(), 2)
+
+    def test_geojson(self):
+        stdout, stderr = self.import_pois('import_pois.geojson')
+
+        self.assertIn("Imported 1 points of interest", stdout)
+        self.assertIn(
+            "Row 2: Only Point geometries can be imported.", stderr)
+
+        bridge = PointOfInterest.objects.get(name='Yaquina Bay Bridge')
+        self.assertEqual(bridge.location.y, 44.6217)
+        self.assertEqual(
+            sorted(c.id for c in bridge.categories.all()), [1, 2])
+
+    def test_geojson_streamed(self):
+        with io.open(os.path.join(TESTDATA, 'import_pois.geojson'),
+                     encoding='utf-8') as f:
+            rows = list(importer.read_geojson(f, chunk_size=7))
+        self.assertEqual([number for number, row in rows], [1, 2])
+        self.assertEqual(rows[0][1]['name'], 'Yaquina Bay Bridge')
+        self.assertEqual(rows[0][1]['latitude'], 44.6217)
+
+    @patch('working_waterfronts.working_waterfronts_api.geocoders.'
+           'GazetteerGeocoder.geocode')
+    def test_geocoder_down(self, geocode):
+        geocode.side_effect = GeocodingError("Service unavailable")
+        stdout, stderr = self.import_pois('import_pois.csv')
+
+        self.assertIn("(2 waiting to be geocoded)", stdout)
+        lighthouse = PointOfInterest.objects.get(
+            name='Yaquina Head Lighthouse')
+        self.assertIsNone(lighthouse.location)
+        self.assertEqual(
+            lighthouse.location_status, PointOfInterest.PENDING)
+        self.assertTrue(
+            GeocodeJob.objects.filter(pointofinterest=lighthouse).exists())
+
+    def test_queries_per_batch(self):
+        row = {
+            'name': 'POI', 'description': 'A place', 'history': 'None',
+            'facts': 'None', 'street': 'Highway 101', 'city': 'Newport',
+            'state': 'OR', 'zip': '97365', 'contact_name': 'Somebody',
+            'latitude': '44.6', 'longitude': '-124.0',
+            'categories': 'Cool Stuff;2', 'hazards': '1'}
+        pois = importer.Importer(batch_size=100)
+
+        with CaptureQueriesContext(connection) as queries:
+            pois.run((number, dict(row)) for number in range(100))
+
+        self.assertEqual(pois.created, 100)
+        self.assertLess(len(queries), 30)
+        self.assertEqual(
+            PointOfInterest.objects.filter(name='POI').count(), 100)
+        self.assertEqual(
+            PointOfInterest.categories.through.objects.filter(
+                pointofinterest__name='POI').count(), 200)
+
+    def test_zero_coordinate(self):
+        row = {
+            'name': 'Null Island', 'description': 'A place',
+            'history': 'None', 'facts': 'None', 'street': 'Nowhere',
+            'city': 'Nowhere', 'state': 'OR', 'zip': '00000',
+            'contact_name': 'Somebody', 'latitude': 0, 'longitude': '0.0',
+            'categories': '1'}
+        prepared = importer.Importer().prepare(1, row)
+
+        self.assertEqual(prepared.poi.location.coords, (0, 0))
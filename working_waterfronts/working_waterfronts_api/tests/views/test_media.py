@@ -0,0 +1,154 @@
+import json
+import os
+
+from django.test import TestCase
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+
+from working_waterfronts.working_waterfronts_api.models import Image
+
+TESTDATA = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'testdata'))
+
+
+class MediaTestCase(TestCase):
+
+    """
+    Test that /media serves the files of images, in part or whole, or hands
+    them to the web server.
+    """
+
+    def setUp(self):
+        with open(os.path.join(TESTDATA, 'media', 'dog.jpg'), 'rb') as f:
+            self.content = f.read()
+            self.image = Image(name="A dog")
+            self.image.image.save('dog.jpg', File(f), save=False)
+            self.image.save()
+        self.url = reverse('media', kwargs={'path': self.image.image.name})
+        self.sha256 = os.path.splitext(
+            os.path.basename(self.image.image.name))[0]
+
+    def tearDown(self):
+        self.image.image.delete(save=False)
+
+    def test_url_endpoint(self):
+        self.assertEqual(self.url, '/media/' + self.image.image.name)
+        self.assertEqual(self.url, self.image.image.url)
+
+    def test_whole_file(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], '"%s"' % self.sha256)
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            ''.join(response.streaming_content), self.content[10:20])
+        self.assertEqual(
+            response['Content-Range'],
+            'bytes 10-19/%d' % len(self.content))
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            ''.join(response.streaming_content), self.content[-5:])
+
+        response = self.client.get(
+            self.url, HTTP_RANGE='bytes=%d-' % len(self.content))
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(
+            response['Content-Range'], 'bytes */%d' % len(self.content))
+
+    def test_if_range(self):
+        response = self.client.get(
+            self.url, HTTP_RANGE='bytes=10-19',
+            HTTP_IF_RANGE='"%s"' % self.sha256)
+        self.assertEqual(response.status_code, 206)
+
+        # The client's copy is out of date, so it gets the whole file
+        response = self.client.get(
+            self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_method_not_allowed(self):
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET, HEAD')
+
+    def test_not_modified(self):
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH='"%s"' % self.sha256)
+        self.assertEqual(response.status_code, 304)
+
+    def test_derivatives(self):
+        name = self.image.image.storage.save(
+            'images/derivatives/dog-thumbnail.jpg', ContentFile('Woof!'))
+        self.image.derivatives = json.dumps([{
+            'size': 'thumbnail', 'format': 'jpeg', 'name': name,
+            'width': 1, 'height': 1}])
+        self.image.save()
+        try:
+            response = self.client.get(
+                reverse('media', kwargs={'path': name}))
+            self.assertEqual(''.join(response.streaming_content), 'Woof!')
+        finally:
+            self.image.image.storage.delete(name)
+
+    def test_substring_not_served(self):
+        """
+        Only whole names an Image lists are served, not parts of them
+        """
+        name = self.image.image.storage.save(
+            'images/dog.jpg', ContentFile('Woof!'))
+        self.image.derivatives = json.dumps([{
+            'size': 'thumbnail', 'format': 'jpeg', 'name': name + '.webp',
+            'width': 1, 'height': 1}])
+        self.image.save()
+        try:
+            response = self.client.get(
+                reverse('media', kwargs={'path': name}))
+            self.assertEqual(response.status_code, 404)
+        finally:
+            self.image.image.storage.delete(name)
+
+    def test_not_an_image(self):
+        name = self.image.image.storage.save(
+            'images/secret.txt', ContentFile('Nobody refers to me'))
+        try:
+            response = self.client.get(
+                reverse('media', kwargs={'path': name}))
+            self.assertEqual(response.status_code, 404)
+        finally:
+            self.image.image.storage.delete(name)
+
+        response = self.client.get('/media/../../etc/passwd')
+        self.assertIn(response.status_code, [400, 404])
+
+    @override_settings(MEDIA_SERVER='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, '')
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/' + self.image.image.name)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['ETag'], '"%s"' % self.sha256)
+
+    @override_settings(MEDIA_SERVER='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.content, '')
+        self.assertEqual(
+            response['X-Sendfile'], self.image.image.path)
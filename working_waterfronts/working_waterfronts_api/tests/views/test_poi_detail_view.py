@@ -56,6 +56,11 @@ class POIViewTestCase(TestCase):
   "images": [
       {
           "caption": "Woof!",
+          "width": null,
+          "height": null,
+          "bytes": null,
+          "sha256": null,
+          "derivatives": [],
           "link": "/media/dog.jpg",
           "name": "A dog"
       }
@@ -1,9 +1,17 @@
 import json
+import math
 
 from django.test import TestCase
 from django.test.client import Client
 from django.core.urlresolvers import reverse
-from django.test.utils import override_settings
+from django.test.utils import override_settings, CaptureQueriesContext
+from django.db import connection
+from django.contrib.gis.geos import fromstr
+from django.contrib.gis.measure import D
+
+from working_waterfronts.working_waterfronts_api.models import PointOfInterest
+from working_waterfronts.working_waterfronts_api.functions import (
+    within_proximity)
 
 
 class PointsOfInterestTestCase(TestCase):
@@ -63,6 +71,11 @@ class PointsOfInterestTestCase(TestCase):
       "images": [
         {
           "caption": "Woof!",
+          "width": null,
+          "height": null,
+          "bytes": null,
+          "sha256": null,
+          "derivatives": [],
           "link": "/media/dog.jpg",
           "name": "A dog"
         }
@@ -120,6 +133,11 @@ in you being abducted by aliens.",
         ],
         "images": [
           {
+            "width": null,
+            "height": null,
+            "bytes": null,
+            "sha256": null,
+            "derivatives": [],
             "link": "/media/cat.jpg",
             "caption": "Meow!",
             "name": "A cat"
@@ -258,6 +276,11 @@ class PointsOfInterestLocationTestCase(TestCase):
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -327,6 +350,11 @@ class PointsOfInterestLocationTestCase(TestCase):
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -399,6 +427,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -468,6 +501,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -555,6 +593,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -624,6 +667,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -696,6 +744,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -765,6 +818,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -841,6 +899,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -910,6 +973,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -1010,6 +1078,11 @@ WKT EWKT, and HEXEWKB."
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -1074,6 +1147,11 @@ WKT EWKT, and HEXEWKB."
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -1138,6 +1216,11 @@ WKT EWKT, and HEXEWKB."
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "caption": "Woof!",
       "name": "A dog"}],
@@ -1205,6 +1288,11 @@ being abducted by aliens.",
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -1269,6 +1357,11 @@ being abducted by aliens.",
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "caption": "Woof!",
       "name": "A dog"}],
@@ -1336,6 +1429,11 @@ being abducted by aliens.",
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "caption": "Woof!",
       "name": "A dog"}],
@@ -1403,6 +1501,11 @@ being abducted by aliens.",
           "id": 7,
       "name": "Pacific City Tuna",
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -1467,6 +1570,11 @@ being abducted by aliens.",
           "id": 8,
       "name": "Pacific City Halibut",
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "caption": "Woof!",
       "name": "A dog"}],
@@ -1538,6 +1646,11 @@ Geometry returned from GEOS C function \\"GEOSWKTReader_read_r\\"."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -1607,6 +1720,11 @@ Geometry returned from GEOS C function \\"GEOSWKTReader_read_r\\"."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -1676,6 +1794,11 @@ Geometry returned from GEOS C function \\"GEOSWKTReader_read_r\\"."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -1748,6 +1871,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -1817,6 +1945,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -1889,6 +2022,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -1965,6 +2103,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -2034,6 +2177,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -2119,6 +2267,11 @@ returned from GEOS C function \\"GEOSWKTReader_read_r\\"."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -2188,6 +2341,11 @@ returned from GEOS C function \\"GEOSWKTReader_read_r\\"."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -2257,6 +2415,11 @@ returned from GEOS C function \\"GEOSWKTReader_read_r\\"."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -2329,6 +2492,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -2398,6 +2566,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -2470,6 +2643,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -2546,6 +2724,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -2615,6 +2798,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -2696,6 +2884,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -2765,6 +2958,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -2837,6 +3035,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -2920,6 +3123,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -2989,6 +3197,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -3061,6 +3274,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -3130,6 +3348,11 @@ being abducted by aliens."
   "images": [
     {
       "caption": "Woof!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/dog.jpg",
       "name": "A dog"
     }
@@ -3425,3 +3648,187 @@ being abducted by aliens."
                 poi['categories'], key=lambda k: k['id'])
 
         self.assertEqual(all_pointsofinterest_data, expected_answer)
+
+
+class PointsOfInterestQueryCountTestCase(TestCase):
+
+    """
+    Test that the number of queries used to build the /pois/ list does not
+    grow with the number of POIs returned.
+    """
+    fixtures = ['location_fixtures']
+
+    def assertSameQueryCount(self, url):
+        with CaptureQueriesContext(connection) as one_query:
+            one = json.loads(self.client.get('%s?limit=1' % url).content)
+
+        with CaptureQueriesContext(connection) as all_query:
+            all = json.loads(self.client.get(url).content)
+
+        self.assertEqual(len(one['pointsofinterest']), 1)
+        self.assertGreater(len(all['pointsofinterest']), 1)
+        self.assertEqual(
+            len(one_query.captured_queries), len(all_query.captured_queries))
+
+    def test_query_count_independent_of_size(self):
+        self.assertSameQueryCount(reverse('pois-list'))
+
+    def test_category_query_count_independent_of_size(self):
+        self.assertSameQueryCount(
+            reverse('pois-categories', kwargs={'id': '1'}))
+
+
+class PointsOfInterestProximityTestCase(TestCase):
+
+    """
+    Test that the index-backed proximity filter matches the distance lookup
+    it replaced.
+    """
+    fixtures = ['location_fixtures']
+
+    def test_within_proximity_matches_distance_lookup(self):
+        point = fromstr('POINT(-124.052538 44.609079)', srid=4326)
+
+        for proximity in [1, 5, 20, 50, 200]:
+            expected = PointOfInterest.objects.filter(
+                location__distance_lte=(point, D(mi=proximity)))
+            found = within_proximity(
+                PointOfInterest.objects.all(), point, proximity)
+
+            self.assertEqual(
+                sorted(p.id for p in found), sorted(p.id for p in expected))
+
+
+class PointsOfInterestDistanceOrderTestCase(TestCase):
+
+    """
+    Test the order=distance parameter of the /pois/ view.
+    """
+    fixtures = ['location_fixtures']
+
+    def test_ordered_by_distance(self):
+        response = json.loads(self.client.get(
+            '%s?lat=44.609079&lng=-124.052538&proximity=200&'
+            'order=distance' % reverse('pois-list')).content)
+
+        distances = [poi['distance'] for poi in response['pointsofinterest']]
+        self.assertEqual(len(distances), PointOfInterest.objects.count())
+        self.assertEqual(distances, sorted(distances))
+        self.assertFalse(response['error']['status'])
+
+    def test_distance_in_miles(self):
+        response = json.loads(self.client.get(
+            '%s?lat=44.609079&lng=-124.052538&order=distance' % reverse(
+                'pois-list')).content)
+
+        # Great-circle distance on the mean-radius sphere PostGIS uses
+        lat1, lng1 = math.radians(44.609079), math.radians(-124.052538)
+        for poi in response['pointsofinterest']:
+            lat2, lng2 = math.radians(poi['lat']), math.radians(poi['lng'])
+            a = (math.sin((lat2 - lat1) / 2) ** 2 +
+                 math.cos(lat1) * math.cos(lat2) *
+                 math.sin((lng2 - lng1) / 2) ** 2)
+            expected = D(m=2 * 6371008.8 * math.asin(math.sqrt(a))).mi
+
+            self.assertAlmostEqual(poi['distance'], expected, places=3)
+
+    def test_limit_returns_nearest(self):
+        response = json.loads(self.client.get(
+            '%s?lat=44.609079&lng=-124.052538&proximity=200&'
+            'order=distance&limit=2' % reverse('pois-list')).content)
+
+        self.assertEqual(
+            sorted(poi['id'] for poi in response['pointsofinterest']),
+            [3, 4])
+
+    def test_category_ordered_by_distance(self):
+        response = json.loads(self.client.get(
+            '%s?lat=44.609079&lng=-124.052538&proximity=200&'
+            'order=distance' % reverse(
+                'pois-categories', kwargs={'id': '1'})).content)
+
+        distances = [poi['distance'] for poi in response['pointsofinterest']]
+        self.assertEqual(distances, sorted(distances))
+        self.assertEqual(response['pointsofinterest'][0]['id'], 3)
+
+    def test_unordered_by_default(self):
+        response = json.loads(self.client.get(
+            '%s?lat=44.609079&lng=-124.052538' % reverse(
+                'pois-list')).content)
+
+        for poi in response['pointsofinterest']:
+            self.assertNotIn('distance', poi)
+
+    def test_order_without_location(self):
+        response = json.loads(self.client.get(
+            '%s?order=distance' % reverse('pois-list')).content)
+
+        self.assertEqual(response['error']['name'], 'Bad Order')
+        self.assertEqual(
+            len(response['pointsofinterest']),
+            PointOfInterest.objects.count())
+
+    def test_bad_order(self):
+        response = json.loads(self.client.get(
+            '%s?lat=44.609079&lng=-124.052538&order=name' % reverse(
+                'pois-list')).content)
+
+        self.assertEqual(response['error']['name'], 'Bad Order')
+        for poi in response['pointsofinterest']:
+            self.assertNotIn('distance', poi)
+
+
+class PointsOfInterestBoundingBoxTestCase(TestCase):
+
+    """
+    Test the bbox parameter of the /pois/ and /pois/categories/<id> views.
+    """
+    fixtures = ['location_fixtures']
+
+    def test_bbox(self):
+        # The central coast: Newport and Waldport, but not Lincoln City or
+        # Portland
+        response = json.loads(self.client.get(
+            '%s?bbox=-124.2,44.4,-124.0,44.7' % reverse(
+                'pois-list')).content)
+
+        self.assertFalse(response['error']['status'])
+        self.assertEqual(
+            sorted(poi['id'] for poi in response['pointsofinterest']),
+            [3, 4, 5, 6])
+
+    def test_bbox_category(self):
+        response = json.loads(self.client.get(
+            '%s?bbox=-124.2,44.4,-124.0,44.7' % reverse(
+                'pois-categories', kwargs={'id': '1'})).content)
+
+        self.assertEqual(
+            sorted(poi['id'] for poi in response['pointsofinterest']),
+            [3, 5])
+
+    def test_bbox_with_location(self):
+        response = json.loads(self.client.get(
+            '%s?bbox=-124.2,44.4,-124.0,44.7&lat=44.609079&lng=-124.052538&'
+            'proximity=5' % reverse('pois-list')).content)
+
+        self.assertEqual(
+            sorted(poi['id'] for poi in response['pointsofinterest']),
+            [3, 4])
+
+    def test_empty_bbox(self):
+        response = json.loads(self.client.get(
+            '%s?bbox=-120,40,-119,41' % reverse('pois-list')).content)
+
+        self.assertEqual(response['pointsofinterest'], [])
+        self.assertEqual(response['error']['name'], 'No PointsOfInterest')
+
+    def test_bad_bbox(self):
+        for bbox in ['cat', '-124,44,-123', '-123,44,-124,45',
+                     '-124,44,-123,95']:
+            response = json.loads(self.client.get(
+                '%s?bbox=%s' % (reverse('pois-list'), bbox)).content)
+
+            self.assertEqual(response['error']['name'], 'Bad bounding box')
+            self.assertEqual(
+                len(response['pointsofinterest']),
+                PointOfInterest.objects.count())
@@ -62,6 +62,11 @@ class POIsCategoriesTestCase(TestCase):
       "images": [
         {
           "caption": "Woof!",
+          "width": null,
+          "height": null,
+          "bytes": null,
+          "sha256": null,
+          "derivatives": [],
           "link": "/media/dog.jpg",
           "name": "A dog"
         }
@@ -166,6 +171,11 @@ class POIsCategoriesLocationTestCase(TestCase):
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -235,6 +245,11 @@ class POIsCategoriesLocationTestCase(TestCase):
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -320,6 +335,11 @@ class POIsCategoriesLocationTestCase(TestCase):
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -389,6 +409,11 @@ class POIsCategoriesLocationTestCase(TestCase):
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -462,6 +487,11 @@ class POIsCategoriesLocationTestCase(TestCase):
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -543,6 +573,11 @@ class POIsCategoriesLocationTestCase(TestCase):
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -612,6 +647,11 @@ class POIsCategoriesLocationTestCase(TestCase):
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -693,6 +733,11 @@ class POIsCategoriesLocationTestCase(TestCase):
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -792,6 +837,11 @@ as WKT EWKT, and HEXEWKB."
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -856,6 +906,11 @@ as WKT EWKT, and HEXEWKB."
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -920,6 +975,11 @@ as WKT EWKT, and HEXEWKB."
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -984,6 +1044,11 @@ as WKT EWKT, and HEXEWKB."
           "id": 7,
       "name": "Pacific City Tuna",
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -1050,6 +1115,11 @@ as WKT EWKT, and HEXEWKB."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -1119,6 +1189,11 @@ as WKT EWKT, and HEXEWKB."
   "images": [
     {
       "caption": "Meow!",
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "name": "A cat"
     }
@@ -1215,6 +1290,11 @@ from GEOS C function \\"GEOSWKTReader_read_r\\"."
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -1279,6 +1359,11 @@ from GEOS C function \\"GEOSWKTReader_read_r\\"."
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -1343,6 +1428,11 @@ from GEOS C function \\"GEOSWKTReader_read_r\\"."
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -1407,6 +1497,11 @@ from GEOS C function \\"GEOSWKTReader_read_r\\"."
           "id": 7,
       "name": "Pacific City Tuna",
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -1486,6 +1581,11 @@ returned from GEOS C function \\"GEOSWKTReader_read_r\\"."
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -1550,6 +1650,11 @@ returned from GEOS C function \\"GEOSWKTReader_read_r\\"."
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -1614,6 +1719,11 @@ returned from GEOS C function \\"GEOSWKTReader_read_r\\"."
 
     },
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -1678,6 +1788,11 @@ returned from GEOS C function \\"GEOSWKTReader_read_r\\"."
           "id": 7,
       "name": "Pacific City Tuna",
     "images": [{
+      "width": null,
+      "height": null,
+      "bytes": null,
+      "sha256": null,
+      "derivatives": [],
       "link": "/media/cat.jpg",
       "caption": "Meow!",
       "name": "A cat"}],
@@ -0,0 +1,86 @@
+from django.test import TestCase
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+
+import json
+
+
+class POIsClustersTestCase(TestCase):
+
+    """
+    Test the /pois/clusters and /pois/categories/<id>/clusters views.
+
+    The location fixtures have two POIs each in Portland, Newport, Waldport
+    and Lincoln City, with categories 1, 3 and 5 on the odd POIs and 2, 4
+    and 6 on the even ones.
+    """
+    fixtures = ['location_fixtures']
+
+    def test_url_endpoints(self):
+        self.assertEqual(reverse('pois-clusters'), '/1/pois/clusters')
+        self.assertEqual(
+            reverse('pois-categories-clusters', kwargs={'id': '1'}),
+            '/1/pois/categories/1/clusters')
+
+    def test_city_clusters(self):
+        # At zoom 9 a cell is about 0.18 degrees wide, which groups each
+        # pair of POIs but keeps the cities apart.
+        response = json.loads(self.client.get(
+            '%s?zoom=9' % reverse('pois-clusters')).content)
+
+        clusters = response['clusters']
+        self.assertFalse(response['error']['status'])
+        self.assertEqual(len(clusters), 4)
+
+        for cluster in clusters:
+            self.assertEqual(cluster['count'], 2)
+            self.assertEqual(
+                cluster['categories'],
+                [{'id': c, 'count': 1} for c in range(1, 7)])
+
+            min_lng, min_lat, max_lng, max_lat = cluster['bbox']
+            self.assertTrue(min_lng <= cluster['lng'] <= max_lng)
+            self.assertTrue(min_lat <= cluster['lat'] <= max_lat)
+
+    def test_zoomed_out(self):
+        response = json.loads(self.client.get(
+            '%s?zoom=1' % reverse('pois-clusters')).content)
+
+        self.assertEqual(len(response['clusters']), 1)
+        self.assertEqual(response['clusters'][0]['count'], 8)
+
+    def test_bbox(self):
+        response = json.loads(self.client.get(
+            '%s?zoom=9&bbox=-124.2,44.4,-124.0,44.7' % reverse(
+                'pois-clusters')).content)
+
+        self.assertEqual(
+            sorted(c['count'] for c in response['clusters']), [2, 2])
+
+    def test_category(self):
+        response = json.loads(self.client.get(
+            '%s?zoom=1' % reverse(
+                'pois-categories-clusters', kwargs={'id': '1'})).content)
+
+        cluster = response['clusters'][0]
+        self.assertEqual(cluster['count'], 4)
+        self.assertEqual(
+            cluster['categories'],
+            [{'id': c, 'count': 4} for c in [1, 3, 5]])
+
+    def test_no_pois(self):
+        response = json.loads(self.client.get(
+            '%s?zoom=9&bbox=-120,40,-119,41' % reverse(
+                'pois-clusters')).content)
+
+        self.assertEqual(response['clusters'], [])
+        self.assertEqual(response['error']['name'], 'No PointsOfInterest')
+
+    @override_settings(MAX_CLUSTER_ZOOM=12)
+    def test_bad_zoom(self):
+        for zoom in ['', 'zoom=cat', 'zoom=-1', 'zoom=13']:
+            response = json.loads(self.client.get(
+                '%s?%s' % (reverse('pois-clusters'), zoom)).content)
+
+            self.assertEqual(response['clusters'], [])
+            self.assertEqual(response['error']['name'], 'Bad Zoom')
@@ -0,0 +1,92 @@
+from django.test import TestCase
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+
+from working_waterfronts.working_waterfronts_api.models import PointOfInterest
+from working_waterfronts.working_waterfronts_api.views.serializer import (
+    PointOfInterestEncoder, stream_rows)
+
+import json
+
+
+class POIsGeoJSONTestCase(TestCase):
+
+    """
+    Test the format=geojson parameter of the /pois/ and
+    /pois/categories/<id> views.
+    """
+    fixtures = ['location_fixtures']
+
+    def get_geojson(self, url):
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/geo+json')
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_feature_collection(self):
+        collection = self.get_geojson(
+            '%s?format=geojson' % reverse('pois-list'))
+        pois = json.loads(self.client.get(
+            reverse('pois-list')).content)['pointsofinterest']
+
+        self.assertEqual(collection['type'], 'FeatureCollection')
+        self.assertFalse(collection['error']['status'])
+        self.assertEqual(len(collection['features']), len(pois))
+
+        for poi in pois:
+            feature = [f for f in collection['features']
+                       if f['id'] == poi['id']][0]
+            self.assertEqual(feature['type'], 'Feature')
+            self.assertEqual(feature['geometry'], {
+                'type': 'Point',
+                'coordinates': [poi.pop('lng'), poi.pop('lat')]
+            })
+            self.assertEqual(feature['properties'], poi)
+
+    @override_settings(STREAM_CHUNK_SIZE=3)
+    def test_chunked(self):
+        collection = self.get_geojson(
+            '%s?format=geojson' % reverse('pois-list'))
+
+        self.assertEqual(
+            sorted(f['id'] for f in collection['features']),
+            sorted(PointOfInterest.objects.values_list('id', flat=True)))
+        for feature in collection['features']:
+            self.assertEqual(len(feature['properties']['categories']), 3)
+
+    def test_parameters(self):
+        collection = self.get_geojson(
+            '%s?format=geojson&lat=44.609079&lng=-124.052538&proximity=200&'
+            'order=distance&limit=2' % reverse('pois-list'))
+
+        features = collection['features']
+        self.assertEqual(sorted(f['id'] for f in features), [3, 4])
+        self.assertTrue(
+            features[0]['properties']['distance'] <=
+            features[1]['properties']['distance'])
+
+    def test_category(self):
+        collection = self.get_geojson(
+            '%s?format=geojson' % reverse(
+                'pois-categories', kwargs={'id': '1'}))
+
+        self.assertEqual(
+            sorted(f['id'] for f in collection['features']), [1, 3, 5, 7])
+
+    def test_empty(self):
+        collection = self.get_geojson(
+            '%s?format=geojson&bbox=-120,40,-119,41' % reverse('pois-list'))
+
+        self.assertEqual(collection['features'], [])
+        self.assertEqual(collection['error']['name'], 'No PointsOfInterest')
+
+    def test_stream_rows(self):
+        encoder = PointOfInterestEncoder()
+        chunks = list(stream_rows(
+            encoder.rows(PointOfInterest.objects.order_by('id')), 3))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 2])
+        self.assertEqual(
+            [row['id'] for chunk in chunks for row in chunk], range(1, 9))
+        self.assertEqual(chunks[0][0]['name'], PointOfInterest.objects.get(
+            id=1).name)
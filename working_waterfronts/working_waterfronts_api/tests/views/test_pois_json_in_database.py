@@ -0,0 +1,67 @@
+import json
+
+from django.test import TestCase
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class JsonInDatabaseTestCase(TestCase):
+
+    """
+    Test that list bodies assembled by PostgreSQL (POI_JSON_IN_DATABASE)
+    match the ones assembled in Python.
+    """
+    fixtures = ['location_fixtures']
+
+    def setUp(self):
+        point = 'lat=44.609079&lng=-124.052538'
+        self.urls = [
+            reverse('pois-list'),
+            '%s?limit=3' % reverse('pois-list'),
+            '%s?%s&order=distance&proximity=50' % (
+                reverse('pois-list'), point),
+            '%s?%s&proximity=1' % (reverse('pois-list'), point),
+            reverse('pois-categories', kwargs={'id': '1'}),
+            reverse('pois-categories', kwargs={'id': '999'}),
+            '%s?%s&n=3' % (reverse('pois-nearest'), point),
+            '%s?%s' % (reverse('pois-categories-nearest',
+                               kwargs={'id': '2'}), point)
+        ]
+
+    def get(self, url, in_database):
+        with self.settings(POI_JSON_IN_DATABASE=in_database):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_same_body(self):
+        for url in self.urls:
+            python = self.get(url, False)
+            database = self.get(url, True)
+
+            self.assertEqual(python['error'], database['error'])
+
+            # Only lists ordered by distance have a defined order
+            expected_pois = python['pointsofinterest']
+            pois = database['pointsofinterest']
+            if not any('distance' in poi for poi in expected_pois):
+                expected_pois.sort(key=lambda poi: poi['id'])
+                pois.sort(key=lambda poi: poi['id'])
+            self.assertEqual(
+                [poi['id'] for poi in expected_pois],
+                [poi['id'] for poi in pois])
+
+            for expected, poi in zip(expected_pois, pois):
+                if 'distance' in expected:
+                    self.assertAlmostEqual(
+                        poi.pop('distance'), expected.pop('distance'),
+                        places=9)
+                self.assertEqual(poi, expected)
+
+    def test_empty_error(self):
+        data = self.get(
+            reverse('pois-categories', kwargs={'id': '999'}), True)
+
+        self.assertEqual(data['pointsofinterest'], [])
+        self.assertEqual(data['error']['name'], 'No PointsOfInterest')
@@ -0,0 +1,87 @@
+from django.test import TestCase
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+
+import json
+
+
+class POIsNearestTestCase(TestCase):
+
+    """
+    Test the /pois/nearest and /pois/categories/<id>/nearest views.
+
+    The location fixtures have two POIs each in Portland, Newport, Waldport
+    and Lincoln City. The test location is in Newport, next to POIs 3 and 4.
+    """
+    fixtures = ['location_fixtures']
+
+    def test_url_endpoints(self):
+        self.assertEqual(reverse('pois-nearest'), '/1/pois/nearest')
+        self.assertEqual(
+            reverse('pois-categories-nearest', kwargs={'id': '1'}),
+            '/1/pois/categories/1/nearest')
+
+    def test_nearest(self):
+        response = json.loads(self.client.get(
+            '%s?lat=44.609079&lng=-124.052538&n=3' % reverse(
+                'pois-nearest')).content)
+
+        pois = response['pointsofinterest']
+        self.assertFalse(response['error']['status'])
+        self.assertEqual(len(pois), 3)
+        self.assertEqual(sorted(poi['id'] for poi in pois[:2]), [3, 4])
+
+        distances = [poi['distance'] for poi in pois]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_nearest_has_no_radius(self):
+        # Portland is ~80 miles from Newport, well outside DEFAULT_PROXIMITY
+        response = json.loads(self.client.get(
+            '%s?lat=44.609079&lng=-124.052538&n=8' % reverse(
+                'pois-nearest')).content)
+
+        pois = response['pointsofinterest']
+        self.assertEqual(len(pois), 8)
+        self.assertEqual(sorted(poi['id'] for poi in pois[-2:]), [1, 2])
+
+    @override_settings(DEFAULT_NEAREST_COUNT=2)
+    def test_default_count(self):
+        response = json.loads(self.client.get(
+            '%s?lat=44.609079&lng=-124.052538' % reverse(
+                'pois-nearest')).content)
+
+        self.assertEqual(len(response['pointsofinterest']), 2)
+
+    @override_settings(MAX_NEAREST_COUNT=4)
+    def test_max_count(self):
+        response = json.loads(self.client.get(
+            '%s?lat=44.609079&lng=-124.052538&n=100' % reverse(
+                'pois-nearest')).content)
+
+        self.assertEqual(len(response['pointsofinterest']), 4)
+
+    @override_settings(DEFAULT_NEAREST_COUNT=2)
+    def test_bad_count(self):
+        response = json.loads(self.client.get(
+            '%s?lat=44.609079&lng=-124.052538&n=cat' % reverse(
+                'pois-nearest')).content)
+
+        self.assertEqual(response['error']['name'], 'Bad Count')
+        self.assertEqual(len(response['pointsofinterest']), 2)
+
+    def test_no_location(self):
+        response = json.loads(self.client.get(
+            reverse('pois-nearest')).content)
+
+        self.assertEqual(response['error']['name'], 'No location')
+        self.assertEqual(response['pointsofinterest'], [])
+
+    def test_category_nearest(self):
+        response = json.loads(self.client.get(
+            '%s?lat=44.609079&lng=-124.052538&n=2' % reverse(
+                'pois-categories-nearest', kwargs={'id': '1'})).content)
+
+        pois = response['pointsofinterest']
+        self.assertEqual([poi['id'] for poi in pois], [3, 5])
+        for poi in pois:
+            self.assertIn(1, [c['id'] for c in poi['categories']])
@@ -0,0 +1,196 @@
+import io
+import os
+import shutil
+import threading
+import time
+
+import PIL.Image
+from mock import patch
+from django.test import TestCase
+from django.core.cache import cache
+from django.core.files import File
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+
+from working_waterfronts.working_waterfronts_api import resize
+from working_waterfronts.working_waterfronts_api.models import Image
+
+TESTDATA = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'testdata'))
+
+
+@override_settings(
+    IMAGE_RESIZE_SIZES=((200, 200), (400, 400)),
+    IMAGE_RESIZE_CACHE='cache/test-resized')
+class ResizeTestCase(TestCase):
+
+    """
+    Test that /media/resize resizes images to the allowed sizes, caches
+    them, and evicts the least recently used.
+    """
+
+    def setUp(self):
+        cache.delete(resize.SIZE_KEY)
+        with open(os.path.join(TESTDATA, 'media', 'cat.jpg'), 'rb') as f:
+            self.image = Image(name="A cat")
+            self.image.image.save('cat.jpg', File(f), save=False)
+            self.image.save()
+        self.storage = self.image.image.storage
+        self.name = self.image.image.name
+
+    def tearDown(self):
+        shutil.rmtree(
+            self.storage.path('cache/test-resized'), ignore_errors=True)
+        self.image.image.delete(save=False)
+
+    def get(self, width, height, name=None):
+        return self.client.get(reverse('media-resize', kwargs={
+            'width': width, 'height': height, 'path': name or self.name}))
+
+    def test_url_endpoint(self):
+        url = reverse('media-resize', kwargs={
+            'width': 200, 'height': 200, 'path': 'images/cat.jpg'})
+        self.assertEqual(url, '/media/resize/200x200/images/cat.jpg')
+
+    def test_resize(self):
+        response = self.get(200, 200)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+        picture = PIL.Image.open(
+            io.BytesIO(''.join(response.streaming_content)))
+        self.assertEqual(picture.size[0], 200)
+        self.assertLess(picture.size[1], 200)
+
+    def test_no_upscale(self):
+        response = self.get(400, 400)
+        picture = PIL.Image.open(
+            io.BytesIO(''.join(response.streaming_content)))
+        self.assertEqual(picture.size, (400, 225))
+
+    def test_cached(self):
+        self.get(200, 200)
+        with patch.object(resize, 'render') as render:
+            response = self.get(200, 200)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(render.called)
+
+    def test_validators(self):
+        """
+        Cache hits don't change a resized image's validators, which differ
+        from its original's and by size
+        """
+        first = self.get(200, 200)
+        second = self.get(200, 200)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(first['Last-Modified'], second['Last-Modified'])
+
+        original = self.client.get(self.image.image.url)
+        self.assertNotEqual(first['ETag'], original['ETag'])
+        self.assertEqual(first['Last-Modified'], original['Last-Modified'])
+        self.assertNotEqual(first['ETag'], self.get(400, 400)['ETag'])
+
+        response = self.client.get(
+            reverse('media-resize', kwargs={
+                'width': 200, 'height': 200, 'path': self.name}),
+            HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(
+            reverse('media-resize', kwargs={
+                'width': 200, 'height': 200, 'path': self.name}),
+            HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_hit_keeps_modified_time(self):
+        path = self.storage.path(resize.resized(
+            self.storage, self.name, 200, 200))
+        os.utime(path, (0, 0))
+        resize.resized(self.storage, self.name, 200, 200)
+
+        self.assertEqual(os.stat(path).st_mtime, 0)
+        self.assertGreater(os.stat(path).st_atime, 0)
+
+    def test_size_not_allowed(self):
+        self.assertEqual(self.get(201, 200).status_code, 404)
+
+    def test_not_an_image(self):
+        self.assertEqual(
+            self.get(200, 200, 'images/nothing.jpg').status_code, 404)
+
+    def test_undecodable(self):
+        for error in [ValueError, SyntaxError]:
+            with patch.object(resize, 'render', side_effect=error):
+                self.assertEqual(self.get(200, 200).status_code, 404)
+
+    def test_too_large(self):
+        with patch.object(PIL.Image, 'MAX_IMAGE_PIXELS', 100):
+            self.assertEqual(self.get(200, 200).status_code, 404)
+
+    def test_failed_render_removes_lock(self):
+        with patch.object(resize, 'render', side_effect=IOError):
+            self.assertRaises(
+                IOError, resize.resized, self.storage, self.name, 200, 200)
+
+        self.assertFalse(os.path.exists(self.storage.path(
+            resize.cache_name(200, 200, self.name)) + '.lock'))
+
+    def test_single_render(self):
+        """
+        Concurrent requests for the same uncached size render it once
+        """
+        render = resize.render
+        renders = []
+
+        def slow_render(*args):
+            renders.append(args)
+            time.sleep(0.2)
+            render(*args)
+
+        with patch.object(resize, 'render', slow_render):
+            threads = [threading.Thread(
+                target=resize.resized,
+                args=(self.storage, self.name, 200, 200)) for i in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(renders), 1)
+        self.assertTrue(os.path.exists(self.storage.path(
+            resize.cache_name(200, 200, self.name))))
+
+    def test_eviction(self):
+        small = self.storage.path(resize.resized(
+            self.storage, self.name, 200, 200))
+        # Used long ago
+        os.utime(small, (0, 0))
+
+        with self.settings(IMAGE_RESIZE_CACHE_BYTES=1):
+            large = self.storage.path(resize.resized(
+                self.storage, self.name, 400, 400))
+
+        self.assertFalse(os.path.exists(small))
+        # The image just rendered is kept, though the cache is over its limit
+        self.assertTrue(os.path.exists(large))
+        self.assertEqual(self.get(400, 400).status_code, 200)
+
+    def test_eviction_counted(self):
+        """
+        The cache is only walked when its running total is over the limit
+        """
+        resize.resized(self.storage, self.name, 200, 200)
+        self.assertEqual(
+            cache.get(resize.SIZE_KEY),
+            os.path.getsize(self.storage.path(
+                resize.cache_name(200, 200, self.name))))
+
+        with patch.object(resize, 'evict') as evict:
+            resize.resized(self.storage, self.name, 400, 400)
+        self.assertFalse(evict.called)
+
+        with self.settings(IMAGE_RESIZE_CACHE_BYTES=1):
+            with patch.object(resize, 'evict') as evict:
+                self.storage.delete(resize.cache_name(400, 400, self.name))
+                resize.resized(self.storage, self.name, 400, 400)
+        self.assertTrue(evict.called)
@@ -0,0 +1,186 @@
+import json
+import warnings
+
+from django.db import connection
+from django.test import TestCase, RequestFactory
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings, CaptureQueriesContext
+
+from working_waterfronts.working_waterfronts_api import response_cache
+from working_waterfronts.working_waterfronts_api.models import (
+    PointOfInterest, Category)
+
+
+class MemcachedStandIn(LocMemCache):
+
+    """
+    A local-memory cache that, like memcached, is shared by every client of
+    the same location and rejects keys memcached can't store.
+    """
+
+    def validate_key(self, key):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            super(MemcachedStandIn, self).validate_key(key)
+
+
+class ResponseCacheTestCase(TestCase):
+
+    """
+    Test the response cache in front of the /pois/, /pois/categories/<id>
+    and /pois/<id> views.
+    """
+    fixtures = ['location_fixtures']
+
+    def setUp(self):
+        cache.clear()
+        self.urls = [
+            reverse('pois-list'),
+            '%s?lat=44.609079&lng=-124.052538&limit=2' % reverse('pois-list'),
+            reverse('pois-categories', kwargs={'id': '1'}),
+            reverse('poi-details', kwargs={'id': '1'})
+        ]
+
+    def test_cached(self):
+        for url in self.urls:
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(first.content, second.content)
+            self.assertEqual(first['ETag'], second['ETag'])
+            self.assertEqual(first['Content-Type'], second['Content-Type'])
+
+    def test_equivalent_requests_share_entry(self):
+        self.client.get(
+            '%s?lat=44.609079&lng=-124.052538&limit=2' % reverse('pois-list'))
+
+        with self.assertNumQueries(0):
+            self.client.get(
+                '%s?limit=02&lng=-124.05254&lat=44.60908&proximity=20' %
+                reverse('pois-list'))
+
+    def test_different_requests_miss(self):
+        self.client.get(reverse('pois-list'))
+        response = self.client.get('%s?limit=1' % reverse('pois-list'))
+
+        data = json.loads(response.content)
+        self.assertEqual(len(data['pointsofinterest']), 1)
+
+    def test_not_modified(self):
+        etag = self.client.get(reverse('pois-list'))['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                reverse('pois-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_not_found_not_cached(self):
+        url = reverse('poi-details', kwargs={'id': '999'})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertTrue(queries.captured_queries)
+
+    def test_geojson_not_cached(self):
+        url = '%s?format=geojson' % reverse('pois-list')
+        b''.join(self.client.get(url).streaming_content)
+
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+
+    def test_poi_saved(self):
+        url = reverse('poi-details', kwargs={'id': '1'})
+        self.client.get(url)
+
+        poi = PointOfInterest.objects.get(id=1)
+        poi.name = 'Renamed'
+        poi.save()
+
+        data = json.loads(self.client.get(url).content)
+        self.assertEqual(data['name'], 'Renamed')
+
+    def test_poi_deleted(self):
+        self.client.get(reverse('pois-list'))
+
+        PointOfInterest.objects.get(id=1).delete()
+
+        data = json.loads(self.client.get(reverse('pois-list')).content)
+        self.assertNotIn(1, [poi['id'] for poi in data['pointsofinterest']])
+
+    def test_related_saved(self):
+        url = reverse('poi-details', kwargs={'id': '1'})
+        self.client.get(url)
+
+        category = PointOfInterest.objects.get(id=1).categories.all()[0]
+        category.category = 'Renamed'
+        category.save()
+
+        data = json.loads(self.client.get(url).content)
+        self.assertIn(
+            'Renamed', [c['category'] for c in data['categories']])
+
+    def test_m2m_changed(self):
+        url = reverse('pois-categories', kwargs={'id': '1'})
+        self.client.get(url)
+
+        PointOfInterest.objects.get(id=2).categories.add(
+            Category.objects.get(id=1))
+
+        data = json.loads(self.client.get(url).content)
+        self.assertIn(2, [poi['id'] for poi in data['pointsofinterest']])
+
+    def test_invalidate_without_namespace(self):
+        cache.clear()
+        response_cache.invalidate()
+        self.assertIsNotNone(response_cache.namespace_version())
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        self.client.get(reverse('pois-list'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('pois-list'))
+        self.assertTrue(queries.captured_queries)
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'working_waterfronts.working_waterfronts_api.tests.'
+                   'views.test_response_cache.MemcachedStandIn',
+        'LOCATION': 'shared'
+    }
+})
+class SharedResponseCacheTestCase(TestCase):
+
+    """
+    Test the response cache with a memcached-style cache shared by several
+    workers.
+    """
+    fixtures = ['location_fixtures']
+
+    def setUp(self):
+        cache.clear()
+        self.other_worker = MemcachedStandIn('shared', {})
+
+    def test_shared(self):
+        url = '%s?lat=44.609079&lng=-124.052538' % reverse('pois-list')
+        self.client.get(url)
+
+        key = response_cache.cache_key(
+            'poi_list', RequestFactory().get(url), {})
+        self.assertIsNotNone(self.other_worker.get(key))
+
+    def test_invalidated_by_other_worker(self):
+        url = reverse('poi-details', kwargs={'id': '1'})
+        self.client.get(url)
+
+        self.other_worker.incr(response_cache.VERSION_KEY)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertTrue(queries.captured_queries)
@@ -3,7 +3,7 @@ from django.test import TestCase
 from working_waterfronts.working_waterfronts_api.models import (
     PointOfInterest, Hazard, Category)
 from working_waterfronts.working_waterfronts_api.views.serializer import (
-    ObjectSerializer)
+    ObjectSerializer, PointOfInterestEncoder)
 
 
 class SerializerTestCase(TestCase):
@@ -47,6 +47,11 @@ class SerializerTestCase(TestCase):
                 "link": "http://www.youtube.com/watch?v=efgDdSWDg0g",
                 "name": "A Starship"}],
   "images": [{"caption": "Woof!",
+               "width": null,
+               "height": null,
+               "bytes": null,
+               "sha256": null,
+               "derivatives": [],
                "link": "/media/dog.jpg",
                "name": "A dog"}],
   "name": "Newport Lighthouse",
@@ -116,3 +121,25 @@ class SerializerTestCase(TestCase):
         expected_answer = json.loads(self.expected_category_json)
 
         self.assertEqual(parsed_answer, expected_answer)
+
+    def test_encoder_poi(self):
+        encoder = PointOfInterestEncoder()
+        data = encoder.encode(
+            encoder.serialize(PointOfInterest.objects.filter(id=1)))
+
+        parsed_answer = json.loads(data)
+        expected_answer = json.loads(self.expected_poi_json)
+
+        self.assertEqual(parsed_answer, expected_answer)
+
+    def test_encoder_matches_serializer(self):
+        encoder = PointOfInterestEncoder()
+        encoded = json.loads(encoder.encode(
+            encoder.serialize(PointOfInterest.objects.order_by('id'))))
+
+        serialized = json.loads(ObjectSerializer().serialize(
+            PointOfInterest.objects.order_by('id'),
+            use_natural_foreign_keys=True
+        ))
+
+        self.assertEqual(encoded, serialized)
@@ -0,0 +1,53 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+from django.core.files.base import ContentFile
+
+from working_waterfronts.working_waterfronts_api.models import Image
+from working_waterfronts.working_waterfronts_api.storage import (
+    ContentAddressedStorage)
+
+MEOW = hashlib.sha256('Meow!').hexdigest()
+
+
+class ContentAddressedStorageTestCase(TestCase):
+
+    """
+    Test that files are named by their content, sharded, and stored once.
+    """
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(
+            location=self.location, base_url='/media/')
+
+    def tearDown(self):
+        shutil.rmtree(self.location)
+
+    def test_name(self):
+        name = self.storage.save('images/My Cat.JPG', ContentFile('Meow!'))
+        self.assertEqual(
+            name, 'images/%s/%s/%s.jpg' % (MEOW[:2], MEOW[2:4], MEOW))
+        self.assertEqual(self.storage.open(name).read(), 'Meow!')
+        self.assertEqual(self.storage.url(name), '/media/' + name)
+
+    def test_dedupe(self):
+        first = self.storage.save('images/cat.jpg', ContentFile('Meow!'))
+        second = self.storage.save('images/kitty.jpg', ContentFile('Meow!'))
+        other = self.storage.save('images/dog.jpg', ContentFile('Woof!'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        directory = os.path.dirname(self.storage.path(first))
+        self.assertEqual(os.listdir(directory), [os.path.basename(first)])
+
+    def test_image_filename(self):
+        image = Image(name="A cat")
+        image.image.storage = self.storage
+        image.image.save('cat.jpg', ContentFile('Meow!'), save=False)
+
+        self.assertEqual(image.filename(), MEOW + '.jpg')
+        self.assertEqual(image.image.url, '/media/' + image.image.name)
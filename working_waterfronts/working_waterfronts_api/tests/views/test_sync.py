@@ -0,0 +1,136 @@
+import datetime
+import json
+import time
+from StringIO import StringIO
+
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.utils import timezone
+from django.test.utils import override_settings
+
+from working_waterfronts.working_waterfronts_api.models import (
+    PointOfInterest, Image, Category, Tombstone)
+
+
+@override_settings(SYNC_OVERLAP=0)
+class SyncTestCase(TestCase):
+
+    """
+    Test the /sync view.
+    """
+    fixtures = ['test_fixtures']
+
+    def sync(self, since=None):
+        url = reverse('sync')
+        if since is not None:
+            url = '%s?since=%s' % (url, since)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_url_endpoint(self):
+        url = reverse('sync')
+        self.assertEqual(url, '/1/sync')
+
+    def test_full_sync(self):
+        data = self.sync()
+
+        self.assertFalse(data['error']['status'])
+        self.assertTrue(data['token'])
+        self.assertEqual(
+            len(data['pointsofinterest']), PointOfInterest.objects.count())
+        self.assertEqual(len(data['images']), Image.objects.count())
+        self.assertEqual(len(data['categories']), Category.objects.count())
+        for name, ids in data['deleted'].items():
+            self.assertEqual(ids, [])
+
+    def test_empty_sync(self):
+        token = self.sync()['token']
+
+        with self.assertNumQueries(1):
+            data = self.sync(token)
+
+        self.assertFalse(data['error']['status'])
+        self.assertEqual(data['pointsofinterest'], [])
+        self.assertEqual(data['images'], [])
+        self.assertEqual(data['deleted']['pointsofinterest'], [])
+
+    def test_changed(self):
+        token = self.sync()['token']
+        time.sleep(0.01)
+        PointOfInterest.objects.get(id=1).save()
+
+        data = self.sync(token)
+        self.assertEqual(
+            [poi['id'] for poi in data['pointsofinterest']], [1])
+        self.assertEqual(data['categories'], [])
+
+    def test_related_change_touches_poi(self):
+        token = self.sync()['token']
+        time.sleep(0.01)
+        category = Category.objects.get(id=1)
+        category.save()
+
+        data = self.sync(token)
+        self.assertEqual(
+            [c['id'] for c in data['categories']], [category.id])
+        self.assertEqual(
+            sorted(poi['id'] for poi in data['pointsofinterest']),
+            sorted(category.pointofinterest_set.values_list('id', flat=True)))
+
+    def test_deleted(self):
+        token = self.sync()['token']
+        time.sleep(0.01)
+        PointOfInterest.objects.get(id=1).delete()
+
+        data = self.sync(token)
+        self.assertEqual(data['deleted']['pointsofinterest'], [1])
+        self.assertNotIn(
+            1, [poi['id'] for poi in data['pointsofinterest']])
+
+    def test_not_located(self):
+        token = self.sync()['token']
+        time.sleep(0.01)
+        poi = PointOfInterest.objects.get(id=1)
+        poi.location_status = PointOfInterest.PENDING
+        poi.save()
+
+        data = self.sync(token)
+        self.assertEqual(data['deleted']['pointsofinterest'], [1])
+        self.assertEqual(data['pointsofinterest'], [])
+
+    def test_bad_token(self):
+        data = self.sync('yesterday')
+
+        self.assertTrue(data['error']['status'])
+        self.assertEqual(data['error']['name'], 'Bad Token')
+        self.assertEqual(
+            len(data['pointsofinterest']), PointOfInterest.objects.count())
+
+    def test_expired_token(self):
+        since = (timezone.now() - datetime.timedelta(days=1)).strftime(
+            '%Y-%m-%dT%H:%M:%S')
+        with self.settings(TOMBSTONE_RETENTION=60):
+            data = self.sync(since)
+
+        self.assertTrue(data['full'])
+        self.assertEqual(data['error']['name'], 'Expired Token')
+        self.assertEqual(
+            len(data['pointsofinterest']), PointOfInterest.objects.count())
+
+        self.assertFalse(self.sync(data['token'])['full'])
+
+    def test_prune_tombstones(self):
+        PointOfInterest.objects.get(id=1).delete()
+        PointOfInterest.objects.get(id=2).delete()
+        Tombstone.objects.filter(object_id=1).update(
+            deleted=timezone.now() - datetime.timedelta(days=1))
+
+        stdout = StringIO()
+        with self.settings(TOMBSTONE_RETENTION=60):
+            call_command('prune_tombstones', stdout=stdout)
+
+        self.assertIn("Pruned 1 tombstones.", stdout.getvalue())
+        self.assertEqual(
+            list(Tombstone.objects.values_list('object_id', flat=True)), [2])
@@ -0,0 +1,143 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.contrib.gis.geos import fromstr
+
+from working_waterfronts.working_waterfronts_api.models import (
+    PointOfInterest, Category)
+from working_waterfronts.working_waterfronts_api import tiles
+
+
+class TilesTestCase(TestCase):
+
+    """
+    Test the /tiles/<z>/<x>/<y>.mvt view and the tile cache.
+
+    Newport, with POIs 3 and 4, is in tile 10/159/369.
+    """
+    fixtures = ['location_fixtures']
+
+    def setUp(self):
+        cache.clear()
+
+    def test_url_endpoint(self):
+        url = reverse('poi-tile', kwargs={'z': '10', 'x': '159', 'y': '369'})
+        self.assertEqual(url, '/1/tiles/10/159/369.mvt')
+
+    def test_tile_for_point(self):
+        newport = fromstr('POINT(-124.052538 44.609079)', srid=4326)
+        self.assertEqual(tiles.tile_for_point(newport, 0), (0, 0))
+        self.assertEqual(tiles.tile_for_point(newport, 10), (159, 369))
+
+        minx, miny, maxx, maxy = tiles.tile_bounds(10, 159, 369)
+        newport.transform(3857)
+        self.assertTrue(minx <= newport.x <= maxx)
+        self.assertTrue(miny <= newport.y <= maxy)
+
+    def test_tile(self):
+        response = self.client.get(reverse(
+            'poi-tile', kwargs={'z': '10', 'x': '159', 'y': '369'}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        self.assertIn('max-age', response['Cache-Control'])
+        self.assertIn(b'pointsofinterest', response.content)
+        self.assertIn(b'Newport', response.content)
+
+    def test_empty_tile(self):
+        response = self.client.get(reverse(
+            'poi-tile', kwargs={'z': '10', 'x': '0', 'y': '0'}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'pointsofinterest', response.content)
+
+    def test_invalid_tile(self):
+        response = self.client.get(reverse(
+            'poi-tile', kwargs={'z': '1', 'x': '2', 'y': '0'}))
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(reverse(
+            'poi-tile', kwargs={'z': '99', 'x': '0', 'y': '0'}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_cached(self):
+        tiles.render_tile(10, 159, 369)
+        self.assertIsNotNone(cache.get(tiles.cache_key(10, 159, 369)))
+
+        with self.assertNumQueries(0):
+            tiles.render_tile(10, 159, 369)
+
+    def test_invalidated_on_save(self):
+        tiles.render_tile(10, 159, 369)
+
+        poi = PointOfInterest.objects.get(id=3)
+        poi.name = 'Renamed'
+        poi.save()
+
+        self.assertIsNone(cache.get(tiles.cache_key(10, 159, 369)))
+        self.assertIn(b'Renamed', tiles.render_tile(10, 159, 369))
+
+    def test_not_located(self):
+        tiles.render_tile(10, 159, 369)
+
+        poi = PointOfInterest.objects.get(id=3)
+        poi.name = 'Pending'
+        poi.location_status = PointOfInterest.PENDING
+        poi.save()
+
+        self.assertNotIn(b'Pending', tiles.render_tile(10, 159, 369))
+
+    def test_invalidated_when_moved_away(self):
+        tiles.render_tile(10, 159, 369)
+
+        poi = PointOfInterest.objects.get(id=3)
+        poi.location = fromstr('POINT(-122.679630 45.518962)', srid=4326)
+        poi.save()
+
+        self.assertIsNone(cache.get(tiles.cache_key(10, 159, 369)))
+
+    def test_invalidated_on_delete(self):
+        tiles.render_tile(10, 159, 369)
+        PointOfInterest.objects.get(id=3).delete()
+
+        self.assertIsNone(cache.get(tiles.cache_key(10, 159, 369)))
+
+    def test_tiles_for_point(self):
+        newport = fromstr('POINT(-124.052538 44.609079)', srid=4326)
+        self.assertEqual(tiles.tiles_for_point(newport, 10), [(159, 369)])
+
+        # Just west of the edge of tile 159, inside the buffer of tile 160
+        edge = fromstr('POINT(-123.7502 44.609079)', srid=4326)
+        self.assertEqual(
+            tiles.tiles_for_point(edge, 10), [(159, 369), (160, 369)])
+
+    def test_buffered_neighbour_invalidated(self):
+        poi = PointOfInterest.objects.get(id=3)
+        poi.location = fromstr('POINT(-123.7502 44.609079)', srid=4326)
+        poi.save()
+
+        # Tile 160 draws the POI in its buffer
+        self.assertIn(
+            poi.name.encode('utf-8'), tiles.render_tile(10, 160, 369))
+
+        poi.name = 'Renamed'
+        poi.save()
+
+        self.assertIsNone(cache.get(tiles.cache_key(10, 160, 369)))
+        self.assertIn(b'Renamed', tiles.render_tile(10, 160, 369))
+
+    def test_invalidated_on_category_change(self):
+        tiles.render_tile(10, 159, 369)
+        PointOfInterest.objects.get(id=3).categories.add(
+            Category.objects.get(id=2))
+
+        self.assertIsNone(cache.get(tiles.cache_key(10, 159, 369)))
+
+    def test_other_tiles_kept(self):
+        tiles.render_tile(10, 159, 369)
+        tiles.render_tile(10, 0, 0)
+
+        PointOfInterest.objects.get(id=3).delete()
+
+        self.assertIsNotNone(cache.get(tiles.cache_key(10, 0, 0)))
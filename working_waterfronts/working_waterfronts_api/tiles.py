@@ -0,0 +1,148 @@
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from working_waterfronts.working_waterfronts_api.models import PointOfInterest
+
+# Half the width of the web mercator (EPSG:3857) world, in meters
+ORIGIN_SHIFT = math.pi * 6378137
+
+# Size of the MVT tile grid, and the buffer drawn around it, in tile units
+EXTENT = 4096
+BUFFER = 64
+
+
+def valid_tile(z, x, y):
+    """
+    Return whether z/x/y is a tile that exists at a zoom level we serve.
+    """
+    return 0 <= z <= settings.MAX_TILE_ZOOM and 0 <= x < 2 ** z and \
+        0 <= y < 2 ** z
+
+
+def tile_bounds(z, x, y):
+    """
+    Return the (minx, miny, maxx, maxy) web mercator bounds of tile z/x/y.
+    """
+    size = 2 * ORIGIN_SHIFT / 2 ** z
+    minx = -ORIGIN_SHIFT + x * size
+    maxy = ORIGIN_SHIFT - y * size
+    return (minx, maxy - size, minx + size, maxy)
+
+
+def tile_position(point, z):
+    """
+    Return the position of a 4326 point at zoom level z in tile units, e.g.
+    (159.5, 369.25) halfway across and a quarter down tile 159/369.
+    """
+    n = 2 ** z
+    lat = math.radians(max(min(point.y, 85.0511), -85.0511))
+    x = (point.x + 180.0) / 360.0 * n
+    y = (1.0 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / \
+        2.0 * n
+    return x, y
+
+
+def tile_for_point(point, z):
+    """
+    Return the (x, y) of the tile containing a 4326 point at zoom level z.
+    """
+    n = 2 ** z
+    x, y = tile_position(point, z)
+    return (min(max(int(x), 0), n - 1), min(max(int(y), 0), n - 1))
+
+
+def tiles_for_point(point, z):
+    """
+    Return the (x, y) of each tile at zoom level z that draws a 4326 point:
+    the tile containing it, and the neighbours whose BUFFER reaches it.
+    """
+    n = 2 ** z
+    x, y = tile_position(point, z)
+    margin = float(BUFFER) / EXTENT
+
+    def span(position):
+        first = int(math.floor(position - margin))
+        last = int(math.floor(position + margin))
+        return range(max(first, 0), min(last, n - 1) + 1)
+
+    return [(tile_x, tile_y) for tile_x in span(x) for tile_y in span(y)]
+
+
+def cache_key(z, x, y):
+    return 'tile:%d/%d/%d' % (z, x, y)
+
+
+def invalidate_point(point):
+    """
+    Drop the cached tiles drawing a point at every zoom level.
+    """
+    invalidate_points([point])
+
+
+def invalidate_points(points):
+    """
+    Drop the cached tiles drawing any of the points at every zoom level (see
+    tiles_for_point), in a single call to the cache.
+    """
+    keys = set()
+    for point in points:
+        if point is None:
+            continue
+        for z in range(settings.MAX_TILE_ZOOM + 1):
+            for x, y in tiles_for_point(point, z):
+                keys.add(cache_key(z, x, y))
+    if keys:
+        cache.delete_many(list(keys))
+
+
+def render_tile(z, x, y):
+    """
+    Return the Mapbox Vector Tile for tile z/x/y, holding the located POIs
+    in that tile with their id, name and comma-separated category ids.
+
+    The tile is encoded by PostGIS with ST_AsMVT, and cached per tile until a
+    POI inside it, or in the BUFFER around it, changes.
+    """
+    key = cache_key(z, x, y)
+    tile = cache.get(key)
+    if tile is not None:
+        return tile
+
+    minx, miny, maxx, maxy = tile_bounds(z, x, y)
+    margin = (maxx - minx) * BUFFER / EXTENT
+
+    poi_table = connection.ops.quote_name(PointOfInterest._meta.db_table)
+    category_table = connection.ops.quote_name(
+        PointOfInterest.categories.through._meta.db_table)
+
+    sql = """
+        SELECT ST_AsMVT(tile, 'pointsofinterest', %%s, 'geom')
+        FROM (
+            SELECT p.id, p.name,
+                   array_to_string(array(
+                       SELECT c.category_id FROM %s AS c
+                       WHERE c.pointofinterest_id = p.id
+                       ORDER BY c.category_id), ',') AS categories,
+                   ST_AsMVTGeom(ST_Transform(p.location, 3857),
+                                ST_MakeEnvelope(%%s, %%s, %%s, %%s, 3857),
+                                %%s, %%s, true) AS geom
+            FROM %s AS p
+            WHERE p.location && ST_Transform(
+                ST_MakeEnvelope(%%s, %%s, %%s, %%s, 3857), 4326)
+              AND p.location_status = %%s
+        ) AS tile
+        WHERE geom IS NOT NULL""" % (category_table, poi_table)
+
+    cursor = connection.cursor()
+    cursor.execute(sql, [EXTENT, minx, miny, maxx, maxy, EXTENT, BUFFER,
+                         minx - margin, miny - margin,
+                         maxx + margin, maxy + margin,
+                         PointOfInterest.LOCATED])
+    row = cursor.fetchone()
+    tile = bytes(row[0]) if row and row[0] is not None else b''
+
+    cache.set(key, tile, settings.TILE_CACHE_TIMEOUT)
+    return tile
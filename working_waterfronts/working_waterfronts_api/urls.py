@@ -58,10 +58,22 @@ urlpatterns = patterns(
         url_base + '.views.entry.pois.list',
         name='entry-list-pois'),
 
+    url(r'^entry/export/?$',
+        url_base + '.views.entry.export.export',
+        name='entry-export'),
+
     url(r'^1/pois/?$',
         url_base + '.views.pointsofinterest.poi_list',
         name='pois-list'),
 
+    url(r'^1/pois/nearest/?$',
+        url_base + '.views.pointsofinterest.poi_nearest',
+        name='pois-nearest'),
+
+    url(r'^1/pois/clusters/?$',
+        url_base + '.views.pointsofinterest.poi_clusters',
+        name='pois-clusters'),
+
     url(r'^1/pois/(?P<id>\d+)/?$',
         url_base + '.views.pointsofinterest.poi_details',
         name='poi-details'),
@@ -85,6 +97,23 @@ urlpatterns = patterns(
     url(r'^1/pois/categories/(?P<id>\d+)/?$',
         url_base + '.views.pointsofinterest.poi_categories',
         name='pois-categories'),
+
+    url(r'^1/pois/categories/(?P<id>\d+)/nearest/?$',
+        url_base + '.views.pointsofinterest.poi_categories_nearest',
+        name='pois-categories-nearest'),
+
+    url(r'^1/pois/categories/(?P<id>\d+)/clusters/?$',
+        url_base + '.views.pointsofinterest.poi_categories_clusters',
+        name='pois-categories-clusters'),
+
+    url(r'^1/sync/?$',
+        url_base + '.views.sync.sync',
+        name='sync'),
+
+    url(r'^1/tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.mvt$',
+        url_base + '.views.tiles.poi_tile',
+        name='poi-tile'),
+
     url(r'^login/?$',
         url_base + '.views.entry.login.login_user',
         name='login'),
@@ -0,0 +1,41 @@
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
+
+from working_waterfronts.working_waterfronts_api import exporter
+
+
+@staff_member_required
+def export(request):
+    """
+    */entry/export*
+
+    Streams every point of interest with its relations as a file download,
+    for handing the data on in bulk. Staff only.
+
+    Takes format=csv (the default), geojson or ndjson, since=<ISO 8601
+    timestamp> to only export the POIs modified after it, and gzip=true to
+    gzip the file.
+    """
+    format = request.GET.get('format', 'csv')
+    if format not in exporter.FORMATS:
+        return HttpResponseBadRequest(
+            "format must be one of: %s" % ', '.join(sorted(exporter.FORMATS)))
+
+    since = request.GET.get('since', None)
+    if since is not None:
+        try:
+            since = exporter.parse_since(since)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+
+    chunks = exporter.export(format, since)
+    content_type = exporter.FORMATS[format]
+    filename = 'pois.%s' % format
+    if request.GET.get('gzip') == 'true':
+        chunks = exporter.gzip_stream(chunks)
+        content_type = 'application/gzip'
+        filename += '.gz'
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+    return response
@@ -9,6 +9,8 @@ from django.conf import settings
 
 from working_waterfronts.working_waterfronts_api.models import Image
 from working_waterfronts.working_waterfronts_api.forms import ImageForm
+from working_waterfronts.working_waterfronts_api import (
+    derivatives, fragments)
 
 
 @login_required
@@ -83,7 +85,13 @@ def image(request, id=None):
             request.FILES,
             instance=instance)
         if image_form.is_valid():
-            image_form.save()
+            # Rebuild the read model of the image's POIs once, with the new
+            # derivatives
+            with fragments.deferred():
+                image = image_form.save()
+                if 'image' in image_form.changed_data:
+                    derivatives.generate(image)
+                    image.save()
             return HttpResponseRedirect(
                 "%s?saved=true" % reverse('entry-list-images'))
         else:
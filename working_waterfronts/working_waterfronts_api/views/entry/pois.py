@@ -14,9 +14,11 @@ from django.utils.datastructures import MultiValueDictKeyError
 from working_waterfronts.working_waterfronts_api.models import (
     PointOfInterest, Image, Video, Category, Hazard)
 from working_waterfronts.working_waterfronts_api.functions import (
-    coordinates_from_address, BadAddressException)
+    coordinates_from_cache, normalize_address, BadAddressException)
 from working_waterfronts.working_waterfronts_api.forms import (
     PointOfInterestForm)
+from working_waterfronts.working_waterfronts_api import (
+    fragments, geocode_jobs)
 
 
 @login_required
@@ -85,6 +87,10 @@ def poi(request, id=None):
         post_data = request.POST.copy()
         errors = []
 
+        # Addresses without coordinates are geocoded in the background by
+        # the geocode_pois worker, unless their coordinates are cached
+        location_status = PointOfInterest.LOCATED
+        geocode = False
         try:
             try:
                 post_data['location'] = fromstr(
@@ -92,16 +98,36 @@ def poi(request, id=None):
                                       post_data['latitude']), srid=4326)
 
             except:
-                coordinates = coordinates_from_address(
-                    post_data['street'], post_data['city'], post_data['state'],
-                    post_data['zip'])
-
-                post_data['location'] = fromstr(
-                    'POINT(%s %s)' % (coordinates[1], coordinates[0]),
-                    srid=4326)
-
-        # Bad Address will be thrown if Google does not return coordinates for
-        # the address, and MultiValueDictKeyError will be thrown if the POST
+                address = [post_data['street'], post_data['city'],
+                           post_data['state'], post_data['zip']]
+                if not all(address):
+                    raise BadAddressException("Full address is required.")
+                saved = PointOfInterest.objects.filter(id=id).first() \
+                    if id else None
+
+                # An edit that leaves the address alone keeps its location
+                if saved and normalize_address(*address) == normalize_address(
+                        saved.street, saved.city, saved.state, saved.zip):
+                    post_data['location'] = saved.location
+                    location_status = saved.location_status
+                else:
+                    coordinates = coordinates_from_cache(*address)
+                    if coordinates is None:
+                        # The stored location is the old address's, so the
+                        # POI is left out of the public API until the
+                        # worker locates the new one (see fragments.build),
+                        # or until the address is corrected if it isn't
+                        # found
+                        post_data['location'] = saved and saved.location
+                        location_status = PointOfInterest.PENDING
+                        geocode = True
+                    else:
+                        post_data['location'] = fromstr(
+                            'POINT(%s %s)' % (coordinates[1],
+                                              coordinates[0]), srid=4326)
+
+        # Bad Address will be thrown if the address is missing or is cached
+        # as not found, and MultiValueDictKeyError will be thrown if the POST
         # data being passed in is empty.
         except (MultiValueDictKeyError, BadAddressException):
             errors.append("Full address is required.")
@@ -132,52 +158,63 @@ def poi(request, id=None):
             if hazard_keys:
                 hazards = [Hazard.objects.get(
                     pk=int(h)) for h in hazard_keys.split(',')]
-            if id:
-                poi = PointOfInterest.objects.get(id=id)
-                # process images
-                existing_images = poi.images.all()
-                for image in existing_images:
-                    if image not in images:
-                        poi.images.remove(image)
-                for image in images:
-                    if image not in existing_images:
+            # Rebuild the POI's public read model once, after all of the
+            # changes below, rather than once per change
+            with fragments.deferred():
+                if id:
+                    poi = PointOfInterest.objects.get(id=id)
+                    # process images
+                    existing_images = poi.images.all()
+                    for image in existing_images:
+                        if image not in images:
+                            poi.images.remove(image)
+                    for image in images:
+                        if image not in existing_images:
+                            poi.images.add(image)
+                    # process videos
+                    existing_videos = poi.videos.all()
+                    for video in existing_videos:
+                        if video not in videos:
+                            poi.videos.remove(video)
+                    for video in videos:
+                        if video not in existing_videos:
+                            poi.videos.add(video)
+                    # process hazards
+                    existing_hazards = poi.hazards.all()
+                    for hazard in existing_hazards:
+                        if hazard not in hazards:
+                            poi.hazards.remove(hazard)
+                    for hazard in hazards:
+                        if hazard not in existing_hazards:
+                            poi.hazards.add(hazard)
+                    # process categories
+                    existing_categories = poi.categories.all()
+                    for category in existing_categories:
+                        if category not in categories:
+                            poi.categories.remove(category)
+                    for category in categories:
+                        if category not in existing_categories:
+                            poi.categories.add(category)
+                    poi.__dict__.update(**poi_form.cleaned_data)
+                    poi.location_status = location_status
+                    poi.save()
+                else:
+                    poi = poi_form.save(commit=False)
+                    poi.location_status = location_status
+                    poi.save()
+                    for image in images:
                         poi.images.add(image)
-                # process videos
-                existing_videos = poi.videos.all()
-                for video in existing_videos:
-                    if video not in videos:
-                        poi.videos.remove(video)
-                for video in videos:
-                    if video not in existing_videos:
+                    for video in videos:
                         poi.videos.add(video)
-                # process hazards
-                existing_hazards = poi.hazards.all()
-                for hazard in existing_hazards:
-                    if hazard not in hazards:
-                        poi.hazards.remove(hazard)
-                for hazard in hazards:
-                    if hazard not in existing_hazards:
+                    for hazard in hazards:
                         poi.hazards.add(hazard)
-                # process categories
-                existing_categories = poi.categories.all()
-                for category in existing_categories:
-                    if category not in categories:
-                        poi.categories.remove(category)
-                for category in categories:
-                    if category not in existing_categories:
+                    for category in categories:
                         poi.categories.add(category)
-                poi.__dict__.update(**poi_form.cleaned_data)
-                poi.save()
-            else:
-                poi = poi_form.save()
-                for image in images:
-                    poi.images.add(image)
-                for video in videos:
-                    poi.videos.add(video)
-                for hazard in hazards:
-                    poi.hazards.add(hazard)
-                for category in categories:
-                    poi.categories.add(category)
+
+                if geocode:
+                    geocode_jobs.enqueue(poi)
+                elif location_status != PointOfInterest.PENDING:
+                    geocode_jobs.cancel(poi)
             return HttpResponseRedirect(
                 "%s?saved=true" % reverse('entry-list-pois'))
         else:
@@ -186,10 +223,16 @@ def poi(request, id=None):
         errors = []
         message = ''
 
+    location_message = None
     if id:
         poi = PointOfInterest.objects.get(id=id)
-        poi.latitude = poi.location[1]
-        poi.longitude = poi.location[0]
+        poi.latitude = poi.longitude = None
+        # Coordinates in the form would be saved over the pending ones
+        if poi.location and poi.location_status != PointOfInterest.PENDING:
+            poi.latitude = poi.location[1]
+            poi.longitude = poi.location[0]
+        if poi.location_status != PointOfInterest.LOCATED:
+            location_message = poi.get_location_status_display()
         title = "Edit {0}".format(poi.name)
         post_url = reverse('edit-poi', kwargs={'id': id})
         poi_form = PointOfInterestForm(
@@ -264,4 +307,5 @@ def poi(request, id=None):
         'post_url': post_url,
         'errors': errors,
         'poi_form': poi_form,
+        'location_message': location_message,
     })
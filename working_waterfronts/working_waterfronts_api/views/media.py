@@ -0,0 +1,207 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import (
+    Http404, HttpResponse, HttpResponseNotAllowed, HttpResponseNotModified,
+    StreamingHttpResponse)
+from django.utils.cache import patch_cache_control
+from django.utils.http import urlquote
+
+from working_waterfronts.working_waterfronts_api.functions import (
+    not_modified, set_validators)
+from working_waterfronts.working_waterfronts_api.models import (
+    Image, MediaFile)
+from working_waterfronts.working_waterfronts_api.resize import (
+    DECODE_ERRORS, allowed_size, resized)
+
+# A single byte range: bytes=<first>-<last>, bytes=<first>- or bytes=-<n>
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# The name of a content-addressed file (see storage.py)
+CONTENT_ADDRESSED = re.compile(r'^[0-9a-f]{64}$')
+
+# The size of the pieces files are streamed in when they aren't offloaded
+CHUNK_SIZE = 64 * 1024
+
+
+def media(request, path):
+    """
+    */media/<path>*
+
+    Serves an uploaded image, or one of its derivatives. Files no Image
+    refers to are not found.
+
+    The transfer is handed to the front-end web server, per MEDIA_SERVER:
+    nginx with X-Accel-Redirect, or Apache/lighttpd with X-Sendfile, which
+    answer Range requests themselves. Without one, for development, the
+    file is streamed from here, honoring single Range and If-Range headers.
+    Either way, the response has a strong ETag and If-None-Match is
+    answered here, without touching the file.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+    # Raises SuspiciousFileOperation, a 400, for paths out of MEDIA_ROOT
+    Image._meta.get_field('image').storage.path(path)
+    if not MediaFile.objects.filter(name=path).exists():
+        raise Http404
+    return serve(request, path)
+
+
+def resize(request, width, height, path):
+    """
+    */media/resize/<width>x<height>/<path>*
+
+    Serves an uploaded image resized to fit within width x height, which
+    must be one of IMAGE_RESIZE_SIZES. The resized image is rendered on the
+    first request for it and cached on disk (see resize.py), then served as
+    media() serves files.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+    width, height = int(width), int(height)
+    if not allowed_size(width, height):
+        raise Http404
+
+    storage = Image._meta.get_field('image').storage
+    # Raises SuspiciousFileOperation, a 400, for paths out of MEDIA_ROOT
+    storage.path(path)
+    if not MediaFile.objects.filter(name=path, original=True).exists():
+        raise Http404
+    try:
+        source = os.stat(storage.path(path))
+        name = resized(storage, path, width, height)
+    except (IOError, OSError) + DECODE_ERRORS:
+        # The file is missing, or isn't an image PIL can decode
+        raise Http404
+
+    # The resized copy is described by its original and the box, not by
+    # the cached file, which may be evicted and rendered again
+    etag, last_modified, immutable = file_validators(path, source)
+    return serve(request, name, (
+        '%s-%dx%d' % (etag, width, height), last_modified, immutable))
+
+
+def serve(request, path, validators=None):
+    """
+    Return the response for a file under MEDIA_ROOT, once it has been
+    checked, as described for media(). <validators> are as returned by
+    file_validators(), which gives the file's own by default.
+    """
+    full_path = Image._meta.get_field('image').storage.path(path)
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404
+
+    etag, last_modified, immutable = \
+        validators or file_validators(path, stat)
+    if not_modified(request, etag, last_modified):
+        response = HttpResponseNotModified()
+    elif settings.MEDIA_SERVER == 'x-accel-redirect':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = urlquote(
+            settings.MEDIA_ACCEL_PREFIX + path)
+    elif settings.MEDIA_SERVER == 'x-sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = full_path.encode('utf-8')
+    else:
+        response = stream_file(request, full_path, stat.st_size, etag)
+
+    if response.status_code in (200, 206):
+        content_type, encoding = mimetypes.guess_type(path)
+        response['Content-Type'] = content_type or 'application/octet-stream'
+    if immutable:
+        patch_cache_control(
+            response, public=True, max_age=settings.MEDIA_MAX_AGE)
+    return set_validators(response, etag, last_modified)
+
+
+def is_content_addressed(path):
+    """
+    Return whether a file is named by the hash of its content.
+    """
+    return bool(CONTENT_ADDRESSED.match(
+        os.path.splitext(os.path.basename(path))[0]))
+
+
+def file_validators(path, stat):
+    """
+    Return a strong ETag for a file, its Last-Modified timestamp, and
+    whether it never changes. The ETag is the file's content hash if it is
+    named by one, in which case the file at that URL never changes, or else
+    its modification time and size, as nginx and Apache make them.
+    """
+    if is_content_addressed(path):
+        etag = os.path.splitext(os.path.basename(path))[0]
+        return etag, int(stat.st_mtime), True
+    return '%x-%x' % (int(stat.st_mtime), stat.st_size), \
+        int(stat.st_mtime), False
+
+
+def byte_range(request, size, etag):
+    """
+    Return the (first, last) byte of a file the request's Range header asks
+    for, None to send the whole file, or False if the range can't be
+    satisfied. Multiple ranges are answered with the whole file, as is a
+    Range whose If-Range doesn't match the file's ETag.
+    """
+    match = RANGE.match(request.META.get('HTTP_RANGE', '').replace(' ', ''))
+    if not match or not any(match.groups()):
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range.strip('"') != etag:
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # The last <last> bytes
+        first, last = max(size - int(last), 0), size - 1
+    else:
+        first = int(first)
+        if last and int(last) < first:
+            # Not a valid range, so ignored
+            return None
+        last = min(int(last), size - 1) if last else size - 1
+    if first > last or first >= size:
+        return False
+    return first, last
+
+
+def stream_file(request, full_path, size, etag):
+    """
+    Return a StreamingHttpResponse of a file, or the part of it the
+    request's Range header asks for.
+    """
+    requested = byte_range(request, size, etag)
+    if requested is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */%d' % size
+        return response
+
+    first, last = requested or (0, size - 1)
+    response = StreamingHttpResponse(
+        read_file(full_path, first, last - first + 1),
+        status=206 if requested else 200)
+    if requested:
+        response['Content-Range'] = 'bytes %d-%d/%d' % (first, last, size)
+    response['Content-Length'] = last - first + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def read_file(full_path, offset, length):
+    """
+    Yield <length> bytes of a file from <offset>, CHUNK_SIZE at a time.
+    """
+    with open(full_path, 'rb') as f:
+        f.seek(offset)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
@@ -1,19 +1,33 @@
-from django.http import HttpResponse, HttpResponseNotFound
-from django.contrib.gis.measure import D
-from working_waterfronts.working_waterfronts_api.models import PointOfInterest
+from django.http import (
+    HttpResponse, HttpResponseNotFound, HttpResponseNotModified,
+    StreamingHttpResponse)
+from working_waterfronts.working_waterfronts_api.models import (
+    PointOfInterestFragment)
 from working_waterfronts.working_waterfronts_api.functions import (
-    get_lat_long_prox)
+    get_lat_long_prox, get_order, get_count, get_bbox, get_zoom,
+    within_proximity, order_by_distance, cluster_pois, poi_validators,
+    etag_matches, set_validators)
 
 import json
-from .serializer import ObjectSerializer
+from working_waterfronts.working_waterfronts_api.response_cache import (
+    cache_response)
+from working_waterfronts.working_waterfronts_api import fragments
 
 
+@cache_response
 def poi_list(request):
     """
     */pois/*
 
     List all pointsofinterest in the database. There is no order to this list,
-    only whatever is returned by the database.
+    only whatever is returned by the database, unless order=distance is
+    given along with a location. The POIs are then sorted nearest first and
+    each has its distance in miles.
+
+    With bbox=minLng,minLat,maxLng,maxLat only the POIs inside that box are
+    listed.
+
+    With format=geojson the POIs are streamed as a GeoJSON FeatureCollection.
     """
     error = {
         'status': False,
@@ -22,46 +36,58 @@ def poi_list(request):
         'level': None,
         'debug': None
     }
-    data = {}
 
     point, proximity, limit, error = get_lat_long_prox(request, error)
+    order, error = get_order(request, error)
+    bbox, error = get_bbox(request, error)
 
     if point:
-        poi_list = PointOfInterest.objects.filter(
-            location__distance_lte=(point, D(mi=proximity)))[:limit]
+        poi_list = within_proximity(
+            PointOfInterestFragment.objects.all(), point, proximity)
+        if order == 'distance':
+            poi_list = order_by_distance(poi_list, point)
     else:
-        poi_list = PointOfInterest.objects.all()[:limit]
+        poi_list = PointOfInterestFragment.objects.all()
+        order = None
 
-    if not poi_list:
-        error = {
+    if bbox:
+        poi_list = poi_list.filter(location__bboverlaps=bbox)
+
+    etag, last_modified = poi_validators(poi_list)
+    if etag_matches(request, etag):
+        return set_validators(
+            HttpResponseNotModified(), etag, last_modified)
+
+    if request.GET.get('format') == 'geojson':
+        return set_validators(StreamingHttpResponse(
+            fragments.stream_geojson(
+                poi_list, limit, distance=order == 'distance', error=error),
+            content_type="application/geo+json"), etag, last_modified)
+
+    content = fragments.list_json(
+        poi_list, limit, distance=order == 'distance', error=error,
+        empty_error={
             "status": True,
             "name": "No PointsOfInterest",
             "text": "No PointsOfInterest found",
             "level": "Information",
             "debug": ""
-        }
+        })
 
-    serializer = ObjectSerializer()
-
-    data = {
-        "pointsofinterest": json.loads(
-            serializer.serialize(
-                poi_list,
-                use_natural_foreign_keys=True
-            )
-        ),
-        "error": error
-    }
-
-    return HttpResponse(json.dumps(data), content_type="application/json")
+    return set_validators(
+        HttpResponse(content, content_type="application/json"),
+        etag, last_modified)
 
 
+@cache_response
 def poi_categories(request, id=None):
     """
     */pois/categories/<id>*
 
     List all pois in the database in category <id>.
-    There is no order to this list, only whatever is returned by the database.
+    There is no order to this list, only whatever is returned by the database,
+    unless order=distance is given along with a location. It can be limited
+    to a bbox and streamed as GeoJSON in the same way as */pois/*.
     """
     error = {
         'status': False,
@@ -73,15 +99,24 @@ def poi_categories(request, id=None):
     data = {}
 
     point, proximity, limit, error = get_lat_long_prox(request, error)
+    order, error = get_order(request, error)
+    bbox, error = get_bbox(request, error)
     try:
         if point:
-            poi_list = PointOfInterest.objects.filter(
-                categories__id=int(id),
-                location__distance_lte=(point, D(mi=proximity)))[:limit]
+            poi_list = within_proximity(
+                PointOfInterestFragment.objects.filter(
+                    categories__contains=[int(id)]),
+                point, proximity)
+            if order == 'distance':
+                poi_list = order_by_distance(poi_list, point)
         else:
-            poi_list = PointOfInterest.objects.filter(
-                categories__id=int(id)
-            )[:limit]
+            poi_list = PointOfInterestFragment.objects.filter(
+                categories__contains=[int(id)]
+            )
+            order = None
+
+        if bbox:
+            poi_list = poi_list.filter(location__bboverlaps=bbox)
 
     except Exception as e:
         error = {
@@ -96,30 +131,149 @@ def poi_categories(request, id=None):
             content_type="application/json"
         )
 
-    if not poi_list:
-        error = {
+    etag, last_modified = poi_validators(poi_list)
+    if etag_matches(request, etag):
+        return set_validators(
+            HttpResponseNotModified(), etag, last_modified)
+
+    if request.GET.get('format') == 'geojson':
+        return set_validators(StreamingHttpResponse(
+            fragments.stream_geojson(
+                poi_list, limit, distance=order == 'distance', error=error),
+            content_type="application/geo+json"), etag, last_modified)
+
+    content = fragments.list_json(
+        poi_list, limit, distance=order == 'distance', error=error,
+        empty_error={
             "status": True,
             "name": "No PointsOfInterest",
             "text": "No PointsOfInterest found for category %s" % id,
             "level": "Information",
             "debug": ""
-        }
+        })
+
+    return set_validators(
+        HttpResponse(content, content_type="application/json"),
+        etag, last_modified)
+
+
+def poi_nearest(request):
+    """
+    */pois/nearest*
+
+    List the n pointsofinterest nearest to the given lat and lng, nearest
+    first, each with its distance in miles. No proximity is needed: the
+    nearest POIs are returned however far away they are.
+    """
+    return _nearest(request, PointOfInterestFragment.objects.all())
 
-    serializer = ObjectSerializer()
+
+def poi_categories_nearest(request, id=None):
+    """
+    */pois/categories/<id>/nearest*
+
+    List the n pois in category <id> nearest to the given lat and lng.
+    """
+    return _nearest(request, PointOfInterestFragment.objects.filter(
+        categories__contains=[int(id)]))
+
+
+def _nearest(request, poi_list):
+    error = {
+        'status': False,
+        'name': None,
+        'text': None,
+        'level': None,
+        'debug': None
+    }
+
+    point, proximity, limit, error = get_lat_long_prox(request, error)
+    count, error = get_count(request, error)
+
+    if not point:
+        if not error['status']:
+            error = {
+                "status": True,
+                "name": "No location",
+                "text": "A lat and lng are required",
+                "level": "Error",
+                "debug": ""
+            }
+        content = '{"pointsofinterest": [], "error": %s}' % (
+            json.dumps(error))
+    else:
+        content = fragments.list_json(
+            order_by_distance(poi_list, point), count, distance=True,
+            error=error, empty_error={
+                "status": True,
+                "name": "No PointsOfInterest",
+                "text": "No PointsOfInterest found",
+                "level": "Information",
+                "debug": ""
+            })
+
+    return HttpResponse(content, content_type="application/json")
+
+
+def poi_clusters(request):
+    """
+    */pois/clusters*
+
+    Group the pointsofinterest inside bbox into grid cells sized for the
+    given map zoom level, returning the number of POIs in each cell, their
+    centroid and a count of POIs per category.
+    """
+    return _clusters(request, PointOfInterestFragment.objects.all())
+
+
+def poi_categories_clusters(request, id=None):
+    """
+    */pois/categories/<id>/clusters*
+
+    Cluster the pois in category <id> in the same way as */pois/clusters*.
+    """
+    return _clusters(request, PointOfInterestFragment.objects.filter(
+        categories__contains=[int(id)]))
+
+
+def _clusters(request, poi_list):
+    error = {
+        'status': False,
+        'name': None,
+        'text': None,
+        'level': None,
+        'debug': None
+    }
+    data = {}
+
+    bbox, error = get_bbox(request, error)
+    zoom, error = get_zoom(request, error)
+
+    if zoom is None:
+        clusters = []
+    else:
+        if bbox:
+            poi_list = poi_list.filter(location__bboverlaps=bbox)
+        clusters = cluster_pois(poi_list, zoom)
+
+        if not clusters:
+            error = {
+                "status": True,
+                "name": "No PointsOfInterest",
+                "text": "No PointsOfInterest found",
+                "level": "Information",
+                "debug": ""
+            }
 
     data = {
-        "pointsofinterest": json.loads(
-            serializer.serialize(
-                poi_list,
-                use_natural_foreign_keys=True
-            )
-        ),
+        "clusters": clusters,
         "error": error
     }
 
     return HttpResponse(json.dumps(data), content_type="application/json")
 
 
+@cache_response
 def poi_details(request, id=None):
     """
         */pois/<id>*
@@ -128,8 +282,10 @@ def poi_details(request, id=None):
     """
     data = {}
 
+    queryset = PointOfInterestFragment.objects.filter(pointofinterest=id)
+    # Looked up first, so If-None-Match: * isn't answered for a missing POI
     try:
-        poi = PointOfInterest.objects.get(id=id)
+        poi = fragments.get(queryset)
     except Exception as e:
         data['error'] = {
             'status': True,
@@ -143,6 +299,11 @@ def poi_details(request, id=None):
             content_type="application/json"
         )
 
+    etag, last_modified = poi_validators(queryset)
+    if etag_matches(request, etag):
+        return set_validators(
+            HttpResponseNotModified(), etag, last_modified)
+
     error = {
         'status': False,
         'name': None,
@@ -151,15 +312,8 @@ def poi_details(request, id=None):
         'debug': None
     }
 
-    serializer = ObjectSerializer()
-
-    data = json.loads(
-        serializer.serialize(
-            [poi],
-            use_natural_foreign_keys=True
-        )[1:-1]
-    )
-
-    data['error'] = error
-
-    return HttpResponse(json.dumps(data), content_type="application/json")
+    return set_validators(
+        HttpResponse(
+            fragments.with_error(poi, error),
+            content_type="application/json"),
+        etag, last_modified)
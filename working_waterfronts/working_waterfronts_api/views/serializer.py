@@ -1,9 +1,21 @@
-from django.core.serializers import json
+import json
+import uuid
+
+from django.conf import settings
+from django.contrib.gis.measure import D
+from django.core.serializers.json import Serializer, DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils.encoding import is_protected_type, smart_text
+from phonenumber_field.modelfields import PhoneNumberField
+from phonenumber_field.phonenumber import to_python as phone_to_python
+
 from working_waterfronts.working_waterfronts_api.models import (
-    PointOfInterest, Hazard)
+    PointOfInterest, Image, Video, Hazard, Category)
+from working_waterfronts.working_waterfronts_api.derivatives import (
+    links as derivative_links)
 
 
-class ObjectSerializer(json.Serializer):
+class ObjectSerializer(Serializer):
 
     def get_dump_object(self, obj):
         self._current['id'] = obj.id
@@ -12,9 +24,222 @@ class ObjectSerializer(json.Serializer):
             self._current['lat'] = obj.location.y
             self._current['lng'] = obj.location.x
             del self._current['location']
+            del self._current['location_status']
 
         if isinstance(obj, Hazard):
             del self._current['pointofinterests']
 
         self._current['ext'] = {}
         return self._current
+
+
+class PointOfInterestEncoder(object):
+
+    """
+    Builds the public representation of PointsOfInterest directly from
+    database rows.
+
+    The output has the same shape as ObjectSerializer with
+    use_natural_foreign_keys=True, but POIs are read with values() and
+    their coordinates are selected by PostGIS, so no model instances are
+    created and the response is only encoded to JSON once.
+    """
+
+    def __init__(self):
+        opts = PointOfInterest._meta
+        self.fields = [
+            f for f in opts.local_fields if f.serialize and
+            f.name not in ('location', 'location_status')]
+
+        location = '%s.%s' % (
+            connection.ops.quote_name(opts.db_table),
+            connection.ops.quote_name(opts.get_field('location').column))
+        self.coordinates = {
+            'lat': 'ST_Y(%s)' % location,
+            'lng': 'ST_X(%s)' % location
+        }
+
+        self.image_storage = Image._meta.get_field('image').storage
+
+        # The model, columns and natural key builder of each relation
+        self.related = {
+            'images': (Image, ('name', 'caption', 'image', 'width', 'height',
+                               'bytes', 'sha256', 'derivatives'),
+                       self.image),
+            'videos': (Video, ('name', 'caption', 'video'), self.video),
+            'hazards': (Hazard, ('id', 'name', 'description'), self.hazard),
+            'categories': (Category, ('id', 'category'), self.category)
+        }
+
+    def serialize(self, queryset, limit=None, distance=False):
+        """
+        Return a list of POI dicts for the given PointOfInterest queryset,
+        limited to the first <limit> rows if a limit is given.
+
+        If <distance> is set, the queryset must select a 'distance' in meters
+        (see functions.order_by_distance), which is added to each POI in
+        miles.
+
+        Relations are loaded with one query per relation for the whole
+        result, so the number of queries does not grow with its size.
+        """
+        rows = list(self.rows(queryset, limit, distance))
+
+        relations = self.relations([row['id'] for row in rows])
+        return [self.poi(row, relations) for row in rows]
+
+    def rows(self, queryset, limit=None, distance=False):
+        """
+        Return a values() queryset of the POI columns needed to build the
+        POI dicts.
+        """
+        names = ['id', 'lat', 'lng'] + [f.attname for f in self.fields]
+        if distance:
+            names.append('distance')
+        return queryset.extra(select=self.coordinates).values(*names)[:limit]
+
+    def relations(self, ids):
+        """
+        Load the images, videos, hazards and categories of the POIs with the
+        given ids, returning a dict of {relation: {poi id: [natural keys]}}.
+        """
+        relations = {
+            'images': {}, 'videos': {}, 'hazards': {}, 'categories': {}}
+        if not ids:
+            return relations
+
+        for name, (model, fields, natural_key) in self.related.items():
+            rows = model.objects.filter(pointofinterest__in=ids).values(
+                'pointofinterest', *fields)
+            for row in rows:
+                relations[name].setdefault(
+                    row['pointofinterest'], []).append(natural_key(row))
+
+        return relations
+
+    def serialize_related(self, name, queryset):
+        """
+        Return a list of dicts for a queryset of one of the related models,
+        named as the relation (e.g. 'images'). Each has the object's natural
+        key along with its id, created and modified timestamps.
+        """
+        model, fields, natural_key = self.related[name]
+        objects = []
+        names = ['id', 'created', 'modified'] + [
+            f for f in fields if f != 'id']
+        for row in queryset.values(*names):
+            obj = natural_key(row)
+            obj.update(
+                id=row['id'], created=row['created'],
+                modified=row['modified'])
+            objects.append(obj)
+        return objects
+
+    def get(self, queryset):
+        """
+        Return the single POI dict matched by the queryset, raising
+        DoesNotExist like QuerySet.get() if there is none.
+        """
+        pois = self.serialize(queryset, 1)
+        if not pois:
+            raise PointOfInterest.DoesNotExist(
+                "%s matching query does not exist." %
+                PointOfInterest._meta.object_name)
+        return pois[0]
+
+    def encode(self, data):
+        return json.dumps(data, cls=DjangoJSONEncoder)
+
+    def poi(self, row, relations):
+        poi = {
+            'id': row['id'],
+            'lat': row['lat'],
+            'lng': row['lng'],
+            'ext': {}
+        }
+        for field in self.fields:
+            poi[field.name] = self.field_value(field, row[field.attname])
+
+        for name, related in relations.items():
+            poi[name] = related.get(row['id'], [])
+
+        if 'distance' in row:
+            poi['distance'] = D(m=row['distance']).mi
+
+        return poi
+
+    def field_value(self, field, value):
+        """
+        Convert a raw column value the same way the Django serializer
+        converts the model attribute.
+        """
+        if isinstance(field, PhoneNumberField):
+            value = phone_to_python(value)
+        if is_protected_type(value):
+            return value
+        return smart_text(value)
+
+    # The methods below mirror the natural_key() of each related model.
+
+    def image(self, row):
+        return {
+            'name': row['name'],
+            'caption': row['caption'],
+            'link': self.image_storage.url(row['image']),
+            'width': row['width'],
+            'height': row['height'],
+            'bytes': row['bytes'],
+            'sha256': row['sha256'],
+            'derivatives': derivative_links(
+                self.image_storage, row['derivatives'])
+        }
+
+    def video(self, row):
+        return {
+            'caption': row['caption'],
+            'name': row['name'],
+            'link': row['video']
+        }
+
+    def hazard(self, row):
+        return {
+            'name': row['name'],
+            'description': row['description'],
+            'id': row['id']
+        }
+
+    def category(self, row):
+        return {
+            'category': row['category'],
+            'id': row['id']
+        }
+
+
+def stream_rows(queryset, chunk_size=None):
+    """
+    Yield the rows of a values() queryset as lists of dicts of up to
+    <chunk_size> (STREAM_CHUNK_SIZE by default) rows each.
+
+    The rows are read through a named psycopg2 cursor, which keeps the
+    result on the database server until it is fetched, so only one chunk is
+    in memory at a time.
+    """
+    chunk_size = chunk_size or settings.STREAM_CHUNK_SIZE
+    sql, params = queryset.query.sql_with_params()
+
+    # Named cursors only live inside a transaction
+    with transaction.atomic():
+        connection.ensure_connection()
+        cursor = connection.connection.cursor(
+            name='stream_%s' % uuid.uuid4().hex)
+        try:
+            cursor.itersize = chunk_size
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                names = [column[0] for column in cursor.description]
+                yield [dict(zip(names, row)) for row in rows]
+        finally:
+            cursor.close()
@@ -0,0 +1,149 @@
+import datetime
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from working_waterfronts.working_waterfronts_api.models import (
+    PointOfInterest, Image, Video, Hazard, Category, Tombstone)
+from .serializer import PointOfInterestEncoder
+
+# The synced models, by their name in the response
+MODELS = [
+    ('pointsofinterest', PointOfInterest),
+    ('images', Image),
+    ('videos', Video),
+    ('hazards', Hazard),
+    ('categories', Category)
+]
+
+
+def sync(request):
+    """
+    */sync*
+
+    Returns every point of interest, image, video, hazard and category, and
+    a token. Given since=<token>, returns only the objects created or
+    modified since the token was issued, and the ids of those deleted since
+    under 'deleted'. Pass the returned token as since on the next sync.
+
+    Points of interest waiting to be geocoded for the first time are left
+    out until they have a location.
+
+    Tokens are ISO 8601 timestamps. Syncs overlap by SYNC_OVERLAP seconds so
+    that objects saved while a sync runs aren't missed, so clients may be
+    sent an object they already have.
+
+    Deletions are only recorded for TOMBSTONE_RETENTION seconds, so a token
+    older than that gets every object, with 'full' set: the client should
+    drop the objects it has that aren't in the response.
+    """
+    error = {
+        'status': False,
+        'name': None,
+        'text': None,
+        'level': None,
+        'debug': None
+    }
+
+    token = timezone.now()
+    since = request.GET.get('since', None)
+    if since is not None:
+        try:
+            since = parse_datetime(since)
+            if since is None:
+                raise ValueError("Not an ISO 8601 timestamp")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since, timezone.utc)
+            since -= datetime.timedelta(seconds=settings.SYNC_OVERLAP)
+        except Exception as e:
+            error = {
+                'status': True,
+                'name': 'Bad Token',
+                'text': 'Invalid since token. Returning all objects.',
+                'level': 'Warning',
+                'debug': "{0}: {1}".format(type(e).__name__, str(e))
+            }
+            since = None
+
+    if since is not None and since < tombstones_kept_since():
+        error = {
+            'status': True,
+            'name': 'Expired Token',
+            'text': 'Deletions since the token are no longer known. '
+                    'Returning all objects.',
+            'level': 'Warning',
+            'debug': "Tokens older than {0} seconds expire".format(
+                settings.TOMBSTONE_RETENTION)
+        }
+        since = None
+
+    encoder = PointOfInterestEncoder()
+    data = {
+        'token': token,
+        'full': since is None,
+        'deleted': dict((name, []) for name, model in MODELS)
+    }
+    for name, model in MODELS:
+        data[name] = []
+
+    if since is None or changed_since(since):
+        for name, model in MODELS:
+            objects = model.objects.all()
+            if since is not None:
+                objects = objects.filter(modified__gt=since)
+
+            if model is PointOfInterest:
+                # POIs that aren't located are left out, as they are by the
+                # /pois endpoints, and listed as deleted so clients drop
+                # the copy they have
+                located = Q(location__isnull=False,
+                            location_status=PointOfInterest.LOCATED)
+                if since is not None:
+                    data['deleted'][name].extend(
+                        objects.exclude(located).values_list('id', flat=True))
+                data[name] = encoder.serialize(objects.filter(located))
+            else:
+                data[name] = encoder.serialize_related(name, objects)
+
+        if since is not None:
+            tombstones = Tombstone.objects.filter(
+                deleted__gt=since).values_list('model', 'object_id')
+            names = dict(
+                (model._meta.model_name, name) for name, model in MODELS)
+            for model_name, object_id in tombstones:
+                data['deleted'][names[model_name]].append(object_id)
+
+    data['error'] = error
+    return HttpResponse(encoder.encode(data), content_type="application/json")
+
+
+def tombstones_kept_since():
+    """
+    Return the time since which deletions are known: tombstones older than
+    TOMBSTONE_RETENTION seconds are pruned (see prune_tombstones).
+    """
+    return timezone.now() - datetime.timedelta(
+        seconds=settings.TOMBSTONE_RETENTION)
+
+
+def changed_since(since):
+    """
+    Return whether anything was created, modified or deleted after <since>,
+    in a single query using the indexes on the modified and deleted columns.
+    """
+    tables = [(model._meta.db_table, 'modified') for name, model in MODELS]
+    tables.append((Tombstone._meta.db_table, 'deleted'))
+
+    exists = ' OR '.join(
+        'EXISTS (SELECT 1 FROM %s WHERE %s > %%s)' % (
+            connection.ops.quote_name(table),
+            connection.ops.quote_name(column))
+        for table, column in tables)
+
+    cursor = connection.cursor()
+    cursor.execute('SELECT %s' % exists, [since] * len(tables))
+    return cursor.fetchone()[0]
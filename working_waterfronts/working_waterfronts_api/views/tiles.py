@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotFound
+from django.utils.cache import patch_cache_control
+
+from working_waterfronts.working_waterfronts_api import tiles
+
+
+def poi_tile(request, z, x, y):
+    """
+    */tiles/<z>/<x>/<y>.mvt*
+
+    Returns the Mapbox Vector Tile z/x/y with a 'pointsofinterest' layer.
+    Each point has the POI's id and name, and its category ids as a
+    comma-separated string.
+    """
+    z, x, y = int(z), int(x), int(y)
+    if not tiles.valid_tile(z, x, y):
+        return HttpResponseNotFound()
+
+    response = HttpResponse(
+        tiles.render_tile(z, x, y),
+        content_type="application/vnd.mapbox-vector-tile")
+    patch_cache_control(
+        response, public=True, max_age=settings.TILE_MAX_AGE)
+    return response